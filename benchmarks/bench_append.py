@@ -0,0 +1,86 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pptx import Presentation
+from pptx.util import Inches
+import common
+from corpus import text_deck
+from core import profiling
+from core.append import BaseDeck
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+
+# Time and peak RSS of appending a small deck to existing decks of growing
+# size (slides and embedded media): core.append, which loads the base deck's
+# skeleton and copies its members as they are stored, against loading the
+# whole deck with python-pptx, adding the slides and saving it all. Every
+# case runs in a fresh process, so peak RSS is the case's own.
+
+# A movie, of random (incompressible) bytes, every this many slides
+MOVIE_EVERY = 10
+TEMPLATE = 'Elegant Blue'
+
+
+def build_base_deck(path, slides, media_mib, tmp):
+    generator = SlideGenerator(TEMPLATES[TEMPLATE])
+    generator.generate_presentation(text_deck(slides), path)
+    movies = max(1, slides // MOVIE_EVERY)
+    size = media_mib * 2**20 // movies
+    prs = Presentation(path)
+    movie = os.path.join(tmp, 'movie.mp4')
+    rng = random.Random(slides)
+    for i in range(movies):
+        with open(movie, 'wb') as f:
+            f.write(rng.randbytes(size))
+        prs.slides[i * MOVIE_EVERY].shapes.add_movie(movie, Inches(1), Inches(1), Inches(2), Inches(2),
+                                                     mime_type='video/mp4')
+    prs.save(path)
+
+
+def run_case(method, base_path, output, appended):
+    text = text_deck(appended)
+    start = time.perf_counter()
+    if method == 'append':
+        generator = SlideGenerator(TEMPLATES[TEMPLATE], base_deck=BaseDeck(base_path))
+    else:
+        generator = SlideGenerator(TEMPLATES[TEMPLATE], prs=Presentation(base_path))
+    generator.generate_presentation(text, output)
+    return time.perf_counter() - start, profiling.peak_rss()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Appending to large decks: skeleton append vs full load and save.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 4000], help='Slides per base deck')
+    parser.add_argument('--media-per-slide', type=int, default=64, metavar='KiB',
+                        help='Embedded media per base deck slide (default: %(default)s KiB)')
+    parser.add_argument('--appended', type=int, default=50, help='Slides appended (default: %(default)s)')
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for slides in args.sizes:
+            base_path = os.path.join(tmp, f'base{slides}.pptx')
+            media_mib = max(1, slides * args.media_per_slide // 1024)
+            # Built in a process of its own too, so this one stays small for
+            # the case processes it forks
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                executor.submit(build_base_deck, base_path, slides, media_mib, tmp).result()
+            print(f"{slides}-slide base deck built", file=sys.stderr, flush=True)
+            for method in ('append', 'full load'):
+                output = os.path.join(tmp, 'out.pptx')
+                # One process per case: a clean heap for the RSS figure
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    seconds, rss = executor.submit(run_case, method, base_path, output, args.appended).result()
+                rows.append([slides, f"{os.path.getsize(base_path) / 2**20:.0f}", method, f"{seconds:.2f}",
+                             f"{rss / 2**20:.0f}" if rss else "-"])
+            os.remove(base_path)
+    common.print_table(["base slides", "base MiB", "method", "seconds", "peak RSS MiB"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+import common
+from pptx import Presentation
+from pptx.chart.data import CategoryChartData
+from pptx.util import Inches
+from core.charts import CHART_TYPES, parse_chart_spec, downsample, chart_data
+from core.slide_parts import add_slide
+
+# Rendering every point of a long series goes through python-pptx's per-point
+# XML and workbook writers; above this size only the downsampled render runs
+FULL_RENDER_LIMIT = 100_000
+
+
+def legacy_parse_chart_data(data_str):
+    # SlideGenerator.parse_chart_data before chart specs, kept as the baseline
+    data = {}
+    for part in data_str.split(';'):
+        key, values = part.split(':')
+        data[key.strip()] = [float(v.strip()) for v in values.split(',')]
+    categories = data.get("Categories", [])
+    chart_data = CategoryChartData()
+    chart_data.categories = categories
+    for series_name, values in data.items():
+        if series_name != "Categories":
+            chart_data.add_series(series_name, values)
+    return chart_data
+
+
+def series(points, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(points, dtype=float)
+    return x, np.sin(x / (points / 20 + 1)) + rng.normal(0, 0.1, points)
+
+
+def render(spec):
+    # Seconds to add the chart to a slide and serialize the chart part, and its size
+    prs = Presentation()
+    slide = add_slide(prs, prs.slide_layouts[5])
+    start = time.perf_counter()
+    chart = slide.shapes.add_chart(CHART_TYPES[spec.chart_type], Inches(2), Inches(2), Inches(6), Inches(4.5),
+                                   chart_data(spec)).chart
+    blob = chart.part.blob
+    return time.perf_counter() - start, len(blob) + len(chart.part.chart_workbook.xlsx_part.blob)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Chart data parse and render cost by series length.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 100_000, 1_000_000])
+    parser.add_argument('--points', type=int, default=2000, help='Point budget for the downsampled render')
+    args = parser.parse_args(argv)
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            x, y = series(size)
+            inline = (f"type: line; points: {args.points}; Categories: {','.join(map(str, x.astype(int)))}; "
+                      f"Series1: {','.join(f'{v:.5f}' for v in y)}")
+            legacy_inline = inline.split('; ', 2)[2]
+            csv_path = os.path.join(tmp, f'{size}.csv')
+            np.savetxt(csv_path, np.column_stack([x, y]), delimiter=',', fmt='%.5f', header='x,value', comments='')
+            npy_path = os.path.join(tmp, f'{size}.npy')
+            np.save(npy_path, np.column_stack([x, y]))
+
+            legacy, _ = common.best_of(lambda: legacy_parse_chart_data(legacy_inline), repeat=3)
+            parsed, spec = common.best_of(lambda: parse_chart_spec(inline), repeat=3)
+            from_csv, _ = common.best_of(lambda: parse_chart_spec(f"type: line; file: {csv_path}"), repeat=3)
+            from_npy, _ = common.best_of(lambda: parse_chart_spec(f"type: line; file: {npy_path}"), repeat=3)
+            reduce_time, reduced = common.best_of(lambda: downsample(spec), repeat=3)
+            reduced_render, reduced_size = render(reduced)
+            if size <= FULL_RENDER_LIMIT:
+                full_render, full_size = render(spec._replace(max_points=0))
+                full = f"{full_render:.3f}s / {full_size / 1024:.0f} KiB"
+            else:
+                full = "skipped"
+            rows.append([size, f"{legacy * 1000:.1f}", f"{parsed * 1000:.1f}", f"{from_csv * 1000:.1f}",
+                         f"{from_npy * 1000:.1f}", f"{reduce_time * 1000:.1f}",
+                         f"{reduced_render:.3f}s / {reduced_size / 1024:.0f} KiB", full])
+    common.print_table(["points", "legacy parse ms", "inline ms", "csv ms", "npy ms", "lttb ms",
+                        f"render {args.points} pts", "render all pts"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import common
+from corpus import text_deck
+
+# Runs headless unless a platform is chosen explicitly
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QTimer, QEventLoop
+from PyQt5.QtWidgets import QApplication
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+from ui.worker import GenerationWorker
+
+
+class StallMonitor:
+    # A timer that should fire every `interval_ms`; the largest gap between
+    # two ticks is how long the event loop could not process input or paint.
+    def __init__(self, interval_ms=5):
+        self.timer = QTimer()
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self._tick)
+        self.max_stall = 0.0
+        self._last = None
+
+    def start(self):
+        self._last = time.perf_counter()
+        self.timer.start()
+
+    def stop(self):
+        self._tick()
+        self.timer.stop()
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.max_stall = max(self.max_stall, now - self._last)
+        self._last = now
+
+
+def on_main_thread(app, generator, text, output):
+    # The GUI before the worker: the click handler renders and saves inline
+    monitor = StallMonitor()
+    monitor.start()
+    start = time.perf_counter()
+    QTimer.singleShot(0, lambda: generator.generate_presentation(text, output))
+    QTimer.singleShot(0, app.quit)
+    app.exec_()
+    elapsed = time.perf_counter() - start
+    monitor.stop()
+    return elapsed, monitor.max_stall
+
+
+def on_worker(app, generator, text, output):
+    monitor = StallMonitor()
+    worker = GenerationWorker(generator, text, output, preview=False)
+    loop = QEventLoop()
+    worker.finished.connect(loop.quit)
+    monitor.start()
+    start = time.perf_counter()
+    worker.start()
+    loop.exec_()
+    elapsed = time.perf_counter() - start
+    monitor.stop()
+    return elapsed, monitor.max_stall
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Longest GUI event-loop stall while a deck is generated.')
+    parser.add_argument('--slides', type=int, default=500, help='Slides in the deck')
+    args = parser.parse_args(argv)
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    template = TEMPLATES['Elegant Blue']
+    text = text_deck(args.slides - 1)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'out.pptx')
+        for name, run in (("main thread", on_main_thread), ("worker thread", on_worker)):
+            elapsed, stall = run(app, SlideGenerator(template), text, output)
+            rows.append([name, f"{elapsed:.2f}", f"{stall * 1000:.1f}"])
+    common.print_table(["generation on", "total s", "max event-loop stall ms"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,52 @@
+import argparse
+import sys
+import tempfile
+import time
+import common
+from httpstub import ImageServer
+from core.generator import SlideGenerator
+from core.image_cache import ImageCache
+from templates.templates import TEMPLATES
+
+
+def run(cache, urls):
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'], image_cache=cache)
+    start = time.perf_counter()
+    for url in urls:
+        if generator.download_image(url) is None:
+            raise RuntimeError(f"download failed for {url}")
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Image cache behaviour against a local HTTP server.')
+    parser.add_argument('--images', type=int, default=200, help='Image lines per deck')
+    parser.add_argument('--distinct', type=int, default=20, help='Distinct image URLs')
+    parser.add_argument('--latency', type=float, default=0.02, help='Server latency in seconds')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as cache_dir, ImageServer(latency=args.latency) as server:
+        urls = [f"{server.url}/image{i % args.distinct}.png" for i in range(args.images)]
+        rows = []
+        cache = ImageCache(cache_dir)
+        scenarios = [
+            ("cold", lambda: cache),
+            ("warm, same process", lambda: cache),
+            ("warm, new process", lambda: ImageCache(cache_dir)),
+            ("revalidate (max_age=0)", lambda: ImageCache(cache_dir, max_age=0)),
+            ("evicting (cap 1 image)", lambda: ImageCache(tempfile.mkdtemp(dir=cache_dir), max_bytes=1)),
+        ]
+        for name, make_cache in scenarios:
+            scenario_cache = make_cache()
+            before = (server.requests, server.not_modified)
+            before_stats = scenario_cache.stats()
+            elapsed = run(scenario_cache, urls)
+            stats = {k: v - before_stats[k] for k, v in scenario_cache.stats().items()}
+            rows.append([name, f"{elapsed * 1000:.0f}", server.requests - before[0], server.not_modified - before[1],
+                         stats['hits'], stats['misses'], stats['evictions']])
+        common.print_table(["scenario", "ms", "requests", "304s", "hits", "misses", "evictions"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO
+import common
+from corpus import image_deck
+from httpstub import ImageServer, make_jpeg
+from PIL import Image
+from core.fetcher import ImagePrefetcher
+from core.generator import SlideGenerator
+from core.image_cache import ImageCache
+from templates.templates import TEMPLATES
+
+
+def full_resolution_png(data):
+    output = BytesIO()
+    Image.open(BytesIO(data)).save(output, 'PNG')
+    return output.getvalue()
+
+
+class FullResolutionGenerator(SlideGenerator):
+    # Previous behaviour: every image re-encoded to a full-size PNG
+    def _prepare_image(self, digest):
+        return self.image_cache.derived(digest, 'png', full_resolution_png)
+
+
+def render(generator_class, text, cache_dir, output):
+    cache = ImageCache(cache_dir)
+    prefetcher = ImagePrefetcher(cache)
+    generator = generator_class(TEMPLATES['Elegant Blue'], image_cache=cache, prefetcher=prefetcher)
+    start = time.perf_counter()
+    generator.generate_presentation(text, output)
+    elapsed = time.perf_counter() - start
+    prefetcher.shutdown()
+    return elapsed, os.path.getsize(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Output size and render time of an image-heavy deck.')
+    parser.add_argument('--images', type=int, default=6, help='Distinct 12-megapixel JPEGs in the deck')
+    args = parser.parse_args(argv)
+
+    rows = []
+    with ImageServer(factory=make_jpeg) as server, tempfile.TemporaryDirectory() as tmp:
+        text = image_deck(args.images, server.url, distinct=args.images)
+        output = os.path.join(tmp, 'out.pptx')
+        for name, generator_class in (("full-size PNG", FullResolutionGenerator), ("fitted, in memory", SlideGenerator)):
+            cache_dir = tempfile.mkdtemp(dir=tmp)
+            cold = render(generator_class, text, cache_dir, output)
+            warm = render(generator_class, text, cache_dir, output)
+            rows.append([name, f"{cold[0]:.2f}", f"{warm[0]:.2f}", f"{cold[1] / 2**20:.1f}"])
+    common.print_table(["pipeline", "cold s", "warm s", "pptx MiB"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
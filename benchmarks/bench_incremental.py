@@ -0,0 +1,54 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import common
+from corpus import chart_deck, image_deck, text_deck
+from httpstub import ImageServer
+from core.fetcher import ImagePrefetcher
+from core.generator import SlideGenerator
+from core.image_cache import ImageCache
+from core.slide_cache import SlideCache
+from templates.templates import TEMPLATES
+
+
+def render(text, tmp, slide_cache, output):
+    # A fresh image cache each time: without the slide cache every image
+    # would be downloaded again, as on a first run
+    image_cache = ImageCache(tempfile.mkdtemp(dir=tmp))
+    prefetcher = ImagePrefetcher(image_cache)
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'], image_cache=image_cache,
+                               prefetcher=prefetcher, slide_cache=slide_cache)
+    start = time.perf_counter()
+    generator.generate_presentation(text, output)
+    elapsed = time.perf_counter() - start
+    prefetcher.shutdown()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Regeneration time after a one-line edit.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000], help='Deck sizes in slides')
+    parser.add_argument('--latency', type=float, default=0.05, help='Image server latency in seconds')
+    args = parser.parse_args(argv)
+
+    rows = []
+    with ImageServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'out.pptx')
+        for size in args.sizes:
+            text = (text_deck(size * 8 // 10) + chart_deck(size // 10, seed=1).split("\n", 1)[1]
+                    + image_deck(size // 10, server.url, seed=size, distinct=size // 10).split("\n", 1)[1])
+            edited = text.replace("\n- ", "\n- edited ", 1)
+            slide_cache = SlideCache(tempfile.mkdtemp(dir=tmp))
+            full = render(edited, tmp, None, output)
+            render(text, tmp, slide_cache, output)
+            before = slide_cache.misses
+            incremental = render(edited, tmp, slide_cache, output)
+            rows.append([size, f"{full:.2f}", f"{incremental:.2f}", slide_cache.misses - before])
+    common.print_table(["slides", "full rebuild s", "after edit s", "slides rendered"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
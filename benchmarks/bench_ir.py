@@ -0,0 +1,79 @@
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import tracemalloc
+import common
+from bench_parser import legacy_parse_input
+from corpus import text_deck, chart_deck, mixed_deck
+from core.generator import SlideGenerator
+from core.parse_cache import ParseCache, deck_key
+from templates.templates import TEMPLATES
+
+# Parsed decks: memory held per slide by the slide objects (core.ir) next to
+# the dicts the parser used to return, and parsing against loading the deck
+# from the parse cache, both from disk (a fresh cache, as in a new process)
+# and from memory. Images are not fetched while parsing, so the image URLs
+# of the mixed corpus need no server.
+
+CORPORA = {
+    'text': lambda size: text_deck(size),
+    'chart': lambda size: chart_deck(size, points=50),
+    'mixed': lambda size: mixed_deck(size, 'http://localhost'),
+}
+
+
+def retained(func):
+    # Bytes still allocated by func's result once it returns
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Memory and load time of parsed decks.')
+    parser.add_argument('--slides', type=int, default=10000, help='Slides per deck')
+    parser.add_argument('--corpora', nargs='+', choices=list(CORPORA), default=list(CORPORA))
+    args = parser.parse_args(argv)
+
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'])
+    memory_rows, time_rows = [], []
+    with tempfile.TemporaryDirectory() as tmp:
+        for corpus in args.corpora:
+            text = CORPORA[corpus](args.slides)
+            legacy_bytes, legacy = retained(lambda: legacy_parse_input(text))
+            ir_bytes, slides = retained(lambda: generator.parse_input(text))
+            count = len(slides)
+            memory_rows.append([corpus, count, f"{legacy_bytes / len(legacy):.0f}", f"{ir_bytes / count:.0f}",
+                                f"{ir_bytes / legacy_bytes:.2f}x"])
+            del legacy
+
+            parse, _ = common.best_of(lambda: generator.parse_input(text), repeat=3)
+            cache_dir = os.path.join(tmp, corpus)
+            key = deck_key(text)
+            ParseCache(cache_dir).put(key, slides)
+            # A fresh cache per run reads the deck from disk
+            cold, loaded = common.best_of(lambda: ParseCache(cache_dir).get(key), repeat=3)
+            assert loaded == slides
+            cache = ParseCache(cache_dir)
+            cache.get(key)
+            warm, _ = common.best_of(lambda: cache.get(key), repeat=3)
+            size = os.path.getsize(cache._path(key))
+            time_rows.append([corpus, count, f"{parse * 1000:.1f}", f"{cold * 1000:.1f}", f"{warm * 1000:.3f}",
+                              f"{parse / cold:.1f}x", f"{size / 1024:.0f}"])
+
+    print("memory per slide (bytes, tracemalloc)")
+    common.print_table(["corpus", "slides", "dicts", "slide objects", "ratio"], memory_rows)
+    print()
+    print("parse vs parse cache")
+    common.print_table(["corpus", "slides", "parse ms", "disk load ms", "memory load ms", "speedup", "file KiB"],
+                       time_rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
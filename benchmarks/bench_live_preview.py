@@ -0,0 +1,94 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+import common
+from corpus import text_deck
+
+# Runs headless unless a platform is chosen explicitly
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEventLoop, QTimer
+from PyQt5.QtGui import QTextCursor
+from PyQt5.QtWidgets import QApplication
+from core.generator import SlideGenerator
+from core.live_parser import LiveDocument
+from templates.templates import TEMPLATES
+from ui.ui import MainWindow
+
+TIMEOUT_MS = 5000
+
+
+def wait_for_preview(window):
+    loop = QEventLoop()
+    window.live_worker.rendered.connect(loop.quit)
+    QTimer.singleShot(TIMEOUT_MS, loop.quit)
+    loop.exec_()
+    window.live_worker.rendered.disconnect(loop.quit)
+    QApplication.processEvents()
+    return window.last_preview_latency_ms
+
+
+def type_at(window, line, text):
+    # One keystroke: move to the end of `line` and insert a character
+    cursor = window.text_edit.textCursor()
+    cursor.movePosition(QTextCursor.Start)
+    cursor.movePosition(QTextCursor.NextBlock, QTextCursor.MoveAnchor, line)
+    cursor.movePosition(QTextCursor.EndOfBlock)
+    cursor.insertText(text)
+    window.text_edit.setTextCursor(cursor)
+
+
+def parse_costs(text, edits, rng):
+    lines = text.split('\n')
+    document = LiveDocument()
+    document.update(text)
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'])
+    incremental, full = [], []
+    for _ in range(edits):
+        line = rng.randrange(2, len(lines))
+        lines[line] += 'x'
+        edited = '\n'.join(lines)
+        start = time.perf_counter()
+        document.update(edited)
+        incremental.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        list(generator.iter_slides(edited.split('\n')))
+        full.append(time.perf_counter() - start)
+    return statistics.median(incremental) * 1000, statistics.median(full) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keystroke-to-preview latency of the live preview.')
+    parser.add_argument('--slides', type=int, default=1000, help='Slides in the edited document')
+    parser.add_argument('--keystrokes', type=int, default=100, help='Keystrokes at random lines')
+    args = parser.parse_args(argv)
+
+    rng = random.Random(0)
+    text = text_deck(args.slides - 1)
+    incremental, full = parse_costs(text, args.keystrokes, rng)
+    print(f"re-parse after an edit: incremental {incremental:.2f} ms, full iter_slides {full:.2f} ms")
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow()
+    window.show()
+    window.text_edit.setPlainText(text)
+    wait_for_preview(window)
+    lines = window.text_edit.document().blockCount()
+    latencies = []
+    for _ in range(args.keystrokes):
+        type_at(window, rng.randrange(lines), 'x')
+        latencies.append(wait_for_preview(window))
+    window.close()
+    latencies.sort()
+    common.print_table(
+        ["slides", "keystrokes", "median ms", "p95 ms", "max ms"],
+        [[args.slides, len(latencies), f"{statistics.median(latencies):.1f}",
+          f"{latencies[int(len(latencies) * 0.95) - 1]:.1f}", f"{latencies[-1]:.1f}"]])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import common
+from corpus import text_deck
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+
+
+def render(template, text, master_mode, output):
+    start = time.perf_counter()
+    SlideGenerator(template, master_mode=master_mode).generate_presentation(text, output)
+    return time.perf_counter() - start, os.path.getsize(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-slide styling vs styles baked into the slide master.')
+    parser.add_argument('--slides', type=int, default=1000, help='Slides per deck')
+    parser.add_argument('--templates', nargs='+', default=sorted(TEMPLATES), help='Templates to compare')
+    args = parser.parse_args(argv)
+
+    text = text_deck(args.slides)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'out.pptx')
+        for name in args.templates:
+            per_slide = render(TEMPLATES[name], text, False, output)
+            master = render(TEMPLATES[name], text, True, output)
+            rows.append([name, f"{per_slide[0]:.2f}", f"{master[0]:.2f}",
+                         f"{per_slide[1] / 1024:.0f}", f"{master[1] / 1024:.0f}",
+                         f"{1 - master[1] / per_slide[1]:.0%}"])
+    common.print_table(["template", "per-slide s", "master s", "per-slide KiB", "master KiB", "smaller"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
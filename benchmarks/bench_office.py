@@ -0,0 +1,66 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import common
+from corpus import text_deck
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+from utils import office
+
+
+def conversion_latencies(converter, deck, tmp, conversions):
+    times = []
+    for i in range(conversions):
+        start = time.perf_counter()
+        converter.to_pdf(deck, os.path.join(tmp, f'out{i}.pdf'))
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def parallel_throughput(converter, deck, tmp, conversions):
+    start = time.perf_counter()
+    futures = [converter.submit_pdf(deck, os.path.join(tmp, f'par{i}.pdf')) for i in range(conversions)]
+    for future in futures:
+        future.result()
+    return conversions / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='PDF conversion latency: cold soffice per call vs warm pool.')
+    parser.add_argument('--slides', type=int, default=20, help='Slides in the converted deck')
+    parser.add_argument('--conversions', type=int, default=10, help='Conversions per configuration')
+    parser.add_argument('--instances', type=int, default=2, help='soffice instances in the pool')
+    args = parser.parse_args(argv)
+
+    if office.soffice_binary() is None:
+        print("LibreOffice (soffice) is not installed; nothing to measure")
+        return 0
+    converters = [("cold (soffice --convert-to)", office.CliOffice)]
+    if office.uno is not None:
+        converters.append(("warm pool (UNO)", office.OfficePool))
+    else:
+        print("uno module not importable (run with LibreOffice's python); measuring the cold path only")
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        deck = os.path.join(tmp, 'deck.pptx')
+        SlideGenerator(TEMPLATES['Elegant Blue']).generate_presentation(text_deck(args.slides - 1), deck)
+        for name, factory in converters:
+            converter = factory(args.instances)
+            start = time.perf_counter()
+            converter.warm()
+            warm_up = time.perf_counter() - start
+            times = conversion_latencies(converter, deck, tmp, args.conversions)
+            throughput = parallel_throughput(converter, deck, tmp, args.conversions)
+            converter.close()
+            rows.append([name, f"{warm_up:.2f}", f"{times[0] * 1000:.0f}", f"{statistics.median(times) * 1000:.0f}",
+                         f"{throughput:.2f}"])
+    common.print_table(["converter", "start-up s", "first ms", "median ms", "conversions/s"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
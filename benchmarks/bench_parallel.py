@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+import common
+from corpus import text_deck, mixed_deck
+from httpstub import ImageServer
+from core.generator import SlideGenerator
+from core.parallel import CHUNKS_PER_WORKER, MIN_CHUNK_SLIDES, ParallelRenderer
+from templates.templates import TEMPLATES
+
+# Speedup of rendering one deck split at its sections over 1..N worker
+# processes (core.parallel) against rendering it in-process. Each pool is
+# warmed with a small deck first, so worker start-up is not counted. The
+# stages that stay in the calling process (parse, merge, save) bound the
+# speedup; their times are reported alongside.
+
+
+def worker_counts():
+    # Powers of two up to the number of CPUs, and that number
+    counts, workers = {os.cpu_count()}, 1
+    while workers < os.cpu_count():
+        counts.add(workers)
+        workers *= 2
+    return sorted(counts)
+
+
+def render(func, text):
+    start = time.perf_counter()
+    report = func(text)
+    return time.perf_counter() - start, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Speedup of section-parallel rendering by worker count.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[2000, 20000], help='Slides per deck')
+    parser.add_argument('--workers', type=int, nargs='+', default=worker_counts(), help='Worker counts to try')
+    parser.add_argument('--corpus', choices=['text', 'mixed'], default='text')
+    parser.add_argument('--template', default='Elegant Blue')
+    args = parser.parse_args(argv)
+
+    template = TEMPLATES[args.template]
+    rows = []
+    with ImageServer() as images:
+        decks = {size: text_deck(size) if args.corpus == 'text' else mixed_deck(size, images.url)
+                 for size in args.sizes}
+        baselines = {}
+        for size, text in decks.items():
+            generator = SlideGenerator(template)
+            baselines[size], report = render(lambda text: generator.generate_presentation(text, BytesIO()), text)
+            rows.append([size, "in-process", f"{baselines[size]:.2f}", "1.00x", "-",
+                         f"{report['stages']['save']['seconds']:.2f}"])
+            print(f"{size} slides in-process done", file=sys.stderr, flush=True)
+        for workers in args.workers:
+            with ParallelRenderer(workers, log_file=None) as renderer:
+                generator = SlideGenerator(template)
+                warm_up = text_deck(workers * CHUNKS_PER_WORKER * MIN_CHUNK_SLIDES)
+                renderer.generate_presentation(generator, warm_up, BytesIO())
+                generator.clear_slides()
+                for size, text in decks.items():
+                    seconds, report = render(lambda text: renderer.generate_presentation(generator, text, BytesIO()),
+                                             text)
+                    generator.clear_slides()
+                    stages = report['stages']
+                    rows.append([size, workers, f"{seconds:.2f}", f"{baselines[size] / seconds:.2f}x",
+                                 f"{stages['merge']['seconds']:.2f}", f"{stages['save']['seconds']:.2f}"])
+            print(f"{workers} workers done", file=sys.stderr, flush=True)
+    rows.sort(key=lambda row: row[0])
+    print(f"{os.cpu_count()} CPUs")
+    common.print_table(["slides", "workers", "seconds", "speedup", "merge s", "save s"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import argparse
+import logging
+import re
+import sys
+import common
+from corpus import golden_corpus, text_deck
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+
+
+def legacy_parse_input(input_text):
+    # Per-line regex parser that SlideGenerator.parse_input replaced; kept
+    # verbatim as the reference implementation for the golden comparison.
+    slides = []
+    lines = input_text.strip().split('\n')
+
+    title_match = re.match(r'^# (.+)', lines[0]) if len(lines) > 0 else None
+    subtitle_match = re.match(r'^## (.+)', lines[1]) if len(lines) > 1 else None
+    if title_match:
+        title = title_match.group(1).strip()
+        subtitle = subtitle_match.group(1).strip() if subtitle_match else ""
+        slides.append({"type": "title", "title": title, "subtitle": subtitle})
+
+    current_slide = {"type": "", "title": "", "content": []}
+    for line in lines[1:]:
+        line = line.strip()
+        if re.match(r'^# .+', line):
+            if current_slide["title"]:
+                slides.append(current_slide)
+            title = re.sub(r'^# ', '', line).strip()
+            current_slide = {"type": "content", "title": title, "content": []}
+        elif re.match(r'^## .+', line):
+            if current_slide["title"]:
+                slides.append(current_slide)
+            title = re.sub(r'^## ', '', line).strip()
+            current_slide = {"type": "section", "title": title, "content": []}
+        elif re.match(r'^!\[.*\]\((.*)\)', line):
+            image_url = re.findall(r'^!\[.*\]\((.*)\)', line)[0]
+            slides.append({"type": "image", "title": current_slide.get("title", "Image Slide"), "image": image_url})
+        elif re.match(r'^@chart\s*\{(.+)\}', line):
+            chart_data = re.findall(r'^@chart\s*\{(.+)\}', line)[0]
+            slides.append({"type": "chart", "title": current_slide.get("title", "Chart Slide"), "chart_data": chart_data})
+        elif re.match(r'^> .+', line):
+            quote = re.sub(r'^> ', '', line).strip()
+            slides.append({"type": "quote", "quote": quote})
+        elif re.match(r'^- (.+)', line) or re.match(r'^\* (.+)', line):
+            content = re.sub(r'^[-*] ', '', line).strip()
+            current_slide["content"].append(content)
+        elif line:
+            current_slide["content"].append(line)
+    if current_slide["title"]:
+        slides.append(current_slide)
+    return slides
+
+
+def check_golden(parse, seeds):
+    mismatches = 0
+    for seed in seeds:
+        for text in (golden_corpus(seed), "# Title\n" + golden_corpus(seed), text_deck(200, seed)):
+            if repr([slide.record() for slide in parse(text)]) != repr(legacy_parse_input(text)):
+                print(f"MISMATCH on seed {seed}", file=sys.stderr)
+                mismatches += 1
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the compiled parser against the legacy parser.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 50000, 200000], help='Input sizes in lines')
+    parser.add_argument('--seeds', type=int, default=20, help='Golden corpus seeds to check')
+    args = parser.parse_args(argv)
+    # The golden corpus has malformed @chart lines on purpose; their specs
+    # are parsed now too and each failure would be logged
+    logging.disable(logging.ERROR)
+
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'])
+    mismatches = check_golden(generator.parse_input, range(args.seeds))
+    print(f"golden corpus: {args.seeds * 3} inputs, {mismatches} mismatches")
+
+    rows = []
+    for size in args.sizes:
+        text = "# Title\n" + golden_corpus(seed=size, lines=size)
+        legacy, _ = common.best_of(lambda: legacy_parse_input(text), repeat=3)
+        compiled, _ = common.best_of(lambda: generator.parse_input(text), repeat=3)
+        rows.append([size, f"{legacy * 1000:.1f}", f"{compiled * 1000:.1f}", f"{legacy / compiled:.2f}x"])
+    common.print_table(["lines", "legacy ms", "compiled ms", "speedup"], rows)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import common
+from corpus import text_deck
+from core.generator import SlideGenerator
+from core.pool import PresentationPool
+from templates.templates import TEMPLATES
+
+
+def latencies(make_generator, text, output, decks, pause):
+    setup, total = [], []
+    for _ in range(decks):
+        start = time.perf_counter()
+        generator = make_generator()
+        setup.append(time.perf_counter() - start)
+        generator.generate_presentation(text, output)
+        total.append(time.perf_counter() - start)
+        # Idle time between requests, as in a service, lets the pool refill
+        time.sleep(pause)
+    return setup, total
+
+
+def row(name, setup, total):
+    return [name, f"{total[0] * 1000:.1f}", f"{statistics.median(setup[1:]) * 1000:.2f}",
+            f"{statistics.median(total[1:]) * 1000:.1f}"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-deck latency with and without the presentation pool.')
+    parser.add_argument('--decks', type=int, default=50, help='Decks rendered per configuration')
+    parser.add_argument('--slides', type=int, default=5, help='Slides per deck')
+    parser.add_argument('--pause', type=float, default=0.01, help='Idle seconds between decks')
+    args = parser.parse_args(argv)
+
+    template = TEMPLATES['Sleek Black']
+    text = text_deck(args.slides - 1)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'out.pptx')
+        for master_mode in (False, True):
+            mode = "master" if master_mode else "per-slide"
+            rows.append(row(f"no pool, {mode}", *latencies(
+                lambda: SlideGenerator(template, master_mode=master_mode), text, output, args.decks, args.pause)))
+            pool = PresentationPool()
+            rows.append(row(f"pool, {mode}", *latencies(
+                lambda: pool.acquire(template, master_mode), text, output, args.decks, args.pause)))
+            pool.close()
+    common.print_table(["configuration", "first deck ms", "steady setup ms", "steady deck ms"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import common
+from corpus import image_deck
+from httpstub import ImageServer
+from core.fetcher import ImagePrefetcher
+from core.generator import SlideGenerator
+from core.image_cache import ImageCache
+from templates.templates import TEMPLATES
+
+
+def render(text, cache_dir, lookahead, output):
+    cache = ImageCache(cache_dir)
+    prefetcher = ImagePrefetcher(cache)
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'], image_cache=cache, prefetcher=prefetcher)
+    generator.prefetch_lookahead = lookahead
+    start = time.perf_counter()
+    generator.generate_presentation(text, output)
+    elapsed = time.perf_counter() - start
+    prefetcher.shutdown()
+    return elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serial vs prefetched image downloads against a slow local server.')
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 40, 160], help='Image slides per deck')
+    parser.add_argument('--latency', type=float, default=0.1, help='Server latency per request in seconds')
+    args = parser.parse_args(argv)
+
+    rows = []
+    with ImageServer(latency=args.latency) as server, tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'out.pptx')
+        for count in args.counts:
+            # Every URL is distinct and every run gets an empty cache, so each
+            # image really goes over the wire.
+            text = image_deck(count, server.url, seed=count, distinct=count)
+            serial = render(text, tempfile.mkdtemp(dir=tmp), 0, output)
+            prefetched = render(text, tempfile.mkdtemp(dir=tmp), 256, output)
+            rows.append([count, f"{serial:.2f}", f"{prefetched:.2f}", f"{serial / prefetched:.1f}x"])
+    common.print_table(["images", "serial s", "prefetch s", "speedup"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
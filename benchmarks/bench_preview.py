@@ -0,0 +1,59 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import common
+from corpus import text_deck, chart_deck
+from core.generator import SlideGenerator, iter_lines
+from templates.templates import TEMPLATES
+from utils.preview import SlidePreviewRenderer
+from utils.utils import convert_pptx_to_image
+
+
+def median_ms(func, items):
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Slide preview cost: in-process renderer vs LibreOffice.')
+    parser.add_argument('--slides', type=int, default=200, help='Slides in the deck')
+    parser.add_argument('--width', type=int, default=800, help='Preview width in pixels')
+    args = parser.parse_args(argv)
+
+    text = text_deck(args.slides // 2) + chart_deck(args.slides - args.slides // 2 - 1)
+    rows = []
+    for name in ('Elegant Blue', 'Sleek Black'):
+        template = TEMPLATES[name]
+        generator = SlideGenerator(template)
+        slides = list(generator.iter_slides(iter_lines(text)))
+        renderer = SlidePreviewRenderer(template, args.width)
+        renderer.render(slides[0])
+        per_slide = median_ms(renderer.render, slides)
+        start = time.perf_counter()
+        renderer.thumbnail_strip(slides)
+        strip = time.perf_counter() - start
+        rows.append([name, "in-process", f"{per_slide:.1f}", f"{strip:.2f}"])
+
+    if shutil.which('libreoffice') and shutil.which('convert'):
+        with tempfile.TemporaryDirectory() as tmp:
+            deck = os.path.join(tmp, 'deck.pptx')
+            SlideGenerator(TEMPLATES['Elegant Blue']).generate_presentation(text, deck)
+            start = time.perf_counter()
+            convert_pptx_to_image(deck, os.path.join(tmp, 'preview.png'))
+            rows.append(['Elegant Blue', "libreoffice", f"{(time.perf_counter() - start) * 1000:.1f}", "-"])
+    else:
+        print("libreoffice/ImageMagick not installed; skipping the subprocess baseline")
+    common.print_table(["template", "renderer", "ms per slide", f"strip of {len(slides)} s"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
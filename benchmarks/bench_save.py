@@ -0,0 +1,70 @@
+import argparse
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import common
+from corpus import mixed_deck
+from httpstub import ImageServer, make_jpeg
+from core.generator import SlideGenerator
+from core.image_cache import ImageCache
+from core.writer import save_presentation
+from templates.templates import TEMPLATES
+
+# Save time and package size of one rendered deck: python-pptx's own save
+# against core.writer at each deflate level, to a file and to a pipe, plus a
+# check that two saves of the same deck are byte-identical.
+
+
+def render(text, cache_dir):
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'], image_cache=ImageCache(cache_dir))
+    with tempfile.TemporaryDirectory() as tmp:
+        generator.generate_presentation(text, os.path.join(tmp, 'warmup.pptx'))
+    return generator.prs
+
+
+def save_to_pipe(save):
+    # A child process drains the pipe, so the writer sees an unseekable sink
+    reader = subprocess.Popen([sys.executable, '-c', 'import sys, shutil; shutil.copyfileobj(sys.stdin.buffer, '
+                               'open(__import__("os").devnull, "wb"))'], stdin=subprocess.PIPE)
+    save(reader.stdin)
+    reader.stdin.close()
+    reader.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Package save time and size per compression setting.')
+    parser.add_argument('--slides', type=int, default=500, help='Slides in the (mixed) deck')
+    parser.add_argument('--distinct', type=int, default=10, help='Distinct JPEG photos in the deck')
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp, ImageServer(factory=make_jpeg) as server:
+        prs = render(mixed_deck(args.slides, server.url, distinct=args.distinct), os.path.join(tmp, 'cache'))
+        path = os.path.join(tmp, 'out.pptx')
+        savers = [("python-pptx prs.save", prs.save)]
+        savers += [(f"writer, level {level}", lambda sink, level=level: save_presentation(prs, sink, level))
+                   for level in (0, 1, 6, 9)]
+        rows = []
+        for name, save in savers:
+            to_file, _ = common.best_of(lambda: save(path), repeat=args.repeat)
+            size = os.path.getsize(path)
+            to_pipe, _ = common.best_of(lambda: save_to_pipe(save), repeat=args.repeat)
+            digests = set()
+            for i in range(2):
+                if i:
+                    time.sleep(2)  # zip timestamps have a two-second resolution
+                sink = io.BytesIO()
+                save(sink)
+                digests.add(hashlib.sha256(sink.getvalue()).hexdigest())
+            rows.append([name, f"{to_file * 1000:.0f}", f"{to_pipe * 1000:.0f}", f"{size / 1024:.0f}",
+                         "yes" if len(digests) == 1 else "no"])
+        common.print_table(["save", "file ms", "pipe ms", "KiB", "deterministic"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
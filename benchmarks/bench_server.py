@@ -0,0 +1,105 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+import requests
+import common
+from corpus import text_deck, mixed_deck
+from httpstub import ImageServer
+
+# Load test of the HTTP rendering service: `--clients` concurrent clients
+# post decks back to back for `--duration` seconds at each concurrency level,
+# and the latency percentiles, throughput and refusals (429) are reported.
+# Starts its own server (python -m server) unless given --url.
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def start_server(workers, queue, timeout):
+    command = [sys.executable, '-m', 'server', '--port', '0', '-j', str(workers), '--timeout', str(timeout),
+               '--log-file', os.devnull]
+    if queue is not None:
+        command += ['--queue', str(queue)]
+    process = subprocess.Popen(command, cwd=common.SRC_DIR, stdout=subprocess.PIPE, text=True)
+    # "listening on http://host:port (...)"
+    url = process.stdout.readline().split()[2]
+    return process, url
+
+
+def load(url, body, params, clients, duration):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    stop = time.perf_counter() + duration
+
+    def client():
+        session = requests.Session()
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            response = session.post(f'{url}/render', data=body, params=params)
+            elapsed = time.perf_counter() - start
+            with lock:
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                if response.status_code == 200:
+                    latencies.append(elapsed)
+            if response.status_code == 429:
+                time.sleep(0.1)  # back off before retrying
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, statuses, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Latency and throughput of the rendering service under load.')
+    parser.add_argument('--url', help='Service to test (default: start one)')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(), help='Workers of the started server')
+    parser.add_argument('--queue', type=int, help='Queue length of the started server')
+    parser.add_argument('--timeout', type=float, default=60, help='Request timeout of the started server')
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 2, 4, 8, 16, 32, 64],
+                        help='Concurrency levels')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds per concurrency level')
+    parser.add_argument('--slides', type=int, default=20, help='Slides per deck')
+    parser.add_argument('--corpus', choices=['text', 'mixed'], default='text')
+    parser.add_argument('--template', default='Elegant Blue')
+    args = parser.parse_args(argv)
+
+    process = None
+    with ImageServer() as images:
+        deck = text_deck(args.slides) if args.corpus == 'text' else mixed_deck(args.slides, images.url)
+        url = args.url
+        if url is None:
+            process, url = start_server(args.workers, args.queue, args.timeout)
+        try:
+            # Warm every worker's template and image cache
+            load(url, deck.encode(), {'template': args.template}, args.workers, 1)
+            rows = []
+            for clients in args.clients:
+                latencies, statuses, elapsed = load(url, deck.encode(), {'template': args.template}, clients,
+                                                    args.duration)
+                others = sum(count for status, count in statuses.items() if status not in (200, 429))
+                rows.append([clients, len(latencies), f"{len(latencies) / elapsed:.1f}",
+                             f"{percentile(latencies, 0.5) * 1000:.0f}", f"{percentile(latencies, 0.99) * 1000:.0f}",
+                             statuses.get(429, 0), others])
+                print(f"{clients} clients done", file=sys.stderr, flush=True)
+            common.print_table(["clients", "decks", "decks/s", "p50 ms", "p99 ms", "429s", "errors"], rows)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
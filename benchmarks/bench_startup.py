@@ -0,0 +1,111 @@
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+import common
+
+# Cold start of the desktop app, each run in a fresh interpreter under
+# -X importtime: time from launch to the first painted window, to the
+# background warm-up finishing (generation usable), and the import time of
+# every dependency before that window. Launches that import the engine
+# before building the window, as the app used to, are measured alongside.
+
+# Runs in the child; prints "<event> <time.time()>" lines to stderr, among
+# the import times. The first paint is caught by an event filter, which sees
+# it before the window starts its warm-up.
+CHILD = r'''
+import os, sys, time
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+if {eager}:
+    import ui.worker, importlib
+    for name in ui.worker.WARMUP_MODULES:
+        importlib.import_module(name)
+from PyQt5.QtCore import QEvent, QObject
+from PyQt5.QtWidgets import QApplication
+from ui.ui import MainWindow
+
+def mark(event):
+    # One write, so the line cannot interleave with import time output
+    os.write(2, ('%s %r\n' % (event, time.time())).encode())
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            watched.removeEventFilter(self)
+            mark('window')
+        return False
+
+app = QApplication(sys.argv)
+window = MainWindow()
+window.warmup_worker.ready.connect(lambda: (mark('ready'), app.quit()))
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+app.exec_()
+window.close()
+'''
+
+DEPENDENCIES = ('PyQt5.QtWidgets', 'pptx', 'lxml.etree', 'PIL.Image', 'numpy', 'requests', 'xlsxwriter')
+
+
+def run_once(eager):
+    start = time.time()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD.format(eager=eager)],
+                            cwd=common.SRC_DIR, capture_output=True, text=True, timeout=120)
+    events = {}
+    imports = []
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:'):
+            if 'window' not in events:
+                imports.append(line)
+            continue
+        event, _, stamp = line.partition(' ')
+        if event in ('window', 'ready'):
+            events[event] = float(stamp) - start
+    if 'window' not in events or 'ready' not in events:
+        raise RuntimeError(f"app did not start:\n{result.stderr[-2000:]}")
+    return events['window'], events['ready'], import_costs(imports)
+
+
+def import_costs(lines):
+    # Microseconds spent importing each dependency (its root module's
+    # cumulative time, wherever it was first imported from) and in total
+    costs = {'total': 0}
+    for line in lines:
+        if 'cumulative' in line:
+            continue
+        _, cumulative_us, name = line.split('|')
+        module = name.strip()
+        if module in DEPENDENCIES:
+            costs[module] = int(cumulative_us)
+        if not name.startswith('  '):  # top level; nested imports are in their importer's time
+            costs['total'] += int(cumulative_us)
+    return costs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Desktop app cold start: time to first window and import costs.')
+    parser.add_argument('--repeat', type=int, default=5, help='Launches per mode; medians are reported')
+    args = parser.parse_args(argv)
+
+    rows = []
+    costs_by_mode = {}
+    for label, eager in (("engine imported up front", True), ("warm-up after first paint", False)):
+        runs = [run_once(eager) for _ in range(args.repeat)]
+        rows.append([label, f"{statistics.median(run[0] for run in runs) * 1000:.0f}",
+                     f"{statistics.median(run[1] for run in runs) * 1000:.0f}"])
+        costs_by_mode[label] = {key: statistics.median(run[2].get(key, 0) for run in runs)
+                                for key in set().union(*(run[2] for run in runs))}
+    common.print_table(["startup", "first window ms", "engine ready ms"], rows)
+    print()
+    print("Import time before the first window (ms), median:")
+    modes = list(costs_by_mode)
+    keys = [*DEPENDENCIES, 'total']
+    common.print_table(["module", *modes],
+                       [[key, *(f"{costs_by_mode[mode].get(key, 0) / 1000:.1f}" for mode in modes)] for key in keys])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
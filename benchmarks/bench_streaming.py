@@ -0,0 +1,90 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import common
+from corpus import text_deck
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def parse_buffered(path):
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    for _ in SlideGenerator(TEMPLATES['Elegant Blue']).parse_input(text):
+        pass
+
+
+def parse_streaming(path):
+    with open(path, encoding='utf-8') as f:
+        for _ in SlideGenerator(TEMPLATES['Elegant Blue']).iter_slides(f):
+            pass
+
+
+def render_buffered(path, output):
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'])
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    for slide_data in generator.parse_input(text):
+        generator.create_slide(slide_data)
+    generator.prs.save(output)
+
+
+def render_streaming(path, output):
+    generator = SlideGenerator(TEMPLATES['Elegant Blue'])
+    with open(path, encoding='utf-8') as f:
+        generator.generate_presentation(f, output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Peak memory of buffered vs streaming parse and render.')
+    parser.add_argument('--parse-sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help='Deck sizes in slides for the parse-only comparison')
+    parser.add_argument('--render-sizes', type=int, nargs='+', default=[250, 1000, 4000],
+                        help='Deck sizes in slides for the end-to-end comparison')
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = []
+        for size in args.parse_sizes:
+            path = os.path.join(tmp, f'deck{size}.md')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text_deck(size, bullets=8))
+            buffered = measure(lambda: parse_buffered(path))
+            streaming = measure(lambda: parse_streaming(path))
+            rows.append([size, f"{os.path.getsize(path) / 2**20:.1f}",
+                         f"{buffered[1]:.2f}", f"{streaming[1]:.2f}", f"{streaming[0] * 1000:.0f}"])
+        print("parse only (peak MiB traced)")
+        common.print_table(["slides", "input MiB", "buffered", "streaming", "stream ms"], rows)
+
+        rows = []
+        output = os.path.join(tmp, 'out.pptx')
+        for size in args.render_sizes:
+            path = os.path.join(tmp, f'deck{size}.md')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text_deck(size, bullets=8))
+            buffered = measure(lambda: render_buffered(path, output))
+            streaming = measure(lambda: render_streaming(path, output))
+            rows.append([size, f"{buffered[1]:.1f}", f"{streaming[1]:.1f}",
+                         f"{streaming[1] * 1024 / size:.1f}", f"{streaming[0]:.2f}"])
+        # The rendered Presentation itself still grows with the deck; what
+        # streaming removes is the input text and slide list on top of it.
+        print("\nend to end (peak MiB traced)")
+        common.print_table(["slides", "buffered", "streaming", "KiB/slide", "stream s"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
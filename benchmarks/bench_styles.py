@@ -0,0 +1,90 @@
+import argparse
+import sys
+import time
+import common
+from pptx import Presentation
+from pptx.dml.color import RGBColor
+from pptx.util import Pt, Inches
+from templates.templates import TEMPLATES
+
+
+def legacy_apply_style(template, slide):
+    # Template.apply_style before style plans, kept as the baseline
+    fill = slide.background.fill
+    if template.gradient:
+        fill.gradient()
+        fill.gradient_stops[0].color.rgb = RGBColor(*template.gradient[0])
+        fill.gradient_stops[1].color.rgb = RGBColor(*template.gradient[1])
+    else:
+        fill.solid()
+        fill.fore_color.rgb = RGBColor(*template.background_color)
+    if template.shape:
+        shape = slide.shapes.add_shape(template.shape, Inches(0), Inches(0), Inches(10), Inches(10))
+        shape.fill.solid()
+        shape.fill.fore_color.rgb = RGBColor(*template.theme_color)
+        shape.line.color.rgb = RGBColor(*template.theme_color)
+    for shp in slide.shapes:
+        if hasattr(shp, 'text_frame'):
+            for paragraph in shp.text_frame.paragraphs:
+                if shp == slide.shapes.title:
+                    paragraph.alignment = template.title_alignment
+                    font_size = template.title_font_size
+                    is_bold = template.title_bold
+                else:
+                    paragraph.alignment = template.content_alignment
+                    font_size = template.content_font_size
+                    is_bold = template.content_bold
+                for run in paragraph.runs:
+                    font = run.font
+                    font.name = template.font_family
+                    font.size = Pt(font_size)
+                    font.bold = is_bold
+                    if shp == slide.shapes.title:
+                        font.color.rgb = RGBColor(*template.theme_color)
+                    elif template.background_color == (255, 255, 255):
+                        font.color.rgb = RGBColor(0, 0, 0)
+                    else:
+                        font.color.rgb = RGBColor(255, 255, 255)
+                    paragraph.space_before = Pt(6)
+                    paragraph.space_after = Pt(6)
+
+
+def content_slides(count, bullets):
+    prs = Presentation()
+    slides = []
+    for i in range(count):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Slide {i}"
+        tf = slide.placeholders[1].text_frame
+        tf.text = "first bullet"
+        for j in range(bullets - 1):
+            tf.add_paragraph().text = f"bullet {j} with some text"
+        slides.append(slide)
+    return slides
+
+
+def time_per_slide(apply, slides):
+    start = time.perf_counter()
+    for slide in slides:
+        apply(slide)
+    return (time.perf_counter() - start) / len(slides)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Per-slide styling cost for every template.')
+    parser.add_argument('--slides', type=int, default=300, help='Content slides styled per measurement')
+    parser.add_argument('--bullets', type=int, default=6, help='Bullets per slide')
+    args = parser.parse_args(argv)
+
+    rows = []
+    for name, template in TEMPLATES.items():
+        legacy = time_per_slide(lambda slide: legacy_apply_style(template, slide),
+                                content_slides(args.slides, args.bullets))
+        planned = time_per_slide(template.apply_style, content_slides(args.slides, args.bullets))
+        rows.append([name, f"{legacy * 1e6:.0f}", f"{planned * 1e6:.0f}", f"{legacy / planned:.1f}x"])
+    common.print_table(["template", "legacy us/slide", "plan us/slide", "speedup"], rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
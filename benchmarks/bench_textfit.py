@@ -0,0 +1,80 @@
+import argparse
+import sys
+import time
+import common
+from corpus import text_deck
+from core import textfit
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+
+
+def pillow_line_count(font, text, width):
+    # Greedy wrap measuring every candidate line through Pillow, the way
+    # fitting would work without the glyph and word tables
+    words = text.split()
+    lines, current = 1, ""
+    for word in words:
+        candidate = f"{current} {word}" if current else word
+        if current and font.getlength(candidate) > width:
+            lines += 1
+            current = word
+        else:
+            current = candidate
+    return lines
+
+
+def fit_deck(generator, slides):
+    start = time.perf_counter()
+    fitted = list(generator.fit_slides(slides))
+    return time.perf_counter() - start, fitted
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Text-fit measurement cost per slide.')
+    parser.add_argument('--slides', type=int, default=5000, help='Slides in the deck')
+    parser.add_argument('--bullets', type=int, default=12, help='Most bullets per content slide')
+    parser.add_argument('--template', default='Elegant Blue')
+    args = parser.parse_args(argv)
+
+    template = TEMPLATES[args.template]
+    generator = SlideGenerator(template)
+    slides = list(generator.iter_slides(text_deck(args.slides, bullets=args.bullets).split('\n')))
+    paragraphs = [p for slide in slides if slide.type == "content" for p in slide.content]
+
+    rows = []
+    textfit.font_metrics.cache_clear()
+    cold, fitted = fit_deck(generator, slides)
+    rows.append(["split, cold tables", f"{cold * 1000:.0f}", f"{cold / len(slides) * 1e6:.1f}", len(fitted)])
+    warm, fitted = common.best_of(lambda: fit_deck(generator, slides)[1], repeat=3)
+    rows.append(["split, warm tables", f"{warm * 1000:.0f}", f"{warm / len(slides) * 1e6:.1f}", len(fitted)])
+    word_cache_size, textfit.WORD_CACHE_SIZE = textfit.WORD_CACHE_SIZE, 0
+    textfit.font_metrics.cache_clear()
+    glyphs_only, fitted = common.best_of(lambda: fit_deck(generator, slides)[1], repeat=3)
+    textfit.WORD_CACHE_SIZE = word_cache_size
+    rows.append(["split, glyph table only", f"{glyphs_only * 1000:.0f}", f"{glyphs_only / len(slides) * 1e6:.1f}",
+                 len(fitted)])
+    generator.overflow = textfit.SHRINK
+    shrink, fitted = common.best_of(lambda: fit_deck(generator, slides)[1], repeat=3)
+    rows.append(["shrink, warm tables", f"{shrink * 1000:.0f}", f"{shrink / len(slides) * 1e6:.1f}", len(fitted)])
+
+    # The same line counts measured through Pillow for every line
+    style = template.plan.roles['body']
+    box = generator._text_fitter.boxes['content']
+    # One pixel per point
+    font = textfit.load_font(style.font_family, round(style.size.pt), bool(style.bold), bool(style.italic))
+    start = time.perf_counter()
+    expected = [pillow_line_count(font, p, box.width) for p in paragraphs]
+    pillow = time.perf_counter() - start
+    rows.append(["Pillow per line (line counts only)", f"{pillow * 1000:.0f}",
+                 f"{pillow / len(slides) * 1e6:.1f}", "-"])
+    common.print_table(["measurement", "deck ms", "us/slide", "slides out"], rows)
+
+    metrics = textfit.font_metrics(style.font_family, style.bold, style.italic)
+    counts = [metrics.line_count(p, box.width / style.size.pt) for p in paragraphs]
+    agree = sum(a == b for a, b in zip(counts, expected))
+    print(f"{len(paragraphs)} paragraphs; line counts agree with Pillow for {agree / len(paragraphs):.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import random
+
+# Synthetic markdown inputs for the benchmarks. Every generator is seeded so
+# a given (size, seed) pair always produces the same deck.
+
+WORDS = (
+    "revenue growth quarter pipeline latency throughput customer region forecast "
+    "margin churn retention budget roadmap milestone release incident capacity"
+).split()
+
+# Lines that exercise the corners of the markdown grammar.
+EDGE_CASE_LINES = [
+    "# ", "#", "#  spaced title  ", "##", "## ", "###  deep", "#no-space",
+    "- ", "-", "* star", "*bold*", "-dash", "--", "> ", ">quote", ">  quoted  ",
+    "![](x)", "![alt](http://a/b.png) trailing", "![a](b)(c)", "![a](b", "!not an image",
+    "@chart {Categories: A,B; S1: 1,2}", "@chart{x}", "@chart {}", "@chart {a}{b}", "@chartx",
+    "\t- tabbed bullet", "   # indented title", "plain text", "1. numbered", "• bullet",
+    "# title with # hash", "- bullet with > quote", "\r", "   ", "",
+]
+
+
+def _sentence(rng, words=6):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, words))).capitalize()
+
+
+def text_deck(slides, seed=0, bullets=5):
+    rng = random.Random(seed)
+    lines = [f"# {_sentence(rng)}", f"## {_sentence(rng)}"]
+    for i in range(slides):
+        if i % 10 == 9:
+            lines.append(f"## {_sentence(rng)}")
+        else:
+            lines.append(f"# {_sentence(rng)}")
+            lines.extend(f"- {_sentence(rng, 12)}" for _ in range(rng.randint(1, bullets)))
+    return "\n".join(lines) + "\n"
+
+
+def chart_deck(slides, seed=0, points=6):
+    rng = random.Random(seed)
+    lines = [f"# {_sentence(rng)}"]
+    for _ in range(slides):
+        categories = ",".join(str(2000 + j) for j in range(points))
+        series = ",".join(str(rng.randint(1, 100)) for _ in range(points))
+        lines.append(f"# {_sentence(rng)}")
+        lines.append(f"@chart {{Categories: {categories}; Series1: {series}}}")
+    return "\n".join(lines) + "\n"
+
+
+def image_deck(slides, base_url, seed=0, distinct=10):
+    rng = random.Random(seed)
+    lines = [f"# {_sentence(rng)}"]
+    for i in range(slides):
+        lines.append(f"# {_sentence(rng)}")
+        lines.append(f"![figure {i}]({base_url}/image{i % distinct}.png)")
+    return "\n".join(lines) + "\n"
+
+
+def mixed_deck(slides, base_url, seed=0, distinct=10, points=6):
+    # Mostly bullet slides, with a section, an image, a chart and a quote
+    # in every ten
+    rng = random.Random(seed)
+    lines = [f"# {_sentence(rng)}", f"## {_sentence(rng)}"]
+    for i in range(slides):
+        kind = i % 10
+        if kind == 9:
+            lines.append(f"## {_sentence(rng)}")
+        elif kind == 3:
+            lines.append(f"![figure {i}]({base_url}/image{i % distinct}.png)")
+        elif kind == 6:
+            series = ",".join(str(rng.randint(1, 100)) for _ in range(points))
+            lines.append(f"@chart {{Series1: {series}}}")
+        elif kind == 8:
+            lines.append(f"> {_sentence(rng, 12)}")
+        else:
+            lines.append(f"# {_sentence(rng)}")
+            lines.extend(f"- {_sentence(rng, 12)}" for _ in range(rng.randint(1, 5)))
+    return "\n".join(lines) + "\n"
+
+
+def golden_corpus(seed=0, lines=20000):
+    rng = random.Random(seed)
+    out = []
+    for _ in range(lines):
+        roll = rng.random()
+        if roll < 0.15:
+            out.append(rng.choice(EDGE_CASE_LINES))
+        elif roll < 0.25:
+            out.append(f"# {_sentence(rng)}")
+        elif roll < 0.3:
+            out.append(f"## {_sentence(rng)}")
+        elif roll < 0.33:
+            out.append(f"![{_sentence(rng)}](http://example.com/{rng.randint(0, 99)}.png)")
+        elif roll < 0.36:
+            out.append(f"@chart {{Categories: A,B,C; S1: {rng.randint(0, 9)},2,3}}")
+        elif roll < 0.4:
+            out.append(f"> {_sentence(rng)}")
+        elif roll < 0.8:
+            out.append(f"{rng.choice('-*')} {_sentence(rng, 12)}")
+        else:
+            out.append(_sentence(rng, 12))
+    return "\n".join(out)
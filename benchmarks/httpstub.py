@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from PIL import Image
+
+# Local stand-in for an image host: /image<N>.png serves a generated PNG with
+# ETag/Last-Modified validators, after an optional artificial latency.
+
+
+def make_png(index, size=(320, 240)):
+    image = Image.new('RGB', size, ((index * 47) % 256, (index * 91) % 256, (index * 13) % 256))
+    output = BytesIO()
+    image.save(output, 'PNG')
+    return output.getvalue()
+
+
+def make_jpeg(index, size=(4000, 3000)):
+    image = Image.effect_noise(size, 64).convert('RGB')
+    image.paste(((index * 47) % 256, 0, 0), (0, 0, size[0] // 4, size[1] // 4))
+    output = BytesIO()
+    image.save(output, 'JPEG', quality=90)
+    return output.getvalue()
+
+
+class ImageServer:
+    def __init__(self, latency=0.0, factory=make_png):
+        self.latency = latency
+        self.factory = factory
+        self.requests = 0
+        self.not_modified = 0
+        self._images = {}
+        self._last_modified = formatdate(usegmt=True)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def image(self, index):
+        with self._lock:
+            if index not in self._images:
+                self._images[index] = self.factory(index)
+            return self._images[index]
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                name = self.path.rsplit('/', 1)[-1]
+                if not name.startswith('image'):
+                    self.send_error(404)
+                    return
+                body = stub.image(int(''.join(c for c in name if c.isdigit()) or 0))
+                etag = '"%s"' % hashlib.md5(body).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    with stub._lock:
+                        stub.not_modified += 1
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg' if body[:2] == b'\xff\xd8' else 'image/png')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', stub._last_modified)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,202 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import common
+from corpus import text_deck, chart_deck, image_deck, mixed_deck
+from httpstub import ImageServer
+from core import profiling
+from core.fetcher import ImagePrefetcher
+from core.generator import SlideGenerator
+from core.image_cache import ImageCache
+from templates.templates import TEMPLATES
+
+# Regression suite for the generator. Every (corpus, size, template) case
+# runs in a fresh process, so peak RSS is the case's own, and its timings
+# are the best of --repeat runs (fewer once a case has run for --budget
+# seconds). `run` writes the results as JSON; `compare` checks results
+# against a baseline and fails on regressions:
+#
+#   python suite.py run --output baseline.json
+#   ... change the code ...
+#   python suite.py run --output new.json
+#   python suite.py compare baseline.json new.json --threshold 0.1
+#
+# baseline.json is committed: the text, image, chart and mixed corpora at 10,
+# 100 and 1000 slides on two templates, recorded with
+#
+#   python suite.py run --sizes 10 100 1000 --templates 'Elegant Blue' 'Ocean Teal' --output baseline.json
+#
+# Compare against it with results of the same cases, run on the same
+# machine (see its "meta"); otherwise record a baseline of your own first.
+#
+# Back-to-back runs of unchanged code differ by up to about 10% on small
+# cases, hence the default 15% threshold and 20ms floor for timings.
+#
+# Image decks are served by a local HTTP stand-in and fetched into an empty
+# image cache on every run.
+
+CORPORA = {
+    'text': lambda size, base_url: text_deck(size),
+    'image': lambda size, base_url: image_deck(size, base_url),
+    'chart': lambda size, base_url: chart_deck(size),
+    'mixed': lambda size, base_url: mixed_deck(size, base_url),
+}
+SIZES = [10, 100, 1000, 10000]
+# All metrics are lower-is-better
+METRICS = ('parse_s', 'create_slide_s', 'apply_style_s', 'save_s', 'end_to_end_s', 'peak_rss_bytes', 'output_bytes')
+TIME_METRICS = tuple(metric for metric in METRICS if metric.endswith('_s'))
+
+
+def case_key(corpus, size, template):
+    return f"{corpus}/{size}/{template}"
+
+
+def run_case(corpus, size, template_name, base_url, repeat, budget):
+    text = CORPORA[corpus](size, base_url)
+    template = TEMPLATES[template_name]
+    best = {}
+    case_start = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, 'out.pptx')
+        for i in range(repeat):
+            cache = ImageCache(os.path.join(tmp, f'cache{i}'))
+            prefetcher = ImagePrefetcher(cache)
+            generator = SlideGenerator(template, image_cache=cache, prefetcher=prefetcher)
+            start = time.perf_counter()
+            generator.parse_input(text)
+            parse = time.perf_counter() - start
+            report = generator.generate_presentation(text, output)
+            prefetcher.shutdown()
+            stages = report['stages']
+            measured = {
+                'parse_s': parse,
+                # Filling and styling slides, i.e. everything but parsing and saving
+                'create_slide_s': sum(entry['seconds'] for entry in report['slide_types'].values()),
+                'apply_style_s': stages.get('apply_style', {}).get('seconds', 0.0),
+                'save_s': stages['save']['seconds'],
+                'end_to_end_s': report['seconds'],
+            }
+            for metric, value in measured.items():
+                best[metric] = min(best.get(metric, value), value)
+            best['runs'] = i + 1
+            # Large decks are slow and steady: fewer runs suffice
+            if time.perf_counter() - case_start > budget:
+                break
+        best['output_bytes'] = os.path.getsize(output)
+        best['slides'] = report['slides']
+    best['peak_rss_bytes'] = profiling.peak_rss()
+    return best
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(args):
+    cases = [(corpus, size, template) for corpus in args.corpora for size in args.sizes for template in args.templates]
+    results = {}
+    with ImageServer() as server:
+        for corpus, size, template in cases:
+            # One process per case: a clean heap for the RSS figure
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(run_case, corpus, size, template, server.url, args.repeat,
+                                         args.budget).result()
+            key = case_key(corpus, size, template)
+            results[key] = result
+            print(f"{key:40s} {result['slides']:6d} slides  end-to-end {result['end_to_end_s']:8.3f}s  "
+                  f"save {result['save_s']:7.3f}s  rss {result['peak_rss_bytes'] / 2**20:6.0f} MiB  "
+                  f"{result['output_bytes'] / 1024:8.0f} KiB", flush=True)
+    document = {
+        'meta': {
+            'created': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'repeat': args.repeat,
+            'budget': args.budget,
+        },
+        'cases': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+        f.write('\n')
+    print(f"wrote {len(results)} cases to {args.output}")
+    return 0
+
+
+def compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)['cases']
+    with open(args.results, encoding='utf-8') as f:
+        results = json.load(f)['cases']
+    rows = []
+    regressions = 0
+    for key in sorted(set(baseline) & set(results)):
+        for metric in args.metrics:
+            old, new = baseline[key].get(metric), results[key].get(metric)
+            if old is None or new is None:
+                continue
+            # Differences below the noise floor never count, whatever the ratio
+            floor = args.min_seconds if metric in TIME_METRICS else 0
+            # Anything up from zero (a stage that took no time, say) is an
+            # unbounded increase
+            if old:
+                change = (new - old) / old
+            else:
+                change = float('inf') if new > 0 else 0.0
+            regressed = change > args.threshold and new - old > floor
+            if regressed or args.verbose:
+                regressions += regressed
+                rows.append([key, metric, f"{old:.4g}", f"{new:.4g}", f"{change:+.1%}" if old else "from 0",
+                             "REGRESSION" if regressed else ""])
+    if rows:
+        common.print_table(["case", "metric", "baseline", "new", "change", ""], rows)
+    missing = sorted(set(baseline) - set(results))
+    if missing:
+        print(f"{len(missing)} baseline cases were not run")
+    print(f"{regressions} regressions over {args.threshold:.0%} in {len(set(baseline) & set(results))} cases")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generator benchmark suite with JSON baselines.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the suite and write its results as JSON')
+    run_parser.add_argument('--corpora', nargs='+', default=list(CORPORA), choices=list(CORPORA))
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=SIZES, help='Slides per deck')
+    run_parser.add_argument('--templates', nargs='+', default=list(TEMPLATES), choices=list(TEMPLATES),
+                            metavar='TEMPLATE')
+    run_parser.add_argument('--repeat', type=int, default=5, help='Runs per case; timings are the best run')
+    run_parser.add_argument('--budget', type=float, default=30,
+                            help='Seconds after which a case stops repeating (default: %(default)s)')
+    run_parser.add_argument('-o', '--output', default='results.json')
+
+    compare_parser = commands.add_parser('compare', help='Fail if results regressed against a baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('results')
+    compare_parser.add_argument('--threshold', type=float, default=0.15,
+                                help='Allowed relative increase per metric (default: %(default)s)')
+    compare_parser.add_argument('--min-seconds', type=float, default=0.02,
+                                help='Timing increases smaller than this are noise (default: %(default)s)')
+    compare_parser.add_argument('--metrics', nargs='+', default=list(METRICS), choices=METRICS)
+    compare_parser.add_argument('-v', '--verbose', action='store_true', help='List every compared metric')
+
+    args = parser.parse_args(argv)
+    return run(args) if args.command == 'run' else compare(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,16 @@
+import os
 import sys
 from cx_Freeze import setup, Executable
 
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+
 build_exe_options = {
-    "packages": ["os", "sys", "PyQt5", "pptx"],
+    "path": [SRC_DIR] + sys.path,
+    "packages": ["os", "sys", "PyQt5", "pptx", "lxml", "PIL", "numpy", "requests", "xlsxwriter"],
+    # Imported by name in the background after the window is shown (see
+    # ui.worker.WARMUP_MODULES), which the import scanner cannot see
+    "includes": ["templates.templates", "core.generator", "core.live_parser", "core.pool", "core.slide_cache", "core.parse_cache",
+                 "core.image_cache", "utils.preview"],
     "include_files": [("assets/icon.ico", "icon.ico")],
 }
 
@@ -15,5 +23,5 @@ setup(
     version="1.0",
     description="Generate PowerPoint presentations from text",
     options={"build_exe": build_exe_options},
-    executables=[Executable("src/app.py", base=base, icon="assets/icon.ico")]
+    executables=[Executable("src/main.py", base=base, icon="assets/icon.ico")]
 )
\ No newline at end of file
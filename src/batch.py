@@ -0,0 +1,171 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from core import profiling
+from core.generator import SlideGenerator
+from core.logs import DEFAULT_LOG_FILE, configure_logging
+from core.parallel import ParallelRenderer
+from core.render import init_worker, output_paths_for, render_deck
+from core.textfit import OVERFLOW_MODES, SPLIT
+from core.writer import DEFAULT_COMPRESS_LEVEL
+from templates.templates import TEMPLATES
+from utils.office import OfficeError, default_office
+
+INPUT_EXTENSIONS = ('.md', '.markdown', '.txt')
+
+
+def collect_inputs(paths, manifest=None):
+    inputs = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.lower().endswith(INPUT_EXTENSIONS):
+                    inputs.append(os.path.join(path, name))
+        else:
+            inputs.append(path)
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    inputs.append(os.path.join(base_dir, line))
+    return inputs
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog='batch', description='Render markdown inputs to PowerPoint decks in parallel.')
+    parser.add_argument('inputs', nargs='*', help='Markdown files or directories of markdown files')
+    parser.add_argument('-m', '--manifest', help='File listing one input path per line')
+    parser.add_argument('-t', '--template', default='Elegant Blue', choices=sorted(TEMPLATES),
+                        help='Template name (default: %(default)s)')
+    parser.add_argument('-o', '--output-dir', default='.', help='Directory for the generated .pptx files')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Number of worker processes (default: all cores)')
+    parser.add_argument('--split-sections', action='store_true',
+                        help='Render one deck at a time, split at its sections across the workers '
+                             '(for a few very large decks)')
+    parser.add_argument('--master', action='store_true',
+                        help='Write the template into the slide master once instead of styling every slide')
+    parser.add_argument('--append-to', metavar='DECK.pptx',
+                        help='Append the slides of each input to a copy of this deck, keeping its slides, '
+                             'layouts and media as they are')
+    parser.add_argument('--overflow', default=SPLIT, choices=[*OVERFLOW_MODES, 'off'],
+                        help='What to do with slides whose text overflows the body (default: %(default)s)')
+    parser.add_argument('--compress-level', type=int, default=DEFAULT_COMPRESS_LEVEL, choices=range(10),
+                        metavar='0-9', help='Deflate level of XML parts, 0 stores them (default: %(default)s)')
+    parser.add_argument('--pdf', action='store_true',
+                        help='Also export each deck to PDF through a warm LibreOffice pool')
+    parser.add_argument('--profile', metavar='REPORT.json',
+                        help='Write per-stage timings of every deck and their totals as JSON')
+    parser.add_argument('--cprofile', metavar='DIR',
+                        help='Dump a cProfile of every deck into DIR (of the merging process with --split-sections)')
+    parser.add_argument('--log-file', default=DEFAULT_LOG_FILE,
+                        help='JSON-lines log of failures and per-deck profiles (default: %(default)s)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only report failures and the summary')
+    args = parser.parse_args(argv)
+    if args.append_to and (args.master or args.split_sections):
+        parser.error("--append-to cannot be combined with --master or --split-sections")
+    return args
+
+
+def render_decks(outputs, args):
+    # A deck per worker; results in completion order
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker,
+                             initargs=(args.template, args.master,
+                                       None if args.overflow == 'off' else args.overflow,
+                                       args.log_file, args.cprofile, args.compress_level,
+                                       args.append_to)) as executor:
+        futures = [executor.submit(render_deck, path, output_path) for path, output_path in outputs.items()]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def render_split_decks(outputs, args):
+    # A deck at a time, its sections spread over the workers
+    generator = SlideGenerator(TEMPLATES[args.template], master_mode=args.master,
+                               overflow=None if args.overflow == 'off' else args.overflow)
+    generator.compress_level = args.compress_level
+    with ParallelRenderer(args.workers, args.log_file) as renderer:
+        for path, output_path in outputs.items():
+            if args.cprofile:
+                stem = os.path.splitext(os.path.basename(output_path))[0]
+                generator.cprofile_path = os.path.join(args.cprofile, stem + '.prof')
+            yield renderer.render_deck(generator, path, output_path)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    inputs = collect_inputs(args.inputs, args.manifest)
+    if not inputs:
+        print("No input files found.", file=sys.stderr)
+        return 2
+    try:
+        outputs = output_paths_for(inputs, args.output_dir)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    for output_dir in {os.path.dirname(path) for path in outputs.values()}:
+        os.makedirs(output_dir, exist_ok=True)
+    if args.cprofile:
+        os.makedirs(args.cprofile, exist_ok=True)
+    if args.log_file:
+        configure_logging(args.log_file)
+    office = None
+    if args.pdf:
+        try:
+            office = default_office()
+        except OfficeError as e:
+            print(f"Cannot export PDF: {e}", file=sys.stderr)
+            return 2
+
+    failures = 0
+    slides = 0
+    pdf_futures = {}
+    pdf_failures = 0
+    profiles = []
+    start = time.perf_counter()
+    try:
+        results = render_split_decks(outputs, args) if args.split_sections else render_decks(outputs, args)
+        for result in results:
+            if result.error:
+                failures += 1
+                print(f"FAIL {result.seconds:8.3f}s  {result.input_path}: {result.error}", file=sys.stderr)
+                continue
+            slides += result.slides
+            profiles.append(result.profile)
+            if not args.quiet:
+                print(f"ok   {result.seconds:8.3f}s  {result.slides:5d} slides  {result.output_path}")
+            if office is not None:
+                pdf_futures[office.submit_pdf(result.output_path)] = result.output_path
+        # PDF exports overlap with rendering; wait for the stragglers
+        for future, output_path in pdf_futures.items():
+            try:
+                pdf_path = future.result()
+            except Exception as e:
+                pdf_failures += 1
+                print(f"FAIL pdf  {output_path}: {e}", file=sys.stderr)
+                continue
+            if not args.quiet:
+                print(f"pdf  {pdf_path}")
+        elapsed = time.perf_counter() - start
+    finally:
+        # Also on errors and Ctrl-C, so no headless soffice is left running
+        if office is not None:
+            office.close()
+    rendered = len(inputs) - failures
+    print(f"{rendered} decks, {slides} slides, {failures} failed in {elapsed:.2f}s "
+          f"({rendered / elapsed:.1f} decks/s, {slides / elapsed:.1f} slides/s)")
+    if pdf_failures:
+        print(f"{pdf_failures} PDF exports failed", file=sys.stderr)
+    if args.profile:
+        profiling.write_report({'seconds': round(elapsed, 6), 'totals': profiling.merge_reports(profiles),
+                                'decks': profiles}, args.profile)
+    return 1 if failures or pdf_failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import os
+import zipfile
+from io import BytesIO
+from lxml import etree
+from pptx import Presentation
+from pptx.opc.constants import RELATIONSHIP_TARGET_MODE as RTM
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI, PackURI
+from pptx.opc.spec import default_content_types
+from pptx.oxml import parse_xml
+from core.generator import LAYOUT_INDEXES
+from core.slide_parts import MAX_SLIDE_ID, MIN_SLIDE_ID, PARTNAME_NUMBER
+from core.writer import DEFAULT_COMPRESS_LEVEL, PRECOMPRESSED_EXTENSIONS, _member_writer, copy_member
+
+# Appending generated slides to an existing deck without loading all of it.
+# Only the deck's skeleton is loaded: the presentation part without its
+# slides, and what it relates to otherwise (masters, layouts, themes,
+# properties), which is all new slides are built on. Saving writes a copy of
+# the deck in which every member is copied as it is stored, without being
+# decompressed, except the content types and the presentation part and its
+# relationships, which gain the new slides; the new slides and their parts
+# follow. Time and memory grow with the new slides, not with the size of
+# the deck's slides and media.
+#
+#   generator = SlideGenerator(template, base_deck=BaseDeck('big.pptx'))
+#   generator.generate_presentation(text, 'big-appended.pptx')
+
+# Layouts SlideGenerator uses, by their names in Office's default template,
+# for decks whose layouts are not in python-pptx's order (LAYOUT_INDEXES,
+# used for any name the deck lacks)
+LAYOUT_NAMES = {'title': 'Title Slide', 'content': 'Title and Content', 'section': 'Section Header',
+                'image': 'Title Only', 'chart': 'Title Only', 'quote': 'Title and Content'}
+
+P14_SECTION_LST = '{http://schemas.microsoft.com/office/powerpoint/2010/main}sectionLst'
+P14_SLD_ID = '{http://schemas.microsoft.com/office/powerpoint/2010/main}sldId'
+
+
+class BaseDeck:
+    # An existing .pptx that slides are appended to (see SlideGenerator's
+    # base_deck). `prs` is its skeleton, which the slides are added to, and
+    # `layouts` the layout for each slide type. The file must stay in place
+    # until the appended deck is saved.
+
+    def __init__(self, path):
+        self.path = path
+        with zipfile.ZipFile(path) as source:
+            self.partnames = {PackURI('/' + name) for name in source.namelist()}
+            self.presentation_partname = self._main_partname(source)
+            self.skeleton = self._skeleton_partnames(source)
+            self.prs = Presentation(BytesIO(self._skeleton_package(source)))
+        self.layouts = self._layouts()
+
+    def save(self, prs, sink, compress_level=DEFAULT_COMPRESS_LEVEL):
+        # Writes the deck with the slides of `prs` (its skeleton) appended
+        # to `sink`, a path or a binary file object open for writing
+        if isinstance(sink, str) and os.path.exists(sink) and os.path.samefile(sink, self.path):
+            raise ValueError("an appended deck cannot be written over its base deck")
+        slides = [prs.part.related_part(sld_id.rId) for sld_id in prs.slides._sldIdLst]
+        parts = self._new_parts(slides)
+        with zipfile.ZipFile(self.path) as source, zipfile.ZipFile(sink, 'w') as archive:
+            presentation, rels = self._presentation_xml(source, slides)
+            rewritten = {
+                self.presentation_partname.membername: presentation,
+                self.presentation_partname.rels_uri.membername: rels,
+            }
+            write = _member_writer(archive, compress_level)
+            write(CONTENT_TYPES_URI.membername, self._content_types_xml(source, parts))
+            for info in source.infolist():
+                if info.filename == CONTENT_TYPES_URI.membername:
+                    continue
+                if info.filename in rewritten:
+                    write(info.filename, rewritten.pop(info.filename))
+                else:
+                    copy_member(source, info, archive)
+            for name, data in rewritten.items():
+                write(name, data)
+            for part in parts:
+                write(part.partname.membername, part.blob, part.partname.ext.lower() in PRECOMPRESSED_EXTENSIONS)
+                if part._rels:
+                    write(part.partname.rels_uri.membername, part.rels.xml)
+
+    def _main_partname(self, source):
+        for rel in self._rels(source, PACKAGE_URI):
+            if rel.reltype == RT.OFFICE_DOCUMENT:
+                return PackURI.from_rel_ref(PACKAGE_URI.baseURI, rel.target_ref)
+        raise ValueError(f"{self.path} has no presentation part")
+
+    def _rels(self, source, partname):
+        name = partname.rels_uri.membername
+        if PackURI('/' + name) not in self.partnames:
+            return []
+        return parse_xml(source.read(name)).relationship_lst
+
+    def _skeleton_partnames(self, source):
+        # Parts reachable from the package other than through the slides
+        skeleton, pending = set(), [PACKAGE_URI]
+        while pending:
+            partname = pending.pop()
+            for rel in self._rels(source, partname):
+                if rel.targetMode == RTM.EXTERNAL:
+                    continue
+                if partname == self.presentation_partname and rel.reltype == RT.SLIDE:
+                    continue
+                target = PackURI.from_rel_ref(partname.baseURI, rel.target_ref)
+                if target not in skeleton and target in self.partnames:
+                    skeleton.add(target)
+                    pending.append(target)
+        return skeleton
+
+    def _skeleton_package(self, source):
+        # The skeleton as a package of its own, for python-pptx to open. The
+        # presentation part keeps everything but its slide list.
+        presentation = parse_xml(source.read(self.presentation_partname.membername))
+        if presentation.sldIdLst is not None:
+            presentation.remove(presentation.sldIdLst)
+        rels = parse_xml(source.read(self.presentation_partname.rels_uri.membername))
+        for rel in rels.relationship_lst:
+            if rel.reltype == RT.SLIDE:
+                rels.remove(rel)
+        output = BytesIO()
+        with zipfile.ZipFile(output, 'w') as archive:
+            for name in (CONTENT_TYPES_URI.membername, PACKAGE_URI.rels_uri.membername):
+                archive.writestr(name, source.read(name))
+            for partname in sorted(self.skeleton):
+                rels_name = partname.rels_uri.membername
+                if partname == self.presentation_partname:
+                    archive.writestr(partname.membername, serialize_part_xml(presentation))
+                    archive.writestr(rels_name, rels.xml_file_bytes)
+                    continue
+                archive.writestr(partname.membername, source.read(partname.membername))
+                if PackURI('/' + rels_name) in self.partnames:
+                    archive.writestr(rels_name, source.read(rels_name))
+        return output.getvalue()
+
+    def _layouts(self):
+        layouts = list(self.prs.slide_layouts)
+        by_name = {}
+        for layout in layouts:
+            by_name.setdefault(layout.name, layout)
+        return {kind: by_name.get(LAYOUT_NAMES[kind]) or layouts[min(index, len(layouts) - 1)]
+                for kind, index in LAYOUT_INDEXES.items()}
+
+    def _new_parts(self, slides):
+        # The slides and every part they relate to outside the skeleton, in
+        # partname order. Parts named like a member of the deck, as the new
+        # slides are (numbered from 1 in the skeleton), are renamed.
+        parts, seen, pending = [], set(), list(slides)
+        while pending:
+            part = pending.pop()
+            if id(part) in seen:
+                continue
+            seen.add(id(part))
+            parts.append(part)
+            for rel in part.rels.values():
+                if not rel.is_external and rel.target_part.partname not in self.skeleton:
+                    pending.append(rel.target_part)
+        taken = set(self.partnames)
+        renamed = []
+        for part in parts:
+            if part.partname in taken:
+                renamed.append(part)
+            else:
+                taken.add(part.partname)
+        next_number = {}  # partname template: next number to try
+        for part in sorted(renamed, key=lambda part: part.partname):
+            template = PARTNAME_NUMBER.sub('%d', part.partname)
+            number = next_number.get(template, 1)
+            while template % number in taken:
+                number += 1
+            next_number[template] = number + 1
+            part.partname = PackURI(template % number)
+            taken.add(part.partname)
+        return sorted(parts, key=lambda part: part.partname)
+
+    def _presentation_xml(self, source, slides):
+        # The deck's presentation part and its relationships with `slides`
+        # added at the end of the slide list, and of the last section if the
+        # deck has sections
+        presentation = parse_xml(source.read(self.presentation_partname.membername))
+        rels = parse_xml(source.read(self.presentation_partname.rels_uri.membername))
+        rIds = {rel.rId for rel in rels.relationship_lst}
+        sld_id_lst = presentation.get_or_add_sldIdLst()
+        # Slides reordered in PowerPoint keep their ids, so the last id is not
+        # necessarily the largest
+        next_id = max((int(sld_id.get('id')) + 1 for sld_id in sld_id_lst), default=MIN_SLIDE_ID)
+        sections = next(presentation.iter(P14_SECTION_LST), None)
+        section = sections[-1] if sections is not None and len(sections) else None
+        section_sld_id_lst = section[0] if section is not None and len(section) else None
+        number = 0
+        for slide in slides:
+            number += 1
+            while f'rId{number}' in rIds:
+                number += 1
+            rId = f'rId{number}'
+            rels.add_rel(rId, RT.SLIDE, slide.partname.relative_ref(self.presentation_partname.baseURI))
+            # Numbered on from the largest id; past MAX_SLIDE_ID python-pptx
+            # looks for a free one
+            if next_id > MAX_SLIDE_ID:
+                sld_id = sld_id_lst.add_sldId(rId)
+            else:
+                sld_id = sld_id_lst._add_sldId(id=next_id, rId=rId)
+                next_id += 1
+            if section_sld_id_lst is not None:
+                etree.SubElement(section_sld_id_lst, P14_SLD_ID, id=sld_id.get('id'))
+        return serialize_part_xml(presentation), rels.xml_file_bytes
+
+    def _content_types_xml(self, source, parts):
+        types = parse_xml(source.read(CONTENT_TYPES_URI.membername))
+        defaults = {default.extension.lower(): default.contentType for default in types.default_lst}
+        for part in parts:
+            ext = part.partname.ext.lower()
+            if defaults.get(ext) == part.content_type:
+                continue
+            if ext not in defaults and (ext, part.content_type) in default_content_types:
+                types.add_default(ext, part.content_type)
+                defaults[ext] = part.content_type
+            else:
+                types.add_override(part.partname, part.content_type)
+        return serialize_part_xml(types)
@@ -0,0 +1,275 @@
+import datetime
+import os
+from collections import namedtuple
+from contextlib import contextmanager
+import numpy as np
+from pptx.chart.data import Categories, CategoryChartData, XyChartData
+from pptx.chart.xlsx import CategoryWorkbookWriter, XyWorkbookWriter
+from pptx.enum.chart import XL_CHART_TYPE
+from pptx.util import lazyproperty
+
+# Chart specs for `@chart {...}` lines. Besides the inline form
+#
+#   @chart {Categories: A,B,C; Series1: 10,20,30; Series2: 15,25,35}
+#
+# a spec may name a chart type and read its data from a CSV or NPY file:
+#
+#   @chart {type: line; file: data/latency.csv; points: 1000}
+#
+# Values are parsed in bulk into NumPy arrays, and long series are reduced
+# to a point budget with Largest-Triangle-Three-Buckets so the chart part
+# and its embedded workbook stay small.
+
+CHART_TYPES = {
+    'column': XL_CHART_TYPE.COLUMN_CLUSTERED,
+    'bar': XL_CHART_TYPE.BAR_CLUSTERED,
+    'line': XL_CHART_TYPE.LINE,
+    'area': XL_CHART_TYPE.AREA,
+    'scatter': XL_CHART_TYPE.XY_SCATTER_LINES_NO_MARKERS,
+}
+OPTION_KEYS = ('type', 'file', 'points')
+DEFAULT_CHART_TYPE = 'column'
+# Points kept per series unless the spec sets `points` (0 keeps them all)
+DEFAULT_MAX_POINTS = 2000
+# Creation date written into every chart's embedded workbook
+WORKBOOK_CREATED = datetime.datetime(2000, 1, 1)
+
+ChartSpec = namedtuple('ChartSpec', ['chart_type', 'categories', 'series', 'max_points'])
+# chart_type: key of CHART_TYPES
+# categories: 1-D array of floats or of str, one per point
+# series: list of (name, 1-D float array) pairs, NaN marking missing values
+
+
+def parse_chart_spec(data_str, base_dir=None):
+    # Raises ValueError (or OSError for unreadable files) on malformed specs
+    options = {}
+    categories = None
+    series = []
+    for part in data_str.split(';'):
+        if not part.strip():
+            continue
+        key, separator, values = part.partition(':')
+        key = key.strip()
+        if not separator or not key:
+            raise ValueError(f"expected 'name: values', got {part.strip()!r}")
+        if key in OPTION_KEYS:
+            options[key] = values.strip()
+        elif key == 'Categories':
+            categories = _parse_categories(values.split(','))
+        else:
+            series.append((key, np.array(values.split(','), dtype=float)))
+
+    chart_type = options.get('type', DEFAULT_CHART_TYPE).lower()
+    if chart_type not in CHART_TYPES:
+        raise ValueError(f"unknown chart type {chart_type!r}; expected one of {', '.join(CHART_TYPES)}")
+    max_points = int(options.get('points', DEFAULT_MAX_POINTS))
+    if 'file' in options:
+        if series:
+            raise ValueError("a chart reads its series either inline or from a file, not both")
+        categories, series = load_chart_file(chart_file_path(options['file'], base_dir))
+    if not series:
+        raise ValueError("chart has no series")
+    length = max(len(values) for _, values in series)
+    if categories is None:
+        categories = np.arange(1, length + 1, dtype=float)
+    if chart_type == 'scatter' and categories.dtype.kind != 'f':
+        raise ValueError("scatter charts need numeric x values")
+    return ChartSpec(chart_type, categories, series, max_points)
+
+
+def chart_file_path(path, base_dir=None):
+    path = os.path.expanduser(path)
+    return os.path.join(base_dir, path) if base_dir and not os.path.isabs(path) else path
+
+
+def chart_file(data_str):
+    # The data file a spec reads, if any, without parsing the rest
+    for part in data_str.split(';'):
+        key, _, value = part.partition(':')
+        if key.strip() == 'file':
+            return value.strip()
+    return None
+
+
+def load_chart_file(path):
+    # .npy: a 1-D array is one series; in a 2-D array the first column holds
+    # the categories (x values) and every other column is a series.
+    # .csv: the same layout, with an optional header row naming the columns.
+    if path.lower().endswith('.npy'):
+        table = np.load(path, allow_pickle=False)
+        if table.ndim == 1:
+            return None, [('Series1', table.astype(float))]
+        names = [f'Series{i}' for i in range(1, table.shape[1])]
+        return table[:, 0].astype(float), list(zip(names, table[:, 1:].T.astype(float)))
+
+    with open(path, encoding='utf-8') as f:
+        first = f.readline().rstrip('\r\n').split(',')
+    header = not all(_is_number(value) for value in first[1:] or first)
+    skip = 1 if header else 0
+    columns = len(first)
+    if columns == 1:
+        values = np.loadtxt(path, delimiter=',', skiprows=skip, ndmin=1)
+        return None, [(first[0].strip() if header else 'Series1', values)]
+    names = [name.strip() for name in first[1:]] if header else [f'Series{i}' for i in range(1, columns)]
+    try:
+        table = np.loadtxt(path, delimiter=',', skiprows=skip, ndmin=2)
+        categories = table[:, 0]
+        values = table[:, 1:]
+    except ValueError:
+        # Text categories (dates, labels): read that column separately
+        categories = np.loadtxt(path, delimiter=',', skiprows=skip, usecols=0, dtype=str, ndmin=1)
+        values = np.loadtxt(path, delimiter=',', skiprows=skip, usecols=range(1, columns), ndmin=2)
+    return categories, list(zip(names, values.T))
+
+
+def downsample(spec):
+    # Keeps at most spec.max_points points, chosen by LTTB. The series share
+    # the budget and the union of their chosen points is kept, so all series
+    # stay aligned with the categories; when the share is under three points
+    # a series, LTTB runs once on the series combined instead.
+    length = len(spec.categories)
+    if not spec.max_points or length <= spec.max_points:
+        return spec
+    x = spec.categories if spec.categories.dtype.kind == 'f' else np.arange(length, dtype=float)
+    share = spec.max_points // len(spec.series)
+    if share >= 3:
+        keep = np.unique(np.concatenate([lttb_indices(x, values[:length], share) for _, values in spec.series]))
+    else:
+        keep = np.unique(lttb_indices(x, _combined(spec.series, length), spec.max_points))
+    return spec._replace(categories=spec.categories[keep],
+                         series=[(name, values[keep[keep < len(values)]]) for name, values in spec.series])
+
+
+def _combined(series, length):
+    # One series following all of them: each scaled to [0, 1] over its own
+    # range, then averaged, ignoring missing points
+    table = np.full((len(series), length), np.nan)
+    for row, (_, values) in zip(table, series):
+        row[:min(len(values), length)] = values[:length]
+    low, high = np.fmin.reduce(table, axis=1, keepdims=True), np.fmax.reduce(table, axis=1, keepdims=True)
+    scaled = (table - low) / np.where(high > low, high - low, 1.0)
+    present = ~np.isnan(scaled)
+    return np.nansum(scaled, axis=0) / np.maximum(present.sum(axis=0), 1)
+
+
+def lttb_indices(x, y, threshold):
+    # Largest-Triangle-Three-Buckets (Steinarsson, 2013): the first and last
+    # points plus, per bucket, the point forming the largest triangle with
+    # the previously chosen point and the average of the next bucket. Below
+    # three points there are no buckets: the points are evenly spaced.
+    n = len(y)
+    if threshold >= n:
+        return np.arange(n)
+    if threshold < 3:
+        return np.linspace(0, n - 1, threshold).astype(np.int64)
+    y = np.nan_to_num(np.asarray(y, dtype=float))
+    x = np.asarray(x, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    chosen = np.empty(threshold, dtype=np.int64)
+    chosen[0], chosen[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            next_lo, next_hi = hi, edges[i + 2]
+            avg_x = (sum_x[next_hi] - sum_x[next_lo]) / (next_hi - next_lo)
+            avg_y = (sum_y[next_hi] - sum_y[next_lo]) / (next_hi - next_lo)
+        else:
+            avg_x, avg_y = x[n - 1], y[n - 1]
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        chosen[i + 1] = a
+    return chosen
+
+
+def chart_data(spec):
+    # python-pptx chart data for the (already downsampled) spec
+    if spec.chart_type == 'scatter':
+        data = _XyChartData()
+        for name, values in spec.series:
+            series = data.add_series(name)
+            for x, y in zip(spec.categories.tolist(), values.tolist()):
+                if y == y:  # skips NaN
+                    series.add_data_point(x, y)
+        return data
+    data = _CategoryChartData()
+    for label in spec.categories.tolist():
+        data.categories.add_category(label)
+    for name, values in spec.series:
+        data.add_series(name, _with_gaps(values))
+    return data
+
+
+class _FixedDateWorkbook:
+    # xlsxwriter stamps the current time into the workbook's
+    # docProps/core.xml; a fixed date keeps identical charts byte-identical
+
+    @contextmanager
+    def _open_worksheet(self, xlsx_file):
+        with super()._open_worksheet(xlsx_file) as (workbook, worksheet):
+            workbook.set_properties({'created': WORKBOOK_CREATED})
+            yield workbook, worksheet
+
+
+class _CategoryWorkbookWriter(_FixedDateWorkbook, CategoryWorkbookWriter):
+    pass
+
+
+class _XyWorkbookWriter(_FixedDateWorkbook, XyWorkbookWriter):
+    pass
+
+
+class _CategoryChartData(CategoryChartData):
+    @property
+    def categories(self):
+        if not getattr(self, '_categories', False):
+            self._categories = _FlatCategories()
+        return self._categories
+
+    @lazyproperty
+    def _workbook_writer(self):
+        return _CategoryWorkbookWriter(self)
+
+
+class _XyChartData(XyChartData):
+    @lazyproperty
+    def _workbook_writer(self):
+        return _XyWorkbookWriter(self)
+
+
+class _FlatCategories(Categories):
+    # Categories.index() walks the list to find a category's offset, and the
+    # chart XML asks it once per category, which makes writing a chart
+    # quadratic in its points. Charts here have a single category level, so
+    # a category's offset is its position in the list.
+
+    def index(self, category):
+        positions = self.__dict__.get('_positions')
+        if positions is None or len(positions) != len(self._categories):
+            positions = self._positions = {id(c): i for i, c in enumerate(self._categories)}
+        return positions[id(category)]
+
+
+def _parse_categories(values):
+    labels = [value.strip() for value in values]
+    try:
+        return np.array(labels, dtype=float)
+    except ValueError:
+        return np.array(labels, dtype=str)
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _with_gaps(values):
+    values = values.tolist()
+    if any(value != value for value in values):
+        return [None if value != value else value for value in values]
+    return values
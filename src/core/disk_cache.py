@@ -0,0 +1,109 @@
+import os
+import time
+import tempfile
+import threading
+
+# Files of the persistent caches (images, slides, parsed decks). A cache
+# directory may be shared by several processes (the GUI, batch and server
+# workers), so files are written by atomic rename, recency is their mtime,
+# bumped on every use, and pruning removes the files used longest ago once
+# the directory outgrows its cap. A file removed by another process is
+# simply a miss.
+#
+# Pruning walks and stats the whole directory, so it runs only once a
+# fraction of the cap was stored since the last prune, not on every store.
+
+# A directory is pruned once 1/PRUNE_FRACTION of its cap was stored since
+# the last prune
+PRUNE_FRACTION = 16
+TMP_PREFIX = '.tmp-'
+# Temporary files older than this were left by a process that died while
+# writing them, and are pruned like any other file
+TMP_MAX_AGE = 3600
+
+
+def atomic_write(path, data):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TMP_PREFIX)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        remove_file(tmp_path)
+        raise
+
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def touch(path):
+    # Marks `path` as just used; False if it is gone
+    try:
+        os.utime(path)
+    except OSError:
+        return False
+    return True
+
+
+class LruDirectory:
+    # The files under `directory`, least recently used first out once they
+    # exceed `max_bytes`. Callers report what they store with `stored`,
+    # which prunes when it is due and returns the paths it removed.
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0  # as of the last prune plus stores since
+        self.evictions = 0
+        self._stored_since_prune = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def stored(self, size, keep=None):
+        # `keep`, typically the file just stored, is never removed, even if
+        # it alone exceeds the cap
+        with self._lock:
+            self.total_bytes += size
+            self._stored_since_prune += size
+            if self._stored_since_prune * PRUNE_FRACTION <= self.max_bytes:
+                return []
+            return self._prune(self.max_bytes, keep)
+
+    def prune(self, max_bytes=None, keep=None):
+        with self._lock:
+            return self._prune(self.max_bytes if max_bytes is None else max_bytes, keep)
+
+    def _prune(self, max_bytes, keep):
+        files = []
+        stale = time.time() - TMP_MAX_AGE
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if name.startswith(TMP_PREFIX) and stat.st_mtime > stale:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        removed = []
+        for _, size, path in sorted(files):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            removed.append(path)
+            total -= size
+            self.evictions += 1
+        self.total_bytes = total
+        self._stored_since_prune = 0
+        return removed
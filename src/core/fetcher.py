@@ -0,0 +1,91 @@
+import contextvars
+import threading
+import weakref
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_WORKERS = 16
+DEFAULT_PER_HOST = 6
+DEFAULT_TIMEOUT = (5, 30)  # connect, read (seconds)
+DEFAULT_RETRIES = 3
+
+
+def pooled_session(pool_size=DEFAULT_WORKERS, retries=DEFAULT_RETRIES):
+    retry = Retry(total=retries, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504),
+                  allowed_methods=frozenset(['GET']))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+class ImagePrefetcher:
+    # Downloads images through the image cache on a shared thread pool and a
+    # pooled keep-alive session, at most `per_host` requests per host at once.
+    # `submit` returns a Future resolving to the same value as `fetch`.
+
+    def __init__(self, image_cache, max_workers=DEFAULT_WORKERS, per_host=DEFAULT_PER_HOST,
+                 timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES):
+        self.image_cache = image_cache
+        self.timeout = timeout
+        self.session = pooled_session(max_workers, retries)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='image-fetch')
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(per_host))
+        self._host_slots_lock = threading.Lock()
+
+    def submit(self, url, prepare):
+        # In a copy of the caller's context, so the download and `prepare`
+        # count towards the caller's profiling run (see core.profiling)
+        return self._executor.submit(contextvars.copy_context().run, self.fetch, url, prepare)
+
+    def fetch(self, url, prepare):
+        # `prepare(digest)` turns the cached source image into what the
+        # caller needs; it runs on the pool so decoding overlaps downloads.
+        # A cached image evicted in between (by another process sharing the
+        # cache) is downloaded again.
+        for attempt in range(2):
+            with self._host_slot(url):
+                digest = self.image_cache.fetch(url, timeout=self.timeout, session=self.session)
+            try:
+                return prepare(digest)
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                self.image_cache.forget(url)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.session.close()
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._host_slots_lock:
+            return self._host_slots[host]
+
+
+_default_prefetcher_lock = threading.Lock()
+
+
+def default_prefetcher(image_cache):
+    # One prefetcher per cache, kept on the cache itself: a registry would
+    # keep every cache alive, or hand out a prefetcher of a dead cache whose
+    # id() was reused. Its threads and connections are released once the
+    # cache is collected.
+    with _default_prefetcher_lock:
+        if image_cache.default_prefetcher is None:
+            prefetcher = ImagePrefetcher(image_cache)
+            weakref.finalize(image_cache, _release, prefetcher._executor, prefetcher.session)
+            image_cache.default_prefetcher = prefetcher
+        return image_cache.default_prefetcher
+
+
+def _release(executor, session):
+    # ImagePrefetcher.shutdown, without a reference to the prefetcher (and
+    # through it to its cache)
+    executor.shutdown(wait=False, cancel_futures=True)
+    session.close()
@@ -1,159 +1,434 @@
+import os
 import re
+import copy
+import itertools
+import time
+from collections import deque
 import logging
 from pptx import Presentation
 from pptx.util import Pt, Inches
-from pptx.chart.data import CategoryChartData
-from pptx.enum.chart import XL_CHART_TYPE
+from pptx.enum.text import MSO_AUTO_SIZE
 from pptx.dml.color import RGBColor
 from io import BytesIO
 from PIL import Image
-from pptx.enum.text import PP_ALIGN
-import requests
-import os
+from core import profiling
+from core.charts import CHART_TYPES, chart_data, chart_file, chart_file_path
+from core.image_cache import default_cache
+from core.ir import ChartSlide, ContentSlide, ImageSlide, QuoteSlide, SectionSlide, TitleSlide, compile_chart
+from core.logs import log_event
+from core.fetcher import default_prefetcher
+from core.parse_cache import deck_key
+from core.slide_cache import slide_fingerprint
+from core.slide_parts import add_slide, index_parts
+from core.textfit import SPLIT, TextFitter, text_box
+from core.writer import DEFAULT_COMPRESS_LEVEL, save_presentation
+
+TITLE_PATTERN = re.compile(r'^# (.+)')
+SUBTITLE_PATTERN = re.compile(r'^## (.+)')
+
+# One pattern classifies every markdown line; branch order is the precedence
+# between line kinds.
+LINE_PATTERN = re.compile(
+    r'# (?P<h1>.+)'
+    r'|## (?P<h2>.+)'
+    r'|!\[.*\]\((?P<image>.*)\)'
+    r'|@chart\s*\{(?P<chart>.+)\}'
+    r'|> (?P<quote>.+)'
+    r'|[-*] (?P<bullet>.+)'
+)
+MARKER_CHARS = frozenset('#!@>-*')
+
+# How many parsed slides may be buffered ahead of rendering so their images
+# download concurrently; bounds memory when streaming huge inputs.
+PREFETCH_LOOKAHEAD = 256
+
+# Slide layout per slide type, by position in python-pptx's default template
+LAYOUT_INDEXES = {'title': 0, 'content': 1, 'section': 2, 'image': 5, 'chart': 5, 'quote': 1}
+
+IMAGE_HEIGHT = Inches(5.5)
+IMAGE_DPI = 150
+JPEG_QUALITY = 85
+EMBEDDABLE_FORMATS = ('JPEG', 'PNG')
+
+
+class GenerationCancelled(Exception):
+    pass
+
+
+def iter_lines(text):
+    # Like text.split('\n') but lazy, so no list of line copies is built
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def fit_image(data, max_height):
+    # Downscales to the pixel height needed at IMAGE_DPI. JPEG and PNG sources
+    # that are already small enough are embedded byte for byte; anything else
+    # is converted to PNG, which pptx renderers support everywhere.
+    image = Image.open(BytesIO(data))
+    image_format = image.format
+    if image.height <= max_height and image_format in EMBEDDABLE_FORMATS:
+        return data
+    if image.height > max_height:
+        width = max(1, round(image.width * max_height / image.height))
+        image = image.resize((width, max_height), Image.LANCZOS)
+    output = BytesIO()
+    if image_format == 'JPEG':
+        image.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    else:
+        image.save(output, 'PNG', optimize=image_format == 'PNG')
+    return output.getvalue()
+
 
 class SlideGenerator:
-    def __init__(self, template):
-        self.prs = Presentation()
+    def __init__(self, template, prs=None, image_cache=None, prefetcher=None, master_mode=None, slide_cache=None,
+                 overflow=SPLIT, base_deck=None):
+        # With `base_deck` (a core.append.BaseDeck) slides are appended to an
+        # existing deck: they are added to its skeleton and saved into a copy
+        # of it. Its slide master is left alone, so master mode is off.
+        if base_deck is not None:
+            if master_mode:
+                raise ValueError("master mode would restyle the slides of the base deck")
+            prs, master_mode = base_deck.prs, False
+        self.base_deck = base_deck
+        self.prs = prs if prs is not None else Presentation()
+        self._parts = index_parts(self.prs.part.package)
         self.template = template
-        self.layouts = {
-            'title': self.prs.slide_layouts[0],
-            'content': self.prs.slide_layouts[1],
-            'section': self.prs.slide_layouts[2],
-            'image': self.prs.slide_layouts[5],
-            'chart': self.prs.slide_layouts[5],
-            'quote': self.prs.slide_layouts[5],
-        }
+        # In master mode the template is written once into the slide master
+        # and layouts, and slides only carry their content.
+        self.master_mode = bool(template.slide_master) if master_mode is None else master_mode
+        if self.master_mode:
+            template.apply_to_master(self.prs)
+        self.image_cache = image_cache if image_cache is not None else default_cache()
+        self.prefetcher = prefetcher if prefetcher is not None else default_prefetcher(self.image_cache)
+        self.prefetch_lookahead = PREFETCH_LOOKAHEAD
+        self._image_futures = {}
+        # Optional SlideCache: unchanged slides are reassembled from it
+        self.slide_cache = slide_cache
+        # Optional ParseCache: input text parsed before is not parsed again
+        self.parse_cache = None
+        self._template_key = None
+        # Directory that relative chart data files are resolved against (cwd if None)
+        self.base_dir = None
+        # False rejects charts reading data files, for input from untrusted sources
+        self.allow_chart_files = True
+        if base_deck is not None:
+            self.layouts = dict(base_deck.layouts)
+        else:
+            self.layouts = {kind: self.prs.slide_layouts[index] for kind, index in LAYOUT_INDEXES.items()}
+        # Content and section slides whose text overflows the body are split
+        # into "(cont.)" slides or shrunk (see core.textfit); None leaves them
+        self.overflow = overflow
+        self._text_fitter = None
+        # RunProfile of the last generate_presentation call; its report is
+        # also written to profile_path and a cProfile dump to cprofile_path
+        self.profile = None
+        self.profile_path = profiling.report_path()
+        self.cprofile_path = profiling.cprofile_path()
+        # Deflate level of the saved package's XML parts (see core.writer)
+        self.compress_level = DEFAULT_COMPRESS_LEVEL
+
+    def clone(self):
+        # A copy with its own Presentation, copied in memory rather than
+        # re-read and re-parsed from the default template package
+        clone = copy.copy(self)
+        clone.prs, clone.layouts = copy.deepcopy((self.prs, self.layouts))
+        clone._parts = index_parts(clone.prs.part.package)
+        clone._image_futures = {}
+        return clone
+
+    def clear_slides(self):
+        # Drop every slide so the same Presentation can be reused for the next deck
+        sld_id_lst = self.prs.slides._sldIdLst
+        for sld_id in list(sld_id_lst):
+            sld_id_lst.remove(sld_id)
+            self.prs.part.drop_rel(sld_id.rId)
+        self._parts.reset()
 
     def parse_input(self, input_text):
-        slides = []
-        lines = input_text.strip().split('\n')
+        return list(self.iter_slides(input_text.strip().split('\n')))
+
+    def parse_text(self, text):
+        # All slides of `text`, loaded from parse_cache when it was parsed before
+        if self.parse_cache is None:
+            return list(self.iter_slides(iter_lines(text)))
+        key = deck_key(text, self.base_dir, self.allow_chart_files)
+        slides = self.parse_cache.get(key)
+        if slides is None:
+            slides = list(self.iter_slides(iter_lines(text)))
+            self.parse_cache.put(key, slides, self.base_dir)
+        return slides
+
+    def iter_slides(self, lines):
+        # Yields slides one at a time from any iterable of lines (a list, a
+        # file handle, a generator) without holding the whole input.
+        lines = iter(lines)
 
         # Parse title and optional subtitle
-        title_match = re.match(r'^# (.+)', lines[0]) if len(lines) > 0 else None
-        subtitle_match = re.match(r'^## (.+)', lines[1]) if len(lines) > 1 else None
+        first_line = next((line for line in lines if line.strip()), "").lstrip()
+        second_line = next(lines, None)
+        title_match = TITLE_PATTERN.match(first_line)
+        subtitle_match = SUBTITLE_PATTERN.match(second_line) if second_line is not None else None
         if title_match:
             title = title_match.group(1).strip()
             subtitle = subtitle_match.group(1).strip() if subtitle_match else ""
-            slides.append({"type": "title", "title": title, "subtitle": subtitle})
-        else:
-            pass
+            yield TitleSlide(title, subtitle)
+        if second_line is None:
+            return
 
-        current_slide = {"type": "", "title": "", "content": []}
-        for line in lines[1:]:
+        # The content or section slide being collected, yielded once the next one starts
+        slide_class, title, content = None, "", []
+        match_line = LINE_PATTERN.match
+        for line in itertools.chain((second_line,), lines):
             line = line.strip()
-            if re.match(r'^# .+', line):
-                if current_slide["title"]:
-                    slides.append(current_slide)
-                title = re.sub(r'^# ', '', line).strip()
-                current_slide = {"type": "content", "title": title, "content": []}
-            elif re.match(r'^## .+', line):
-                if current_slide["title"]:
-                    slides.append(current_slide)
-                title = re.sub(r'^## ', '', line).strip()
-                current_slide = {"type": "section", "title": title, "content": []}
-            elif re.match(r'^!\[.*\]\((.*)\)', line):
-                image_url = re.findall(r'^!\[.*\]\((.*)\)', line)[0]
-                slides.append({"type": "image", "title": current_slide.get("title", "Image Slide"), "image": image_url})
-            elif re.match(r'^@chart\s*\{(.+)\}', line):
-                chart_data = re.findall(r'^@chart\s*\{(.+)\}', line)[0]
-                slides.append({"type": "chart", "title": current_slide.get("title", "Chart Slide"), "chart_data": chart_data})
-            elif re.match(r'^> .+', line):
-                quote = re.sub(r'^> ', '', line).strip()
-                slides.append({"type": "quote", "quote": quote})
-            elif re.match(r'^- (.+)', line) or re.match(r'^\* (.+)', line):
-                # Directly add the bullet point without adding an extra "."
-                content = re.sub(r'^[-*] ', '', line).strip()
-                current_slide["content"].append(content)
-            elif line:
-                current_slide["content"].append(line)
-        if current_slide["title"]:
-            slides.append(current_slide)
-        return slides
+            if not line:
+                continue
+            # Only lines starting with a marker character can be anything but body text
+            match = match_line(line) if line[0] in MARKER_CHARS else None
+            if match is None:
+                content.append(line)
+                continue
+            kind = match.lastgroup
+            value = match.group(kind)
+            if kind == "h1" or kind == "h2":
+                if title:
+                    yield slide_class(title, content)
+                slide_class = ContentSlide if kind == "h1" else SectionSlide
+                title, content = value.strip(), []
+            elif kind == "image":
+                yield ImageSlide(title, value)
+            elif kind == "chart":
+                yield ChartSlide(title, value, self.parse_chart_spec(value))
+            elif kind == "quote":
+                yield QuoteSlide(value.strip())
+            else:
+                content.append(value.strip())
+        if title:
+            yield slide_class(title, content)
+
+    def fit_slides(self, slides):
+        # Slides as rendered: overflowing content slides expanded or shrunk
+        if self.overflow is None:
+            yield from slides
+            return
+        fitter = self._text_fitter
+        if fitter is None or fitter.mode != self.overflow or fitter.template is not self.template:
+            boxes = {slide_type: text_box(self.layouts[slide_type].placeholders[1])
+                     for slide_type in ('content', 'section')}
+            fitter = self._text_fitter = TextFitter(self.template, boxes, self.overflow)
+        for slide_data in slides:
+            with profiling.stage('fit'):
+                fitted = fitter.fit(slide_data)
+            yield from fitted
 
     def create_slide(self, slide_data):
-        slide_type = slide_data["type"]
+        return self._create_slide(slide_data)[0]
+
+    def _create_slide(self, slide_data):
+        # (slide, complete): complete is False when the slide's image could
+        # not be downloaded or its chart data not be read, and it was left
+        # out; such slides must not be reused, so the image or data is tried
+        # again next time
+        slide_type = slide_data.type
         layout = self.layouts.get(slide_type, self.layouts['content'])
-        slide = self.prs.slides.add_slide(layout)
-        self.template.apply_style(slide)
+        slide = add_slide(self.prs, layout)
+        complete = True
 
         if slide_type == "title":
-            slide.shapes.title.text = slide_data["title"]
-            if "subtitle" in slide_data:
-                subtitle_placeholder = slide.placeholders[1]
-                subtitle_placeholder.text = slide_data["subtitle"]
+            slide.shapes.title.text = slide_data.title
+            subtitle_placeholder = slide.placeholders[1]
+            subtitle_placeholder.text = slide_data.subtitle
         elif slide_type in ["content", "section"]:
-            slide.shapes.title.text = slide_data["title"]
+            slide.shapes.title.text = slide_data.title
             body = slide.placeholders[1]
             tf = body.text_frame
             tf.clear()
-            for item in slide_data["content"]:
-                p = tf.add_paragraph()
+            for i, item in enumerate(slide_data.content):
+                p = tf.paragraphs[0] if i == 0 else tf.add_paragraph()
                 p.text = item
                 p.level = 0
                 p.space_before = Pt(6)
                 p.space_after = Pt(6)
                 p.bullet = True
+            if slide_data.font_scale is not None:
+                tf.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE
+                tf._bodyPr.normAutofit.fontScale = slide_data.font_scale * 100
         elif slide_type == "image":
-            slide.shapes.title.text = slide_data["title"]
-            image_path = self.download_image(slide_data["image"])
-            if image_path:
+            slide.shapes.title.text = slide_data.title
+            with profiling.stage('image_wait'):
+                image_data = self.download_image(slide_data.image)
+            if image_data:
                 left = Inches(1)
                 top = Inches(1.5)
-                height = Inches(5.5)
-                slide.shapes.add_picture(image_path, left, top, height=height)
+                slide.shapes.add_picture(BytesIO(image_data), left, top, height=IMAGE_HEIGHT)
+            else:
+                complete = False
         elif slide_type == "chart":
-            slide.shapes.title.text = slide_data["title"]
-            chart_data = self.parse_chart_data(slide_data["chart_data"])
-            if chart_data:
-                x, y, cx, cy = Inches(2), Inches(2), Inches(6), Inches(4.5)
-                chart = slide.shapes.add_chart(
-                    XL_CHART_TYPE.COLUMN_CLUSTERED, x, y, cx, cy, chart_data
-                ).chart
+            slide.shapes.title.text = slide_data.title
+            with profiling.stage('chart_build'):
+                spec = slide_data.chart
+                if spec:
+                    x, y, cx, cy = Inches(2), Inches(2), Inches(6), Inches(4.5)
+                    slide.shapes.add_chart(CHART_TYPES[spec.chart_type], x, y, cx, cy, chart_data(spec))
+                else:
+                    complete = False
         elif slide_type == "quote":
             slide.shapes.title.text = "Quote"
             body = slide.placeholders[1]
-            tf = body.text_frame
-            tf.text = slide_data["quote"]
-            p = tf.paragraphs[0]
-            p.font.size = Pt(24)
-            p.font.italic = True
-            p.alignment = PP_ALIGN.CENTER
+            body.text_frame.text = slide_data.quote
 
+        body_role = 'quote' if slide_type == "quote" else 'body'
+        with profiling.stage('apply_style'):
+            self.template.apply_style(slide, body_role=body_role, inherit=self.master_mode)
+        return slide, complete
+
+    def prefetch_images(self, slides):
+        # Starts downloading the images of the next `prefetch_lookahead`
+        # slides while earlier ones are rendered; each URL is fetched once.
+        pending = deque()
+        for slide_data in slides:
+            if slide_data.type == "image" and not self._is_cached(slide_data):
+                self._prefetch(slide_data.image)
+            pending.append(slide_data)
+            if len(pending) > self.prefetch_lookahead:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+    def render_slide(self, slide_data):
+        # create_slide, or a copy of the identical slide rendered earlier
+        if self.slide_cache is None:
+            return self.create_slide(slide_data)
+        fingerprint = self._fingerprint(slide_data)
+        snapshot = self.slide_cache.get(fingerprint)
+        if snapshot is not None:
+            layout = self.layouts.get(slide_data.type, self.layouts['content'])
+            with profiling.stage('slide_cache_restore'):
+                return self.slide_cache.restore(self.prs, layout, snapshot)
+        slide, complete = self._create_slide(slide_data)
+        if complete:
+            self.slide_cache.put(fingerprint, slide)
         return slide
 
+    def _is_cached(self, slide_data):
+        return self.slide_cache is not None and self._fingerprint(slide_data) in self.slide_cache
+
+    def _fingerprint(self, slide_data):
+        key = self._template_key
+        if slide_data.type == "chart":
+            # Charts reading a data file are re-rendered when the file changes
+            path = chart_file(slide_data.source)
+            if path:
+                try:
+                    stat = os.stat(chart_file_path(path, self.base_dir))
+                    key = f'{key}|{stat.st_mtime_ns}|{stat.st_size}'
+                except OSError:
+                    pass
+        return slide_fingerprint(slide_data, key)
+
+    def _prefetch(self, url):
+        future = self._image_futures.get(url)
+        if future is None:
+            future = self._image_futures[url] = self.prefetcher.submit(url, self._prepare_image)
+        return future
+
+    def _prepare_image(self, digest):
+        max_height = int(IMAGE_HEIGHT.inches * IMAGE_DPI)
+        return self.image_cache.derived(digest, f'fit-{max_height}px', lambda data: self._fit_image(data, max_height))
+
+    def _fit_image(self, data, max_height):
+        with profiling.stage('image_decode'):
+            return fit_image(data, max_height)
+
     def download_image(self, url):
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            image = Image.open(BytesIO(response.content))
-            image_path = f"temp_image_{hash(url)}.png"
-            image.save(image_path)
-            return image_path
+            return self._prefetch(url).result()
         except Exception as e:
-            logging.error(f"Failed to download image from {url}: {e}")
+            log_event('image_download_failed', logging.ERROR, url=url, error=str(e))
             return None
 
+    def parse_chart_spec(self, data_str):
+        # The chart spec, downsampled to its point budget; relative data
+        # files are looked up in base_dir
+        return compile_chart(data_str, self.base_dir, self.allow_chart_files)
+
     def parse_chart_data(self, data_str):
-        try:
-            # Expected format: Categories: A,B,C; Series1: 10,20,30; Series2: 15,25,35
-            data = {}
-            parts = data_str.split(';')
-            for part in parts:
-                key, values = part.split(':')
-                data[key.strip()] = [float(v.strip()) for v in values.split(',')]
-            categories = data.get("Categories", [])
-            chart_data = CategoryChartData()
-            chart_data.categories = categories
-            for series_name, values in data.items():
-                if series_name != "Categories":
-                    chart_data.add_series(series_name, values)
-            return chart_data
-        except Exception as e:
-            logging.error(f"Failed to parse chart data: {e}")
-            return None
+        spec = self.parse_chart_spec(data_str)
+        return chart_data(spec) if spec else None
+
+    def generate_presentation(self, source, output_file, progress=None, cancelled=None, fitted=None):
+        # `source` is either the whole input text or an iterable of lines such
+        # as an open file; slides are rendered as soon as they are parsed.
+        # `output_file` is a path or a writable binary file object, which
+        # need not be seekable (a pipe, an HTTP response).
+        # `progress(count)` is called after each slide. `cancelled()` is
+        # checked between slides; once it returns true GenerationCancelled is
+        # raised and nothing is saved. With `fitted`, the deck is parsed and
+        # fitted before any slide is rendered, instead of streamed, and
+        # `fitted(slides)` is called with the list of its slides, to count
+        # them or keep them. Returns the run's profile report, which is also
+        # logged as a generation_profile event.
+        self.profile = profile = profiling.RunProfile()
+        before = self._cache_counters()
+        count = 0
+        with profiling.activate(profile), profiling.cprofiled(self.cprofile_path):
+            self._template_key = f'{self.template.state_key()}|master={self.master_mode}'
+            if isinstance(source, str) and self.parse_cache is not None:
+                with profiling.stage('parse'):
+                    parsed = self.parse_text(source)
+            else:
+                lines = iter_lines(source) if isinstance(source, str) else source
+                parsed = profiling.timed(self.iter_slides(lines), 'parse')
+            slides = self.fit_slides(parsed)
+            if fitted is not None:
+                slides = list(slides)
+                fitted(slides)
+            slides = self.prefetch_images(slides)
+            try:
+                for count, slide_data in enumerate(slides, 1):
+                    if cancelled is not None and cancelled():
+                        raise GenerationCancelled(f"Cancelled after {count - 1} slides")
+                    start = time.perf_counter()
+                    self.render_slide(slide_data)
+                    profile.add_slide(slide_data.type, time.perf_counter() - start)
+                    if progress is not None:
+                        progress(count)
+            finally:
+                self._image_futures.clear()
+            if cancelled is not None and cancelled():
+                raise GenerationCancelled("Cancelled before saving")
+            with profiling.stage('save'):
+                self.save(output_file)
+        profile.finish()
+        for name, value in self._cache_counters().items():
+            profile.count(name, value - before[name])
+        report = profile.report(output=output_file if isinstance(output_file, str) else None,
+                                template=self.template.name, slides=count)
+        log_event('generation_profile', **report)
+        if self.profile_path:
+            profiling.write_report(report, self.profile_path)
+        return report
+
+    def save(self, output_file):
+        if self.base_deck is not None:
+            self.base_deck.save(self.prs, output_file, self.compress_level)
+        else:
+            save_presentation(self.prs, output_file, self.compress_level)
 
-    def generate_presentation(self, input_text, output_file):
-        slides_data = self.parse_input(input_text)
-        for slide_data in slides_data:
-            self.create_slide(slide_data)
-        self.prs.save(output_file)
+    def _cache_counters(self):
+        stats = self.image_cache.stats()
+        counters = {'bytes_fetched': stats['bytes_fetched'], 'image_cache_hits': stats['hits'],
+                    'image_cache_misses': stats['misses']}
+        if self.slide_cache is not None:
+            counters['slide_cache_hits'] = self.slide_cache.hits
+            counters['slide_cache_misses'] = self.slide_cache.misses
+        if self.parse_cache is not None:
+            counters['parse_cache_hits'] = self.parse_cache.hits
+            counters['parse_cache_misses'] = self.parse_cache.misses
+        return counters
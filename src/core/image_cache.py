@@ -0,0 +1,242 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import requests
+from core import profiling
+from core.disk_cache import LruDirectory, atomic_write, remove_file, touch
+from core.logs import log_event
+
+DEFAULT_MAX_BYTES = 512 * 2**20
+DEFAULT_MAX_AGE = 24 * 3600
+
+
+def default_cache_dir():
+    if os.environ.get('TTP_CACHE_DIR'):
+        return os.path.join(os.environ['TTP_CACHE_DIR'], 'images')
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'text-to-powerpoint', 'images')
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ImageCache:
+    # Persistent, content-addressed cache for downloaded images and anything
+    # derived from them (transcoded or resized variants).
+    #
+    # objects/<sha256 of bytes>   blobs, shared by every entry with the same bytes
+    # index/<sha256 of key>.json  one entry per URL or derived variant
+    #
+    # URL entries remember ETag/Last-Modified and are revalidated with a
+    # conditional GET once older than `max_age`; within `max_age` they are
+    # served with no network access at all. Derived entries are keyed by the
+    # digest of their source bytes, so a variant is built once per distinct
+    # image no matter how many URLs or decks use it. When the objects exceed
+    # `max_bytes`, the least recently used ones are evicted.
+    #
+    # Several processes (batch and server workers) may share the directory,
+    # so eviction goes by the blobs on disk (see core.disk_cache): every use
+    # touches a blob, and pruning removes the blobs used longest ago. An
+    # entry whose blob was removed, by this process or another, is a miss.
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE, session=None):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.session = session or requests.Session()
+        # Of fetch() requests; derived() counts its own, since every use of a
+        # variant follows a fetch of its source
+        self.hits = 0
+        self.misses = 0
+        self.derived_hits = 0
+        self.derived_misses = 0
+        self.revalidations = 0
+        self.bytes_fetched = 0
+        # The ImagePrefetcher that core.fetcher.default_prefetcher made for
+        # this cache, if any
+        self.default_prefetcher = None
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._objects = LruDirectory(os.path.join(self.cache_dir, 'objects'), max_bytes)
+        os.makedirs(os.path.join(self.cache_dir, 'index'), exist_ok=True)
+        self._load_index()
+        self.prune()
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'derived_hits': self.derived_hits,
+            'derived_misses': self.derived_misses,
+            'revalidations': self.revalidations,
+            'evictions': self._objects.evictions,
+            'bytes_fetched': self.bytes_fetched,
+            'entries': len(self._entries),
+            'bytes': self._objects.total_bytes,
+        }
+
+    def fetch(self, url, timeout=None, session=None):
+        # Returns the digest of the image bytes for `url`, downloading or
+        # revalidating only when the cached copy is missing or stale.
+        key = 'url:' + url
+        with self._lock:
+            entry = self._touch(key)
+            if entry and time.time() - entry['checked'] < self.max_age:
+                self.hits += 1
+                return entry['digest']
+
+        headers = {}
+        if entry:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        try:
+            with profiling.stage('image_download'):
+                response = (session or self.session).get(url, headers=headers, timeout=timeout)
+            if entry and response.status_code == 304:
+                with self._lock:
+                    self.revalidations += 1
+                    self.hits += 1
+                    entry['checked'] = time.time()
+                    self._write_entry(key, entry)
+                return entry['digest']
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if entry:
+                log_event('image_revalidation_failed', logging.WARNING, url=url, error=str(e))
+                with self._lock:
+                    self.hits += 1
+                return entry['digest']
+            raise
+
+        data = response.content
+        with self._lock:
+            self.misses += 1
+            self.bytes_fetched += len(data)
+            return self._store(key, data, etag=response.headers.get('ETag'),
+                               last_modified=response.headers.get('Last-Modified'))
+
+    def derived(self, digest, variant, build):
+        # Returns the bytes of `build(source_bytes)` for the image `digest`,
+        # calling `build` only when this variant has never been produced.
+        key = f'derived:{digest}:{variant}'
+        with self._lock:
+            entry = self._touch(key)
+        if entry:
+            try:
+                data = self.read(entry['digest'])
+            except FileNotFoundError:
+                # Evicted since it was touched, possibly by another process
+                with self._lock:
+                    self._entries.pop(key, None)
+            else:
+                with self._lock:
+                    self.derived_hits += 1
+                return data
+        data = build(self.read(digest))
+        with self._lock:
+            self.derived_misses += 1
+            self._store(key, data)
+        return data
+
+    def read(self, digest):
+        with open(self.path(digest), 'rb') as f:
+            return f.read()
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, 'objects', digest)
+
+    def forget(self, url):
+        # Drops the entry for `url`, whose blob turned out to be gone
+        key = 'url:' + url
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                remove_file(self._entry_path(key))
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                remove_file(self._entry_path(key))
+            self._entries.clear()
+            self._objects.prune(0)
+
+    def prune(self):
+        with self._lock:
+            self._dropped(self._objects.prune())
+
+    def _dropped(self, removed):
+        # Drops the entries of pruned objects; entries of other processes
+        # find their objects gone on their next use
+        removed = {os.path.basename(path) for path in removed}
+        for key in [key for key, entry in self._entries.items() if entry['digest'] in removed]:
+            del self._entries[key]
+            remove_file(self._entry_path(key))
+
+    def _touch(self, key):
+        entry = self._entries.get(key)
+        if entry is not None:
+            if not touch(self.path(entry['digest'])):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            touch(self._entry_path(key))
+        return entry
+
+    def _store(self, key, data, **meta):
+        # A blob no longer referenced here may still be used by another
+        # process, so replaced entries leave theirs to pruning
+        digest = _digest(data)
+        path = self.path(digest)
+        stored = not touch(path)
+        if stored:
+            atomic_write(path, data)
+        entry = {'key': key, 'digest': digest, 'checked': time.time()}
+        entry.update(meta)
+        self._entries.pop(key, None)
+        self._entries[key] = entry
+        self._write_entry(key, entry)
+        if stored:
+            self._dropped(self._objects.stored(len(data), keep=path))
+        return digest
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, 'index', _digest(key.encode('utf-8')) + '.json')
+
+    def _write_entry(self, key, entry):
+        atomic_write(self._entry_path(key), json.dumps(entry).encode('utf-8'))
+
+    def _load_index(self):
+        index_dir = os.path.join(self.cache_dir, 'index')
+        loaded = []
+        for name in os.listdir(index_dir):
+            path = os.path.join(index_dir, name)
+            try:
+                with open(path, 'rb') as f:
+                    entry = json.loads(f.read())
+                loaded.append((os.path.getmtime(path), entry))
+            except (OSError, ValueError):
+                remove_file(path)
+        # Least recently written first, so eviction order survives restarts
+        for _, entry in sorted(loaded, key=lambda item: item[0]):
+            if os.path.exists(self.path(entry['digest'])):
+                self._entries[entry['key']] = entry
+            else:
+                remove_file(self._entry_path(entry['key']))
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def default_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ImageCache()
+        return _default_cache
@@ -0,0 +1,139 @@
+import logging
+from collections import namedtuple
+import numpy as np
+from core.charts import ChartSpec, chart_file, downsample, parse_chart_spec
+from core.logs import log_event
+
+# Parsed slides. SlideGenerator.iter_slides and LiveDocument yield these
+# instead of dicts: one immutable, slotted tuple per slide, with chart specs
+# already parsed into NumPy arrays, so a deck is parsed once whatever
+# template it is rendered with afterwards. `type` names the slide kind and
+# picks the layout. record() gives the slide's JSON form, the dict that
+# slide cache fingerprints are computed from.
+#
+# encode_slides/decode_slides turn a deck into marshal data and back (see
+# core.parse_cache); chart arrays come back as read-only views of the
+# loaded bytes.
+
+# Bump when the slides parsed from the same input change
+IR_VERSION = 3
+
+
+class _Slide:
+    __slots__ = ()
+    type = None
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def record(self):
+        return {'type': self.type, **self._asdict()}
+
+
+class TitleSlide(_Slide, namedtuple('TitleSlide', ['title', 'subtitle'])):
+    __slots__ = ()
+    type = 'title'
+
+
+class ContentSlide(_Slide, namedtuple('ContentSlide', ['title', 'content', 'font_scale'], defaults=(None,))):
+    # `font_scale` is set when fitting shrinks the text (see core.textfit)
+    __slots__ = ()
+    type = 'content'
+
+    def record(self):
+        record = {'type': self.type, 'title': self.title, 'content': self.content}
+        if self.font_scale is not None:
+            record['font_scale'] = self.font_scale
+        return record
+
+
+class SectionSlide(ContentSlide):
+    __slots__ = ()
+    type = 'section'
+
+
+class ImageSlide(_Slide, namedtuple('ImageSlide', ['title', 'image'])):
+    __slots__ = ()
+    type = 'image'
+
+
+class ChartSlide(_Slide, namedtuple('ChartSlide', ['title', 'source', 'chart'])):
+    # `source` is the text between the braces of the @chart line, `chart`
+    # its downsampled ChartSpec (None if it does not parse). Slides compare
+    # by their source.
+    __slots__ = ()
+    type = 'chart'
+
+    def __eq__(self, other):
+        return type(self) is type(other) and (self.title, self.source) == (other.title, other.source)
+
+    def record(self):
+        return {'type': self.type, 'title': self.title, 'chart_data': self.source}
+
+
+class QuoteSlide(_Slide, namedtuple('QuoteSlide', ['quote'])):
+    __slots__ = ()
+    type = 'quote'
+
+
+SLIDE_TYPES = {cls.type: cls for cls in (TitleSlide, ContentSlide, SectionSlide, ImageSlide, ChartSlide, QuoteSlide)}
+
+
+def compile_chart(source, base_dir=None, allow_files=True):
+    # The downsampled ChartSpec of an @chart spec, or None (logged) when it
+    # does not parse. Relative data files are looked up in `base_dir`.
+    if not allow_files and chart_file(source):
+        log_event('chart_parse_failed', logging.ERROR, chart_data=source, error='chart data files are disabled')
+        return None
+    try:
+        return downsample(parse_chart_spec(source, base_dir))
+    except (ValueError, OSError) as e:
+        log_event('chart_parse_failed', logging.ERROR, chart_data=source, error=str(e))
+        return None
+
+
+def encode_slides(slides):
+    # marshal-able form of a deck: per slide its type and fields, with every
+    # chart array packed into one buffer and referred to as (dtype, offset,
+    # length), so loading a deck copies one large bytes object rather than
+    # thousands of small ones
+    encoded = []
+    buffer = bytearray()
+
+    def pack(array):
+        array = np.ascontiguousarray(array)
+        offset = len(buffer)
+        buffer.extend(array.tobytes())
+        return array.dtype.str, offset, len(array)
+
+    for slide in slides:
+        if slide.type == 'chart' and slide.chart is not None:
+            spec = slide.chart
+            chart = (spec.chart_type, pack(spec.categories),
+                     [(name, pack(values)) for name, values in spec.series], spec.max_points)
+            encoded.append((slide.type, slide.title, slide.source, chart))
+        else:
+            encoded.append((slide.type, *slide))
+    return encoded, bytes(buffer)
+
+
+def decode_slides(encoded):
+    slides, buffer = encoded
+
+    def unpack(packed):
+        dtype, offset, count = packed
+        return np.frombuffer(buffer, dtype=dtype, count=count, offset=offset)
+
+    decoded = []
+    for slide_type, *fields in slides:
+        if slide_type == 'chart' and fields[2] is not None:
+            chart_type, categories, series, max_points = fields[2]
+            fields[2] = ChartSpec(chart_type, unpack(categories),
+                                  [(name, unpack(values)) for name, values in series], max_points)
+        decoded.append(SLIDE_TYPES[slide_type]._make(fields))
+    return decoded
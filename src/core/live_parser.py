@@ -0,0 +1,185 @@
+from bisect import bisect_left, bisect_right
+from core.generator import LINE_PATTERN, MARKER_CHARS, TITLE_PATTERN, SUBTITLE_PATTERN
+from core.ir import ChartSlide, ContentSlide, ImageSlide, QuoteSlide, SectionSlide, TitleSlide, compile_chart
+
+# Incremental form of SlideGenerator.iter_slides for an editor buffer. The
+# body of a document splits into blocks, each starting at a '#'/'##' heading
+# (plus the lines before the first heading). A block's slides depend only on
+# its own lines, so after an edit only the blocks that overlap the changed
+# lines are parsed again. For the same text, `slides` equals
+# list(iter_slides(text.split('\n'))).
+
+
+def _classify(line):
+    # (kind, value) of a stripped, non-empty line; kind is None for body text
+    match = LINE_PATTERN.match(line) if line[0] in MARKER_CHARS else None
+    if match is None:
+        return None, line
+    return match.lastgroup, match.group(match.lastgroup)
+
+
+def _parse_block(lines, start):
+    # Slides of the block starting at lines[start], which runs up to the next
+    # heading. Returns (slides, end): slides are (line offset or None, slide)
+    # pairs, None marking the block's own content/section slide. A block
+    # that does not start at a heading (the body before the first heading)
+    # has no title, so its body text is dropped as in iter_slides.
+    slides = []
+    slide_class = None
+    title = ""
+    content = []
+    for index in range(start, len(lines)):
+        line = lines[index].strip()
+        if not line:
+            continue
+        kind, value = _classify(line)
+        if kind == "h1" or kind == "h2":
+            if index > start:
+                return _finish(slides, slide_class, title, content), index
+            slide_class = ContentSlide if kind == "h1" else SectionSlide
+            title = value.strip()
+        elif kind == "image":
+            slides.append((index - start, ImageSlide(title, value)))
+        elif kind == "chart":
+            slides.append((index - start, ChartSlide(title, value, compile_chart(value))))
+        elif kind == "quote":
+            slides.append((index - start, QuoteSlide(value.strip())))
+        elif kind is None:
+            content.append(value)
+        else:
+            content.append(value.strip())
+    return _finish(slides, slide_class, title, content), len(lines)
+
+
+def _finish(slides, slide_class, title, content):
+    if title:
+        slides.append((None, slide_class(title, content)))
+    return slides
+
+
+class LiveDocument:
+    def __init__(self):
+        self.lines = []
+        self.title_slide = None
+        self.body_start = 0  # first line of the body (the line after the title line)
+        self._starts = []    # first line of every block
+        self._blocks = []    # (line offset or None, slide) pairs per block
+        self._offsets = []   # index of every block's first slide in `slides`
+        self.reparsed_lines = 0
+
+    def __len__(self):
+        return (self.title_slide is not None) + sum(len(block) for block in self._blocks)
+
+    @property
+    def slides(self):
+        slides = [self.title_slide] if self.title_slide is not None else []
+        for block in self._blocks:
+            slides.extend(slide for _, slide in block)
+        return slides
+
+    def update(self, text):
+        # Brings the parse up to date with `text`; returns the number of
+        # lines that had to be parsed again (also kept in reparsed_lines).
+        old = self.lines
+        new = text.split('\n')
+        limit = min(len(old), len(new))
+        prefix = 0
+        while prefix < limit and old[prefix] == new[prefix]:
+            prefix += 1
+        if prefix == len(old) == len(new):
+            self.reparsed_lines = 0
+            return 0
+        suffix = 0
+        while suffix < limit - prefix and old[-1 - suffix] == new[-1 - suffix]:
+            suffix += 1
+        self.lines = new
+        # An edit on or right after the title line can change the title slide
+        # and where the body starts
+        if not self._blocks or prefix <= self.body_start:
+            self._parse_all()
+        else:
+            self._parse_range(prefix, len(new) - suffix, len(new) - len(old))
+        self._offsets = []
+        count = self.title_slide is not None
+        for block in self._blocks:
+            self._offsets.append(count)
+            count += len(block)
+        return self.reparsed_lines
+
+    def slide_at(self, line_number):
+        # (index, slide) of the slide the given line belongs to, or
+        # (None, None) if the document has no slides
+        if self.title_slide is not None and line_number < self.body_start:
+            return 0, self.title_slide
+        if self.title_slide is not None and line_number == self.body_start and \
+                self.body_start < len(self.lines) and SUBTITLE_PATTERN.match(self.lines[line_number]):
+            return 0, self.title_slide
+        b = max(0, bisect_right(self._starts, line_number) - 1)
+        # Nearest block at or before the line that has any slide
+        while b >= 0 and (b >= len(self._blocks) or not self._blocks[b]):
+            b -= 1
+        if b < 0:
+            return (0, self.title_slide) if self.title_slide is not None else (None, None)
+        block = self._blocks[b]
+        offset = line_number - self._starts[b]
+        chosen = None
+        for i, (line_offset, _) in enumerate(block):
+            if line_offset == offset:
+                chosen = i
+                break
+        if chosen is None:
+            # The block's own slide, or else its last slide before the line
+            if block[-1][0] is None:
+                chosen = len(block) - 1
+            else:
+                chosen = max([i for i, (line_offset, _) in enumerate(block) if line_offset <= offset] or [0])
+        return self._offsets[b] + chosen, block[chosen][1]
+
+    def _parse_all(self):
+        lines = self.lines
+        first = next((i for i, line in enumerate(lines) if line.strip()), len(lines))
+        self.title_slide = None
+        if first < len(lines):
+            title_match = TITLE_PATTERN.match(lines[first].lstrip())
+            if title_match:
+                second = lines[first + 1] if first + 1 < len(lines) else None
+                subtitle_match = SUBTITLE_PATTERN.match(second) if second is not None else None
+                self.title_slide = TitleSlide(title_match.group(1).strip(),
+                                              subtitle_match.group(1).strip() if subtitle_match else "")
+        self.body_start = first + 1
+        self._starts, self._blocks, _ = self._parse_from(self.body_start, None)
+        self.reparsed_lines = len(lines)
+
+    def _parse_range(self, start, new_end, delta):
+        # Lines [start, new_end) of the new text replaced old lines
+        # [start, new_end - delta). Parsing restarts at the block holding the
+        # line before the edit, since inserted body text belongs to it, and
+        # stops at the first heading after the edit: from there on the blocks
+        # are the old ones, shifted by `delta`.
+        first = max(0, bisect_right(self._starts, start - 1) - 1)
+        starts, blocks, resume_line = self._parse_from(self._starts[first], new_end)
+        if resume_line < len(self.lines):
+            resume = bisect_left(self._starts, resume_line - delta)
+            if resume == len(self._starts) or self._starts[resume] != resume_line - delta:
+                # Not expected: headings in unchanged lines start old blocks
+                self._parse_all()
+                return
+        else:
+            resume = len(self._starts)
+        self.reparsed_lines = resume_line - self._starts[first]
+        self._starts[first:] = starts + [line + delta for line in self._starts[resume:]]
+        self._blocks[first:] = blocks + self._blocks[resume:]
+
+    def _parse_from(self, start, stop):
+        # Parses blocks from line `start` until the first block that starts
+        # at or after line `stop` (or to the end); returns their starts and
+        # slides, and the line where parsing stopped
+        lines = self.lines
+        starts, blocks = [], []
+        index = start
+        while index < len(lines) and (stop is None or index < stop or not starts):
+            slides, end = _parse_block(lines, index)
+            starts.append(index)
+            blocks.append(slides)
+            index = end
+        return starts, blocks, index
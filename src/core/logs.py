@@ -0,0 +1,44 @@
+import json
+import logging
+import os
+import time
+
+# app.log holds one JSON object per line, so runs can be grepped and loaded
+# with any JSON tool. Events are logged with log_event(name, **fields); the
+# fields become keys of the line next to time, level, logger and event.
+# Plain logging calls are written the same way, their message as the event.
+
+DEFAULT_LOG_FILE = 'app.log'
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        line = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}',
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        line.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            line['exception'] = self.formatException(record.exc_info)
+        return json.dumps(line, ensure_ascii=False, default=str)
+
+
+def configure_logging(path=DEFAULT_LOG_FILE, level=logging.INFO):
+    # Sends the root logger to `path` as JSON lines; console output, if
+    # any, is left to the caller
+    root = logging.getLogger()
+    for handler in root.handlers:
+        # Already set up, e.g. in a process forked from one that was
+        if isinstance(handler, logging.FileHandler) and handler.baseFilename == os.path.abspath(path):
+            return handler
+    handler = logging.FileHandler(path, encoding='utf-8')
+    handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
+    root.setLevel(level)
+    return handler
+
+
+def log_event(event, level=logging.INFO, exc_info=None, **fields):
+    logging.log(level, event, exc_info=exc_info, extra={'fields': fields})
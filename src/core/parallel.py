@@ -0,0 +1,156 @@
+import multiprocessing
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from core import profiling
+from core.generator import GenerationCancelled, SlideGenerator
+from core.logs import DEFAULT_LOG_FILE, configure_logging, log_event
+from core.render import DeckResult
+from core.slide_parts import capture_slide, restore_slide
+
+# Rendering one large deck on several cores. The parsed deck is cut into
+# chunks at section (##) slides; worker processes render the chunks into
+# partial presentations and send back snapshots of their slides (see
+# core.slide_parts), which are restored in deck order into the caller's
+# Presentation and saved from there. Restored images are looked up by
+# content hash, so media repeated across chunks is stored once. Nothing here
+# may import PyQt5: workers must start without a display.
+
+# Chunks per worker, so workers that finish early pick up more work
+CHUNKS_PER_WORKER = 4
+# Below this many slides a chunk is not worth the round trip
+MIN_CHUNK_SLIDES = 50
+# Generators a worker keeps, one per distinct template and mode
+WORKER_GENERATORS = 8
+
+_worker_generators = OrderedDict()  # (template state key, master mode, overflow): SlideGenerator
+
+
+def split_sections(slides, chunks, min_slides=MIN_CHUNK_SLIDES):
+    # Lists of consecutive slides, about len(slides) / chunks (and at least
+    # min_slides) long, each after the first starting at a section slide.
+    # A deck without sections stays in one piece.
+    target = max(min_slides, -(-len(slides) // max(chunks, 1)))
+    runs, current = [], []
+    for slide in slides:
+        if slide.type == 'section' and len(current) >= target:
+            runs.append(current)
+            current = []
+        current.append(slide)
+    if current:
+        runs.append(current)
+    return runs
+
+
+def init_chunk_worker(log_file=DEFAULT_LOG_FILE):
+    if log_file:
+        configure_logging(log_file)
+
+
+def render_chunk(template, master_mode, overflow, slides):
+    # Fits and renders parsed slides into this worker's Presentation and
+    # returns (slide type, seconds, snapshot) for every slide rendered
+    key = (template.state_key(), master_mode, overflow)
+    generator = _worker_generators.pop(key, None)
+    if generator is None:
+        generator = SlideGenerator(template, master_mode=master_mode, overflow=overflow)
+    _worker_generators[key] = generator
+    while len(_worker_generators) > WORKER_GENERATORS:
+        _worker_generators.popitem(last=False)
+    rendered = []
+    try:
+        for slide_data in generator.prefetch_images(generator.fit_slides(slides)):
+            start = time.perf_counter()
+            slide = generator.create_slide(slide_data)
+            rendered.append((slide_data.type, time.perf_counter() - start, capture_slide(slide)))
+    finally:
+        generator._image_futures.clear()
+        generator.clear_slides()
+    return rendered
+
+
+class ParallelRenderer:
+    # A pool of `workers` processes rendering the sections of one deck at a
+    # time. Keep it for as long as decks come in: starting the workers costs
+    # as much as rendering a few hundred slides. Workers are spawned rather
+    # than forked, since the caller may already run threads (the image
+    # prefetcher's, a GUI's) whose locks a forked copy would inherit held.
+
+    def __init__(self, workers=None, log_file=DEFAULT_LOG_FILE):
+        self.workers = workers or os.cpu_count()
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=init_chunk_worker, initargs=(log_file,))
+
+    def generate_presentation(self, generator, source, output_file, progress=None, cancelled=None):
+        # Same as generator.generate_presentation(source, output_file, ...),
+        # with the slides rendered by the pool; the generator's settings
+        # (template, master mode, overflow, caches, compress level) apply and
+        # the merged deck is left in generator.prs. The slide cache is not
+        # used. Returns the run's profile report, whose slide type timings
+        # are the workers' and whose stages are the caller's.
+        generator.profile = profile = profiling.RunProfile()
+        count = 0
+        with profiling.activate(profile), profiling.cprofiled(generator.cprofile_path):
+            with profiling.stage('parse'):
+                if isinstance(source, str):
+                    slides = generator.parse_text(source)
+                else:
+                    slides = list(generator.iter_slides(source))
+            chunks = split_sections(slides, self.workers * CHUNKS_PER_WORKER)
+            futures = [self.executor.submit(render_chunk, generator.template, generator.master_mode,
+                                            generator.overflow, chunk)
+                       for chunk in chunks]
+            try:
+                for future in futures:
+                    with profiling.stage('render_wait'):
+                        rendered = future.result()
+                    with profiling.stage('merge'):
+                        for slide_type, seconds, snapshot in rendered:
+                            if cancelled is not None and cancelled():
+                                raise GenerationCancelled(f"Cancelled after {count} slides")
+                            layout = generator.layouts.get(slide_type, generator.layouts['content'])
+                            restore_slide(generator.prs, layout, snapshot)
+                            profile.add_slide(slide_type, seconds)
+                            count += 1
+                            if progress is not None:
+                                progress(count)
+            finally:
+                for future in futures:
+                    future.cancel()
+            if cancelled is not None and cancelled():
+                raise GenerationCancelled("Cancelled before saving")
+            with profiling.stage('save'):
+                generator.save(output_file)
+        profile.finish()
+        report = profile.report(output=output_file if isinstance(output_file, str) else None,
+                                template=generator.template.name, slides=count, workers=self.workers,
+                                chunks=len(chunks))
+        log_event('generation_profile', **report)
+        if generator.profile_path:
+            profiling.write_report(report, generator.profile_path)
+        return report
+
+    def render_deck(self, generator, input_path, output_path):
+        # render.render_deck for a deck spread over the pool
+        start = time.perf_counter()
+        generator.base_dir = os.path.dirname(os.path.abspath(input_path))
+        try:
+            with open(input_path, encoding='utf-8') as f:
+                profile = self.generate_presentation(generator, f, output_path)
+            slides = len(generator.prs.slides)
+            return DeckResult(input_path, output_path, slides, time.perf_counter() - start, None, profile)
+        except Exception as e:
+            return DeckResult(input_path, output_path, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}",
+                              None)
+        finally:
+            generator.clear_slides()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
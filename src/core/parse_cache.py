@@ -0,0 +1,120 @@
+import os
+import marshal
+import hashlib
+import threading
+from collections import OrderedDict
+from core.charts import chart_file, chart_file_path
+from core.disk_cache import LruDirectory, atomic_write, touch
+from core.image_cache import default_cache_dir
+from core.ir import IR_VERSION, decode_slides, encode_slides
+
+DEFAULT_MAX_BYTES = 256 * 2**20
+DEFAULT_MEMORY_ENTRIES = 4
+
+
+def deck_key(text, base_dir=None, allow_chart_files=True):
+    return hashlib.sha256(f'{IR_VERSION}\0{base_dir}\0{allow_chart_files}\0{text}'.encode('utf-8')).hexdigest()
+
+
+def chart_file_stamps(slides, base_dir=None):
+    # (path, mtime_ns, size) of every chart data file the slides read; a
+    # cached deck is stale once any of them changed
+    stamps = []
+    for slide in slides:
+        path = chart_file(slide.source) if slide.type == 'chart' else None
+        if path:
+            path = chart_file_path(path, base_dir)
+            try:
+                stat = os.stat(path)
+                stamps.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamps.append((path, None, None))
+    return stamps
+
+
+class ParseCache:
+    # Parsed decks (see core.ir) keyed by the hash of their input text, so
+    # rendering the same input again, e.g. with another template, skips
+    # parsing. Decks live in memory (LRU, `memory_entries`) and in
+    # <cache_dir>/<key[:2]>/<key>.deck as marshal data, pruned least
+    # recently used first once the directory exceeds `max_bytes` (see
+    # core.disk_cache).
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(default_cache_dir()), 'decks')
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._files = LruDirectory(self.cache_dir, max_bytes)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'memory_entries': len(self._memory)}
+
+    def get(self, key):
+        # The deck's slides, or None if it is not cached or its chart files changed
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is None:
+            path = self._path(key)
+            try:
+                # One read: marshal.load on a file object reads it piecemeal
+                with open(path, 'rb') as f:
+                    stamps, encoded = marshal.loads(f.read())
+                entry = (stamps, decode_slides(encoded))
+                touch(path)
+            except (OSError, EOFError, ValueError, TypeError, KeyError):
+                entry = None
+        if entry is None or any(self._stamp(path) != (mtime, size) for path, mtime, size in entry[0]):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self._remember(key, entry)
+        return entry[1]
+
+    def put(self, key, slides, base_dir=None):
+        entry = (chart_file_stamps(slides, base_dir), slides)
+        data = marshal.dumps((entry[0], encode_slides(slides)))
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, data)
+        with self._lock:
+            self._remember(key, entry)
+        self._files.stored(len(data), keep=path)
+
+    def prune(self):
+        self._files.prune()
+
+    def _stamp(self, path):
+        try:
+            stat = os.stat(path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None, None
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key + '.deck')
+
+
+_default_parse_cache = None
+_default_parse_cache_lock = threading.Lock()
+
+
+def default_parse_cache():
+    global _default_parse_cache
+    with _default_parse_cache_lock:
+        if _default_parse_cache is None:
+            _default_parse_cache = ParseCache()
+        return _default_parse_cache
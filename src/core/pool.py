@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict, deque
+from core.generator import SlideGenerator
+
+DEFAULT_SIZE = 2
+DEFAULT_MAX_TEMPLATES = 8
+
+
+class _Entry:
+    def __init__(self, base):
+        self.base = base
+        self.plan = base.template.plan
+        self.ready = deque()
+
+
+class PresentationPool:
+    # Keeps a fully built base SlideGenerator (Presentation loaded, layouts
+    # resolved, master styled) per template and mode, plus up to `size`
+    # ready-made clones of it. A background thread tops the clones back up
+    # after each acquire, so steady-state decks skip all setup. Templates
+    # beyond `max_templates` are evicted least recently used first, and an
+    # entry is rebuilt when its template has been customized.
+
+    def __init__(self, size=DEFAULT_SIZE, max_templates=DEFAULT_MAX_TEMPLATES, background=True):
+        self.size = size
+        self.max_templates = max_templates
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._refill_needed = threading.Condition(self._lock)
+        self._pending_refill = False
+        self._closed = False
+        if background:
+            threading.Thread(target=self._refill_forever, name='presentation-pool', daemon=True).start()
+
+    def acquire(self, template, master_mode=None):
+        if master_mode is None:
+            master_mode = bool(template.slide_master)
+        key = (template.name, master_mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.plan is not template.plan:
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+                if entry.ready:
+                    self.hits += 1
+                    self._request_refill()
+                    return entry.ready.popleft()
+            self.misses += 1
+        if entry is None:
+            entry = _Entry(SlideGenerator(template, master_mode=master_mode))
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_templates:
+                    self._entries.popitem(last=False)
+                self._request_refill()
+        return entry.base.clone()
+
+    def fill(self):
+        # Brings every entry up to `size` clones; runs on the background thread
+        while True:
+            with self._lock:
+                entry = next((e for e in self._entries.values() if len(e.ready) < self.size), None)
+            if entry is None:
+                return
+            clone = entry.base.clone()
+            with self._lock:
+                if len(entry.ready) < self.size:
+                    entry.ready.append(clone)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self._entries.clear()
+            self._refill_needed.notify()
+
+    def _request_refill(self):
+        # Caller holds the lock
+        self._pending_refill = True
+        self._refill_needed.notify()
+
+    def _refill_forever(self):
+        while True:
+            with self._lock:
+                while not self._pending_refill and not self._closed:
+                    self._refill_needed.wait()
+                if self._closed:
+                    return
+                self._pending_refill = False
+            self.fill()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def default_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = PresentationPool()
+        return _default_pool
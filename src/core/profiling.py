@@ -0,0 +1,173 @@
+import cProfile
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Per-run instrumentation of deck generation. SlideGenerator makes a
+# RunProfile for every generate_presentation call and activates it; while
+# it is active, code called from the run (the template, the preview
+# renderer, and the image fetcher threads, which run in a copy of the
+# caller's context) adds its wall time with `with stage(name):`, which is a
+# no-op when no run is active. The active run is a context variable, so
+# runs on other threads (the live preview, server requests) stay separate.
+#
+# TTP_PROFILE=<path>   also write every run's report to <path> as JSON
+# TTP_CPROFILE=<path>  dump a cProfile of every run to <path> (open it with
+#                      snakeviz, or flameprof for a flame graph)
+
+PROFILE_ENV = 'TTP_PROFILE'
+CPROFILE_ENV = 'TTP_CPROFILE'
+
+
+class RunProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.seconds = None
+        self.stages = {}       # stage: [calls, seconds]
+        self.slide_types = {}  # slide type: [slides, seconds]
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def add_slide(self, slide_type, seconds):
+        with self._lock:
+            entry = self.slide_types.setdefault(slide_type, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def finish(self):
+        self.seconds = time.perf_counter() - self.started
+
+    def report(self, **info):
+        # JSON-ready summary; `info` (output path, slide count...) comes first.
+        # Stage times from worker threads overlap, so they may add up to
+        # more than the run's wall time.
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self.started
+        with self._lock:
+            return dict(
+                info,
+                seconds=round(seconds, 6),
+                stages={name: {'calls': calls, 'seconds': round(total, 6)}
+                        for name, (calls, total) in sorted(self.stages.items(), key=lambda item: -item[1][1])},
+                slide_types={name: {'slides': slides, 'seconds': round(total, 6)}
+                             for name, (slides, total) in sorted(self.slide_types.items())},
+                counters=dict(sorted(self.counters.items())),
+                peak_rss_bytes=peak_rss(),
+            )
+
+
+_active = contextvars.ContextVar('active_profile', default=None)
+
+
+@contextmanager
+def activate(profile):
+    token = _active.set(profile)
+    try:
+        yield profile
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def stage(name):
+    profile = _active.get()
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - start)
+
+
+def timed(iterable, name):
+    # Yields from `iterable`, adding the time spent producing each item to
+    # stage `name` (for lazily parsed input)
+    iterator = iter(iterable)
+    while True:
+        with stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+def peak_rss():
+    # Peak resident set size of this process in bytes, None if unknown
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+@contextmanager
+def cprofiled(path):
+    # Runs the block under cProfile and dumps the stats to `path`, if set
+    if not path:
+        yield
+        return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def merge_reports(reports):
+    # Totals of several runs' reports (e.g. all decks of a batch)
+    merged = {'runs': len(reports), 'slides': 0, 'seconds': 0.0, 'stages': {}, 'slide_types': {}, 'counters': {},
+              'peak_rss_bytes': None}
+    for report in reports:
+        merged['slides'] += report.get('slides', 0)
+        merged['seconds'] += report['seconds']
+        for section in ('stages', 'slide_types'):
+            for name, values in report[section].items():
+                total = merged[section].setdefault(name, dict.fromkeys(values, 0))
+                for key, value in values.items():
+                    total[key] += value
+        for name, value in report['counters'].items():
+            merged['counters'][name] = merged['counters'].get(name, 0) + value
+        if report['peak_rss_bytes'] is not None:
+            merged['peak_rss_bytes'] = max(merged['peak_rss_bytes'] or 0, report['peak_rss_bytes'])
+    merged['seconds'] = round(merged['seconds'], 6)
+    for section in ('stages', 'slide_types'):
+        for values in merged[section].values():
+            values['seconds'] = round(values['seconds'], 6)
+    merged['stages'] = dict(sorted(merged['stages'].items(), key=lambda item: -item[1]['seconds']))
+    return merged
+
+
+def write_report(report, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+        f.write('\n')
+
+
+def report_path():
+    return os.environ.get(PROFILE_ENV) or None
+
+
+def cprofile_path():
+    return os.environ.get(CPROFILE_ENV) or None
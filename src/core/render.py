@@ -0,0 +1,134 @@
+import os
+import time
+from collections import Counter, OrderedDict, namedtuple
+from io import BytesIO
+from core.append import BaseDeck
+from core.generator import GenerationCancelled, SlideGenerator
+from core.logs import DEFAULT_LOG_FILE, configure_logging
+from core.textfit import SPLIT
+from core.writer import DEFAULT_COMPRESS_LEVEL
+from templates.templates import TEMPLATES, Template
+
+# Headless rendering helpers shared by process-pool workers. Nothing here may
+# import PyQt5: workers must start without a display.
+
+# `profile` is the generation run's profile report (see core.profiling)
+DeckResult = namedtuple('DeckResult', ['input_path', 'output_path', 'slides', 'seconds', 'error', 'profile'])
+# A deck rendered for the HTTP service (see server.py)
+RenderedDeck = namedtuple('RenderedDeck', ['data', 'slides', 'seconds'])
+
+# Generators a service worker keeps, one per distinct template
+SERVICE_TEMPLATE_CACHE = 8
+
+_worker_generator = None
+_worker_cprofile_dir = None
+_service_generators = OrderedDict()  # template state key: SlideGenerator
+_service_compress_level = DEFAULT_COMPRESS_LEVEL
+
+
+def init_worker(template_name, master_mode=False, overflow=SPLIT, log_file=DEFAULT_LOG_FILE, cprofile_dir=None,
+                compress_level=DEFAULT_COMPRESS_LEVEL, base_deck=None):
+    # Runs once per worker process: the Presentation, its layouts and the
+    # template are built here and reused for every deck the worker renders.
+    # With `cprofile_dir`, every deck's cProfile is dumped there as <stem>.prof.
+    # With `base_deck`, the path of a .pptx, every deck's slides are appended
+    # to a copy of it (see core.append).
+    global _worker_generator, _worker_cprofile_dir
+    if log_file:
+        configure_logging(log_file)
+    _worker_cprofile_dir = cprofile_dir
+    _worker_generator = SlideGenerator(TEMPLATES[template_name], master_mode=master_mode,
+                                       overflow=overflow,
+                                       base_deck=BaseDeck(base_deck) if base_deck else None)
+    _worker_generator.compress_level = compress_level
+
+
+def render_deck(input_path, output_path):
+    start = time.perf_counter()
+    generator = _worker_generator
+    generator.base_dir = os.path.dirname(os.path.abspath(input_path))
+    if _worker_cprofile_dir:
+        stem = os.path.splitext(os.path.basename(output_path))[0]
+        generator.cprofile_path = os.path.join(_worker_cprofile_dir, stem + '.prof')
+    try:
+        with open(input_path, encoding='utf-8') as f:
+            profile = generator.generate_presentation(f, output_path)
+        slides = len(generator.prs.slides)
+        return DeckResult(input_path, output_path, slides, time.perf_counter() - start, None, profile)
+    except Exception as e:
+        return DeckResult(input_path, output_path, 0, time.perf_counter() - start, f"{type(e).__name__}: {e}",
+                          None)
+    finally:
+        generator.clear_slides()
+
+
+def output_path_for(input_path, output_dir):
+    stem = os.path.splitext(os.path.basename(input_path))[0]
+    return os.path.join(output_dir, stem + '.pptx')
+
+
+def output_paths_for(input_paths, output_dir):
+    # Output path per input: <output_dir>/<stem>.pptx, or, for inputs whose
+    # names clash (a/intro.md and b/intro.md), their directory relative to
+    # the inputs' common directory under output_dir. Raises ValueError for
+    # an input listed twice.
+    absolute = [os.path.abspath(path) for path in input_paths]
+    if len(set(absolute)) < len(absolute):
+        duplicate = next(path for path in input_paths if absolute.count(os.path.abspath(path)) > 1)
+        raise ValueError(f"{duplicate} is listed more than once")
+    outputs = [output_path_for(path, output_dir) for path in input_paths]
+    clashing = {output for output, count in Counter(outputs).items() if count > 1}
+    if not clashing:
+        return dict(zip(input_paths, outputs))
+    common = os.path.commonpath([os.path.dirname(path) for path in absolute])
+    paths = {}
+    for path, absolute_path, output in zip(input_paths, absolute, outputs):
+        if output in clashing:
+            relative_dir = os.path.relpath(os.path.dirname(absolute_path), common)
+            output = output_path_for(path, os.path.join(output_dir, relative_dir))
+        paths[path] = output
+    return paths
+
+
+def init_service_worker(log_file=DEFAULT_LOG_FILE, compress_level=DEFAULT_COMPRESS_LEVEL):
+    global _service_compress_level
+    if log_file:
+        configure_logging(log_file)
+    _service_compress_level = compress_level
+
+
+def resolve_template(template):
+    # A template name or the JSON form of a template (see Template.from_dict);
+    # raises ValueError for unknown names and malformed templates
+    if isinstance(template, str):
+        if template not in TEMPLATES:
+            raise ValueError(f"unknown template {template!r}")
+        return TEMPLATES[template]
+    return Template.from_dict(template)
+
+
+def render_markdown(text, template, deadline=None):
+    # Renders `text` with `template` (a name or a template dict) and returns
+    # the .pptx bytes. Past `deadline` (a time.time() value) rendering stops
+    # with GenerationCancelled, so timed-out requests free their worker.
+    start = time.perf_counter()
+    if deadline is not None and time.time() > deadline:
+        raise GenerationCancelled("Timed out waiting in the queue")
+    template = resolve_template(template)
+    key = template.state_key()
+    generator = _service_generators.pop(key, None)
+    if generator is None:
+        generator = SlideGenerator(template)
+        # Request markdown must not read files off the server
+        generator.allow_chart_files = False
+        generator.compress_level = _service_compress_level
+    _service_generators[key] = generator
+    while len(_service_generators) > SERVICE_TEMPLATE_CACHE:
+        _service_generators.popitem(last=False)
+    cancelled = (lambda: time.time() > deadline) if deadline is not None else None
+    output = BytesIO()
+    try:
+        generator.generate_presentation(text, output, cancelled=cancelled)
+        return RenderedDeck(output.getvalue(), len(generator.prs.slides), time.perf_counter() - start)
+    finally:
+        generator.clear_slides()
@@ -0,0 +1,103 @@
+import os
+import json
+import marshal
+import hashlib
+import threading
+from collections import OrderedDict
+from core.disk_cache import LruDirectory, atomic_write, touch
+from core.image_cache import default_cache_dir
+from core.slide_parts import capture_slide, restore_slide
+
+# Bump when the rendered output for the same slide and template changes
+SLIDE_CACHE_VERSION = 3
+DEFAULT_MAX_BYTES = 512 * 2**20
+DEFAULT_MEMORY_ENTRIES = 2000
+
+
+def slide_fingerprint(slide_data, template_key):
+    # Image slides are keyed by URL: a changed image behind the same URL is
+    # picked up once the slide itself changes or the cache is cleared.
+    payload = json.dumps(slide_data.record(), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(f'{SLIDE_CACHE_VERSION}\0{template_key}\0{payload}'.encode('utf-8')).hexdigest()
+
+
+class SlideCache:
+    # Rendered slides (XML plus related parts and media) keyed by the
+    # fingerprint of their parsed slide's record and the template state.
+    # Snapshots live in memory (LRU, `memory_entries`) and in
+    # <cache_dir>/<fp[:2]>/<fp>.slide on disk, pruned least recently used
+    # first once the directory exceeds `max_bytes` (see core.disk_cache).
+
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, memory_entries=DEFAULT_MEMORY_ENTRIES):
+        self.cache_dir = cache_dir or os.path.join(os.path.dirname(default_cache_dir()), 'slides')
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._files = LruDirectory(self.cache_dir, max_bytes)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'memory_entries': len(self._memory)}
+
+    def get(self, fingerprint):
+        with self._lock:
+            snapshot = self._memory.get(fingerprint)
+            if snapshot is not None:
+                self._memory.move_to_end(fingerprint)
+                self.hits += 1
+                return snapshot
+        path = self._path(fingerprint)
+        try:
+            with open(path, 'rb') as f:
+                snapshot = marshal.load(f)
+            touch(path)
+        except (OSError, EOFError, ValueError, TypeError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            self._remember(fingerprint, snapshot)
+        return snapshot
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._memory or os.path.exists(self._path(fingerprint))
+
+    def put(self, fingerprint, slide):
+        snapshot = capture_slide(slide)
+        data = marshal.dumps(snapshot)
+        path = self._path(fingerprint)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, data)
+        with self._lock:
+            self._remember(fingerprint, snapshot)
+        self._files.stored(len(data), keep=path)
+
+    def restore(self, prs, layout, snapshot):
+        return restore_slide(prs, layout, snapshot)
+
+    def prune(self):
+        self._files.prune()
+
+    def _remember(self, fingerprint, snapshot):
+        self._memory[fingerprint] = snapshot
+        self._memory.move_to_end(fingerprint)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, fingerprint):
+        return os.path.join(self.cache_dir, fingerprint[:2], fingerprint + '.slide')
+
+
+_default_slide_cache = None
+_default_slide_cache_lock = threading.Lock()
+
+
+def default_slide_cache():
+    global _default_slide_cache
+    with _default_slide_cache_lock:
+        if _default_slide_cache is None:
+            _default_slide_cache = SlideCache()
+        return _default_slide_cache
@@ -0,0 +1,186 @@
+import re
+from io import BytesIO
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import PartFactory
+from pptx.opc.packuri import PackURI
+from pptx.parts.image import Image, ImagePart
+from pptx.parts.slide import SlidePart
+from pptx.oxml import parse_xml
+from pptx.oxml.ns import qn
+from lxml import etree
+
+# Capturing a rendered slide as plain data (XML, related parts and media) and
+# re-creating it in another Presentation. A snapshot is built only from
+# dicts, lists, str and bytes so it can be marshalled to disk or sent
+# between processes.
+
+# Relationships that belong to the receiving presentation, not the slide
+SKIPPED_RELTYPES = frozenset([RT.SLIDE_LAYOUT, RT.NOTES_SLIDE])
+
+R_ATTRIBUTES = tuple(qn(f'r:{name}') for name in ('id', 'embed', 'link', 'pict'))
+
+MIN_SLIDE_ID = 256
+MAX_SLIDE_ID = 2147483647
+
+PARTNAME_NUMBER = re.compile(r'\d+(?=\.\w+$)')
+IMAGE_PARTNAME = '/ppt/media/image%d.%s'
+IMAGE_PARTNAME_PATTERN = re.compile(r'/ppt/media/image(\d+)\.')
+
+
+def add_slide(prs, layout, clone_placeholders=True):
+    # Same result as prs.slides.add_slide(layout), without its scans over
+    # every existing slide relationship and slide id, which make adding n
+    # slides quadratic. Slide ids are appended in increasing order, so the
+    # last one is the largest.
+    prs_part = prs.part
+    slide_part = SlidePart.new(prs_part._next_slide_partname, prs_part.package, layout.part)
+    rId = prs_part.rels._add_relationship(RT.SLIDE, slide_part)
+    sld_id_lst = prs.slides._sldIdLst
+    last = sld_id_lst[-1] if len(sld_id_lst) else None
+    next_id = int(last.get('id')) + 1 if last is not None else MIN_SLIDE_ID
+    if next_id > MAX_SLIDE_ID:
+        sld_id_lst.add_sldId(rId)
+    else:
+        sld_id_lst._add_sldId(id=next_id, rId=rId)
+    slide = slide_part.slide
+    if clone_placeholders:
+        slide.shapes.clone_layout_placeholders(layout)
+    return slide
+
+
+class PartIndex:
+    # Partnames and images (by SHA1) of a package. python-pptx walks every
+    # relationship of the package to name each new chart, workbook and image
+    # part and to find an existing copy of an image, so adding n of them is
+    # quadratic; installed with index_parts(), these lookups walk it once.
+    # Numbers are handed out in increasing order and not reused; reset() after
+    # dropping parts rescans, so a cleared package numbers its parts from 1
+    # again.
+
+    def __init__(self, package):
+        self.package = package
+        self.reset()
+
+    def reset(self):
+        self._names = None
+        self._image_numbers = None
+        self._next = {}  # partname template: next number to try
+        self._images = None  # sha1: ImagePart
+
+    def next_partname(self, tmpl):
+        names = self._partnames()
+        number = self._next.get(tmpl, 1)
+        while tmpl % number in names:
+            number += 1
+        self._next[tmpl] = number + 1
+        names.add(tmpl % number)
+        return PackURI(tmpl % number)
+
+    def next_image_partname(self, ext):
+        # Image numbers are shared by all extensions, as in python-pptx
+        names = self._partnames()
+        number = self._next.get(IMAGE_PARTNAME, 1)
+        while number in self._image_numbers:
+            number += 1
+        self._next[IMAGE_PARTNAME] = number + 1
+        self._image_numbers.add(number)
+        names.add(IMAGE_PARTNAME % (number, ext))
+        return PackURI(IMAGE_PARTNAME % (number, ext))
+
+    def get_or_add_image_part(self, image_file):
+        image = Image.from_file(image_file)
+        if self._images is None:
+            self._images = {}
+            for part in self.package.iter_parts():
+                if isinstance(part, ImagePart):
+                    self._images.setdefault(part.sha1, part)
+        part = self._images.get(image.sha1)
+        if part is None:
+            part = self._images[image.sha1] = ImagePart.new(self.package, image)
+        return part
+
+    def _partnames(self):
+        if self._names is None:
+            self._names = {str(part.partname) for part in self.package.iter_parts()}
+            self._image_numbers = {int(match.group(1)) for match in map(IMAGE_PARTNAME_PATTERN.match, self._names)
+                                   if match}
+        return self._names
+
+
+def index_parts(package):
+    # Puts a PartIndex in front of the package's partname and image lookups
+    index = PartIndex(package)
+    package.next_partname = index.next_partname
+    package.next_image_partname = index.next_image_partname
+    package.get_or_add_image_part = index.get_or_add_image_part
+    return index
+
+
+def capture_slide(slide):
+    return {
+        'xml': slide.part.blob,
+        'rels': _capture_rels(slide.part, SKIPPED_RELTYPES),
+    }
+
+
+def restore_slide(prs, layout, snapshot):
+    # Adds a slide with `layout` whose content and related parts are those
+    # of the snapshot, renaming parts and relationship ids as needed.
+    slide = add_slide(prs, layout, clone_placeholders=False)
+    sld = slide._element
+    for child in list(sld):
+        sld.remove(child)
+    for child in parse_xml(snapshot['xml']):
+        sld.append(child)
+    _restore_rels(slide.part, sld, snapshot['rels'])
+    return slide
+
+
+def _capture_rels(part, skipped=frozenset()):
+    rels = []
+    for rel in part.rels.values():
+        if rel.reltype in skipped:
+            continue
+        if rel.is_external:
+            rels.append({'rId': rel.rId, 'reltype': rel.reltype, 'target': rel.target_ref})
+        else:
+            rels.append({'rId': rel.rId, 'reltype': rel.reltype, 'part': _capture_part(rel.target_part)})
+    return rels
+
+
+def _capture_part(part):
+    return {
+        'partname': PARTNAME_NUMBER.sub('%d', str(part.partname)),
+        'content_type': part.content_type,
+        'blob': part.blob,
+        'rels': _capture_rels(part),
+    }
+
+
+def _restore_part(package, snapshot):
+    partname = package.next_partname(snapshot['partname'])
+    part = PartFactory(partname, snapshot['content_type'], package, snapshot['blob'])
+    element = getattr(part, '_element', None)
+    _restore_rels(part, element, snapshot['rels'])
+    return part
+
+
+def _restore_rels(part, element, rels):
+    mapping = {}
+    for rel in rels:
+        if 'target' in rel:
+            rId = part.relate_to(rel['target'], rel['reltype'], is_external=True)
+        elif rel['reltype'] == RT.IMAGE:
+            # Images are shared by content hash, so repeated media is stored once
+            image_part = part.package.get_or_add_image_part(BytesIO(rel['part']['blob']))
+            rId = part.relate_to(image_part, rel['reltype'])
+        else:
+            rId = part.relate_to(_restore_part(part.package, rel['part']), rel['reltype'])
+        mapping[rel['rId']] = rId
+    if element is None or all(old == new for old, new in mapping.items()):
+        return
+    for node in element.iter(etree.Element):
+        for name in R_ATTRIBUTES:
+            value = node.get(name)
+            if value in mapping:
+                node.set(name, mapping[value])
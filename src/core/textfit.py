@@ -0,0 +1,204 @@
+from collections import namedtuple
+from functools import lru_cache
+import math
+from PIL import ImageFont
+from pptx.oxml.ns import qn
+from pptx.util import Emu, Pt
+
+# Decides whether a content slide's text fits its body placeholder, from
+# the template's font metrics, and splits overflowing slides into
+# "(cont.)" slides or shrinks their text. Text is measured the way
+# PowerPoint lays it out closely enough for that decision: greedy word
+# wrap at spaces, single line spacing from the font's ascent and descent,
+# and the 6pt space before and after every paragraph.
+
+SPLIT = 'split'
+SHRINK = 'shrink'
+OVERFLOW_MODES = (SPLIT, SHRINK)
+CONTINUED_SUFFIX = ' (cont.)'
+# Font scales tried when shrinking, largest first (PowerPoint's fontScale)
+FONT_SCALES = [step / 40 for step in range(40, 15, -1)]  # 100% down to 40%
+
+# Glyph widths are measured once per font at this pixel size and scaled
+# linearly to the size being fitted
+REFERENCE_SIZE = 100
+WORD_CACHE_SIZE = 65536
+PARAGRAPH_SPACING = Pt(6).pt
+# Default a:bodyPr insets
+INSET_X = Emu(91440)
+INSET_Y = Emu(45720)
+
+FALLBACK_FONTS = {
+    (False, False): 'DejaVuSans.ttf',
+    (True, False): 'DejaVuSans-Bold.ttf',
+    (False, True): 'DejaVuSans-Oblique.ttf',
+    (True, True): 'DejaVuSans-BoldOblique.ttf',
+}
+
+# Usable text area of a placeholder in points, with the first-level left
+# margin (bullet indent) already taken off the width
+TextBox = namedtuple('TextBox', ['width', 'height'])
+
+
+@lru_cache(maxsize=256)
+def load_font(family, size, bold=False, italic=False):
+    # `size` in pixels. Tries the family's usual font file names, then
+    # DejaVu, then Pillow's built-in font.
+    base = family.replace(' ', '')
+    suffix = ('b' if bold else '') + ('i' if italic else '')
+    candidates = [f'{base}{suffix}.ttf', f'{base.lower()}{suffix}.ttf', f'{base}.ttf', f'{base.lower()}.ttf',
+                  FALLBACK_FONTS[bool(bold), bool(italic)], FALLBACK_FONTS[False, False]]
+    for name in candidates:
+        try:
+            return ImageFont.truetype(name, size, layout_engine=ImageFont.Layout.BASIC)
+        except OSError:
+            continue
+    return ImageFont.load_default(size=size)
+
+
+class FontMetrics:
+    # Advance widths and line height of one font face, per point of font
+    # size. Glyph widths come from a table filled lazily from Pillow, and
+    # whole words are summed from it once and remembered, since measuring
+    # through Pillow costs tens of microseconds per call.
+
+    def __init__(self, family, bold=False, italic=False):
+        self.font = load_font(family, REFERENCE_SIZE, bold, italic)
+        ascent, descent = self.font.getmetrics()
+        self.line_height = (ascent + descent) / REFERENCE_SIZE
+        self.glyphs = {}
+        self.words = {}
+        self.space = self.word_width(' ')
+
+    def word_width(self, word):
+        width = self.words.get(word)
+        if width is None:
+            glyphs = self.glyphs
+            width = 0.0
+            for char in word:
+                glyph = glyphs.get(char)
+                if glyph is None:
+                    glyph = glyphs[char] = self.font.getlength(char) / REFERENCE_SIZE
+                width += glyph
+            if len(self.words) >= WORD_CACHE_SIZE:
+                self.words.clear()
+            self.words[word] = width
+        return width
+
+    def line_count(self, text, width):
+        # Lines `text` wraps into at `width` (in font-size units)
+        words = text.split()
+        if not words:
+            return 1
+        space = self.space
+        word_width = self.word_width
+        lines = 1
+        used = -space
+        for word in words:
+            w = word_width(word)
+            if used + space + w <= width:
+                used += space + w
+            elif w <= width:
+                lines += used >= 0
+                used = w
+            else:
+                # A word wider than the box is broken across lines
+                extra = math.ceil(w / width)
+                lines += (used >= 0) + extra - 1
+                used = w - (extra - 1) * width
+        return lines
+
+
+@lru_cache(maxsize=64)
+def font_metrics(family, bold=False, italic=False):
+    return FontMetrics(family, bool(bold), bool(italic))
+
+
+def text_box(placeholder):
+    # TextBox of a (layout) placeholder: its size less the default insets
+    # and the left margin of first-level paragraphs
+    level = placeholder._element.find(f"{qn('p:txBody')}/{qn('a:lstStyle')}/{qn('a:lvl1pPr')}")
+    margin = level.get('marL') if level is not None else None
+    if margin is None:
+        body_style = placeholder.part.slide_layout.slide_master._element.find(
+            f"{qn('p:txStyles')}/{qn('p:bodyStyle')}/{qn('a:lvl1pPr')}")
+        margin = body_style.get('marL') if body_style is not None else None
+    width = placeholder.width - 2 * INSET_X - int(margin or 0)
+    return TextBox(Emu(width).pt, Emu(placeholder.height - 2 * INSET_Y).pt)
+
+
+class TextFitter:
+    # `boxes` maps slide types to the TextBox their content goes into;
+    # slides of other types are never changed. In SPLIT mode an overflowing
+    # slide becomes as many slides as its paragraphs need, the later ones
+    # titled "<title> (cont.)". In SHRINK mode the largest font scale at
+    # which the text fits is stored in the slide's font_scale; text that
+    # does not fit even at the smallest scale is split at that scale.
+
+    def __init__(self, template, boxes, mode=SPLIT):
+        if mode not in OVERFLOW_MODES:
+            raise ValueError(f"unknown overflow mode {mode!r}; expected one of {', '.join(OVERFLOW_MODES)}")
+        self.template = template
+        self.boxes = boxes
+        self.mode = mode
+
+    def fit(self, slide_data):
+        # The slides `slide_data` turns into (itself if its text fits)
+        box = self.boxes.get(slide_data.type)
+        content = slide_data.content if box is not None else None
+        if not content:
+            return [slide_data]
+        heights = self.paragraph_heights(content, box)
+        if sum(heights) <= box.height:
+            return [slide_data]
+        if self.mode == SHRINK:
+            scale = self.font_scale(content, box)
+            if scale is not None:
+                return [slide_data._replace(font_scale=scale)]
+            scale = FONT_SCALES[-1]
+            parts = self.split(slide_data, self.paragraph_heights(content, box, scale), box)
+            return [part._replace(font_scale=scale) for part in parts]
+        return self.split(slide_data, heights, box)
+
+    def paragraph_heights(self, paragraphs, box, scale=1.0):
+        # Height in points of every paragraph, spacing included
+        style = self.template.plan.roles['body']
+        metrics = font_metrics(style.font_family, style.bold, style.italic)
+        size = style.size.pt * scale
+        width = box.width / size
+        line_height = metrics.line_height * size
+        return [metrics.line_count(paragraph, width) * line_height + 2 * PARAGRAPH_SPACING
+                for paragraph in paragraphs]
+
+    def font_scale(self, paragraphs, box):
+        # Largest of FONT_SCALES at which the paragraphs fit, or None. The
+        # height only grows with the scale, so the scales are bisected.
+        def fits(scale):
+            return sum(self.paragraph_heights(paragraphs, box, scale)) <= box.height
+
+        if not fits(FONT_SCALES[-1]):
+            return None
+        low, high = 0, len(FONT_SCALES) - 1  # FONT_SCALES[high] fits
+        while low < high:
+            middle = (low + high) // 2
+            if fits(FONT_SCALES[middle]):
+                high = middle
+            else:
+                low = middle + 1
+        return FONT_SCALES[high]
+
+    def split(self, slide_data, heights, box):
+        # Packs paragraphs greedily; a paragraph taller than the whole box
+        # still gets a slide of its own
+        parts = []
+        current, used = [], 0.0
+        for paragraph, height in zip(slide_data.content, heights):
+            if current and used + height > box.height:
+                parts.append(current)
+                current, used = [], 0.0
+            current.append(paragraph)
+            used += height
+        parts.append(current)
+        title = slide_data.title
+        return [slide_data._replace(title=title if i == 0 else title + CONTINUED_SUFFIX, content=part)
+                for i, part in enumerate(parts)]
@@ -0,0 +1,88 @@
+import struct
+import zipfile
+from pptx.opc.oxml import serialize_part_xml
+from pptx.opc.packuri import CONTENT_TYPES_URI, PACKAGE_URI
+from pptx.opc.serialized import _ContentTypesItem
+
+# Writes a Presentation's package in place of prs.save(). Unlike the
+# python-pptx writer it
+#   - stores parts that are compressed already (JPEG, PNG, video, embedded
+#     workbooks) instead of deflating them a second time,
+#   - deflates XML parts at a chosen level (0 stores everything),
+#   - writes members in partname order with fixed timestamps, so the same
+#     deck always yields the same bytes,
+#   - writes to a path or to any writable file object, including
+#     unseekable ones such as pipes and HTTP response bodies.
+# copy_member() copies a member of another zip across as it is stored, for
+# packages that are mostly left as they are (see core.append).
+
+DEFAULT_COMPRESS_LEVEL = 6
+COPY_CHUNK_SIZE = 2**20
+# Zip's earliest representable time
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+PRECOMPRESSED_EXTENSIONS = frozenset((
+    'jpg', 'jpeg', 'jfif', 'png', 'gif', 'wdp', 'mp4', 'm4v', 'mov', 'wmv', 'mp3', 'm4a', 'wma',
+    'xlsx', 'docx', 'pptx', 'zip',
+))
+
+
+def save_presentation(prs, sink, compress_level=DEFAULT_COMPRESS_LEVEL):
+    # `sink` is a path or a binary file object open for writing
+    package = prs.part.package
+    parts = sorted(package.iter_parts(), key=lambda part: part.partname)
+    with zipfile.ZipFile(sink, 'w') as archive:
+        write = _member_writer(archive, compress_level)
+        write(CONTENT_TYPES_URI.membername, serialize_part_xml(_ContentTypesItem.xml_for(parts)))
+        write(PACKAGE_URI.rels_uri.membername, package._rels.xml)
+        for part in parts:
+            write(part.partname.membername, part.blob, part.partname.ext.lower() in PRECOMPRESSED_EXTENSIONS)
+            if part._rels:
+                write(part.partname.rels_uri.membername, part.rels.xml)
+
+
+def _member_writer(archive, compress_level):
+    def write(name, data, precompressed=False):
+        info = zipfile.ZipInfo(name, FIXED_DATE_TIME)
+        info.create_system = 0  # otherwise the host OS, which would make the bytes differ
+        info.external_attr = 0
+        if precompressed or compress_level == 0:
+            info.compress_type = zipfile.ZIP_STORED
+            archive.writestr(info, data)
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+            archive.writestr(info, data, compresslevel=compress_level)
+    return write
+
+
+def copy_member(source, info, archive):
+    # Copies member `info` of the ZipFile `source` into the ZipFile `archive`
+    # as it is stored, without decompressing and compressing it again, in
+    # chunks of COPY_CHUNK_SIZE. zipfile has no public way to do this, so the
+    # local header and data are written here and the member is registered
+    # for the central directory the way ZipFile.writestr does.
+    member = zipfile.ZipInfo(info.filename, info.date_time)
+    member.create_system = 0
+    member.external_attr = 0
+    member.compress_type = info.compress_type
+    member.CRC, member.compress_size, member.file_size = info.CRC, info.compress_size, info.file_size
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(zipfile.sizeFileHeader)
+    if len(header) != zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+        raise zipfile.BadZipFile(f"bad local header for {info.filename!r}")
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.fp.seek(info.header_offset + zipfile.sizeFileHeader + name_length + extra_length)
+    with archive._lock:
+        archive._writecheck(member)
+        archive._didModify = True
+        member.header_offset = archive.fp.tell()
+        archive.fp.write(member.FileHeader(max(member.file_size, member.compress_size) > zipfile.ZIP64_LIMIT))
+        remaining = info.compress_size
+        while remaining:
+            chunk = source.fp.read(min(remaining, COPY_CHUNK_SIZE))
+            if not chunk:
+                raise zipfile.BadZipFile(f"truncated data for {info.filename!r}")
+            archive.fp.write(chunk)
+            remaining -= len(chunk)
+        archive.filelist.append(member)
+        archive.NameToInfo[member.filename] = member
+        archive.start_dir = archive.fp.tell()
@@ -1,8 +1,10 @@
 from PyQt5.QtWidgets import QApplication
+from core.logs import configure_logging
 from ui.ui import MainWindow
 import sys
 
 def main():
+    configure_logging()
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,329 @@
+import argparse
+import bisect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from core.generator import GenerationCancelled
+from core.logs import DEFAULT_LOG_FILE, configure_logging, log_event
+from core.render import init_service_worker, render_markdown, resolve_template
+from core.writer import DEFAULT_COMPRESS_LEVEL
+
+# Local HTTP rendering service, run from the `src` directory:
+#
+#   python -m server --port 8000 -j 4
+#
+# POST /render renders markdown into a .pptx and returns its bytes. The body
+# is either the markdown itself, with the template named in the query
+# (?template=Ocean%20Teal), or JSON:
+#   {"markdown": "# Title\n...", "template": "Ocean Teal" or {template JSON}, "timeout": 30}
+# (see Template.from_dict for the template JSON). GET /healthz reports
+# liveness, GET /metrics exposes Prometheus metrics.
+#
+# Renders run in a process pool. Up to --queue requests wait for a free
+# worker; beyond that requests are refused with 429 right away. A request
+# that runs past its timeout (queueing included) is answered with 504 and
+# its render stops at the next slide, freeing the worker.
+
+DEFAULT_PORT = 8000
+DEFAULT_TIMEOUT = 60
+DEFAULT_MAX_BODY = 10 * 2**20
+# Extra wait for a worker to notice its deadline and give up
+CANCEL_GRACE = 5
+PPTX_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    def lines(self, name):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{le="{bound}"}} {cumulative}'
+        yield f'{name}_sum {self.sum:.6f}'
+        yield f'{name}_count {cumulative}'
+
+
+class RenderService:
+    def __init__(self, workers=None, queue=None, timeout=DEFAULT_TIMEOUT, log_file=DEFAULT_LOG_FILE,
+                 compress_level=DEFAULT_COMPRESS_LEVEL):
+        self.workers = workers or os.cpu_count()
+        self.queue = self.workers * 2 if queue is None else queue
+        self.timeout = timeout
+        self._initargs = (log_file, compress_level)
+        self._executor = self._new_executor()
+        # Admitted requests, running or waiting for a worker
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue)
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.responses = {}  # status code: count
+        self.slides = 0
+        self.output_bytes = 0
+        self.request_seconds = Histogram()
+        self.render_seconds = Histogram()
+        self.started = time.time()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=init_service_worker,
+                                   initargs=self._initargs)
+
+    def render(self, text, template, timeout=None):
+        # Returns the RenderedDeck; raises RequestError
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        if not self._slots.acquire(blocking=False):
+            raise RequestError(429, f"queue full ({self.workers} rendering, {self.queue} waiting)")
+        deadline = time.time() + timeout
+        executor = self._executor
+        try:
+            future = executor.submit(render_markdown, text, template, deadline)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._replace_executor(executor)
+            raise RequestError(503, "render workers are restarting")
+        except BaseException:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.pending += 1
+        # The slot is held until the render itself ends, not the request:
+        # a timed-out render keeps its worker busy until it notices
+        future.add_done_callback(self._release)
+        try:
+            deck = future.result(timeout=timeout + CANCEL_GRACE)
+        except (GenerationCancelled, FutureTimeout):
+            raise RequestError(504, f"render did not finish within {timeout:g}s")
+        except BrokenProcessPool:
+            self._replace_executor(executor)
+            raise RequestError(503, "render worker died")
+        with self._lock:
+            self.slides += deck.slides
+            self.output_bytes += len(deck.data)
+            self.render_seconds.observe(deck.seconds)
+        return deck
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+        self._slots.release()
+
+    def _replace_executor(self, broken):
+        with self._lock:
+            if self._executor is not broken:
+                return
+            self._executor = self._new_executor()
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def record(self, status, seconds):
+        with self._lock:
+            self.responses[status] = self.responses.get(status, 0) + 1
+            self.request_seconds.observe(seconds)
+
+    def health(self):
+        with self._lock:
+            return {'status': 'ok', 'workers': self.workers, 'pending': self.pending,
+                    'capacity': self.workers + self.queue, 'uptime_s': round(time.time() - self.started, 3)}
+
+    def metrics(self):
+        with self._lock:
+            lines = [
+                '# HELP ttp_queue_depth Requests waiting for a render worker.',
+                '# TYPE ttp_queue_depth gauge',
+                f'ttp_queue_depth {max(0, self.pending - self.workers)}',
+                '# HELP ttp_renders_in_progress Requests being rendered.',
+                '# TYPE ttp_renders_in_progress gauge',
+                f'ttp_renders_in_progress {min(self.pending, self.workers)}',
+                '# HELP ttp_queue_capacity Requests admitted before new ones are refused with 429.',
+                '# TYPE ttp_queue_capacity gauge',
+                f'ttp_queue_capacity {self.workers + self.queue}',
+                '# HELP ttp_requests_total Render requests answered, by status code.',
+                '# TYPE ttp_requests_total counter',
+                *(f'ttp_requests_total{{code="{code}"}} {count}' for code, count in sorted(self.responses.items())),
+                '# HELP ttp_slides_rendered_total Slides in the decks returned.',
+                '# TYPE ttp_slides_rendered_total counter',
+                f'ttp_slides_rendered_total {self.slides}',
+                '# HELP ttp_output_bytes_total Bytes of the decks returned.',
+                '# TYPE ttp_output_bytes_total counter',
+                f'ttp_output_bytes_total {self.output_bytes}',
+                '# HELP ttp_request_seconds Render request latency, queueing included.',
+                '# TYPE ttp_request_seconds histogram',
+                *self.request_seconds.lines('ttp_request_seconds'),
+                '# HELP ttp_render_seconds Time a worker spent rendering a deck.',
+                '# TYPE ttp_render_seconds histogram',
+                *self.render_seconds.lines('ttp_render_seconds'),
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_render_request(content_type, body, query):
+    # (markdown, template, timeout) from a request; raises RequestError
+    if content_type == 'application/json':
+        try:
+            payload = json.loads(body)
+        except (UnicodeDecodeError, ValueError) as e:
+            raise RequestError(400, f"invalid JSON: {e}")
+        if not isinstance(payload, dict) or not isinstance(payload.get('markdown'), str):
+            raise RequestError(400, "expected an object with a 'markdown' string")
+        template, timeout = payload.get('template', 'Elegant Blue'), payload.get('timeout')
+        text = payload['markdown']
+    else:
+        try:
+            text = body.decode('utf-8')
+        except UnicodeDecodeError:
+            raise RequestError(400, "markdown must be UTF-8")
+        template = query.get('template', ['Elegant Blue'])[0]
+        timeout = query.get('timeout', [None])[0]
+    try:
+        timeout = None if timeout is None else float(timeout)
+    except (TypeError, ValueError):
+        raise RequestError(400, f"invalid timeout {timeout!r}")
+    if timeout is not None and timeout <= 0:
+        raise RequestError(400, "timeout must be positive")
+    if not isinstance(template, (str, dict)):
+        raise RequestError(400, "template must be a name or a template object")
+    if not text.strip():
+        raise RequestError(400, "no markdown to render")
+    # Bad templates are refused before they take a queue slot
+    try:
+        resolve_template(template)
+    except ValueError as e:
+        raise RequestError(400, str(e))
+    return text, template, timeout
+
+
+def make_handler(service, max_body=DEFAULT_MAX_BODY):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            path = urlsplit(self.path).path
+            if path == '/healthz':
+                self._send(200, 'application/json', json.dumps(service.health()).encode())
+            elif path == '/metrics':
+                self._send(200, 'text/plain; version=0.0.4', service.metrics().encode())
+            else:
+                self._error(404, "not found")
+
+        def do_POST(self):
+            url = urlsplit(self.path)
+            if url.path != '/render':
+                self._error(404, "not found")
+                return
+            start = time.perf_counter()
+            status = 500
+            try:
+                try:
+                    length = int(self.headers.get('Content-Length') or 0)
+                except ValueError:
+                    length = -1
+                # The body of a bad length cannot be skipped, so the
+                # connection is not reused
+                if length < 0:
+                    self.close_connection = True
+                    raise RequestError(400, "invalid Content-Length")
+                if length > max_body:
+                    self.close_connection = True
+                    raise RequestError(413, f"request body over {max_body} bytes")
+                body = self.rfile.read(length)
+                content_type = (self.headers.get('Content-Type') or '').split(';')[0].strip().lower()
+                text, template, timeout = parse_render_request(content_type, body, parse_qs(url.query))
+                deck = service.render(text, template, timeout)
+                status = 200
+                self._send(200, PPTX_TYPE, deck.data, {
+                    'Content-Disposition': 'attachment; filename="presentation.pptx"',
+                    'X-Slides': str(deck.slides),
+                    'X-Render-Seconds': f'{deck.seconds:.3f}',
+                })
+            except RequestError as e:
+                status = e.status
+                self._error(e.status, str(e))
+            except Exception as e:
+                log_event('render_request_failed', logging.ERROR, exc_info=e)
+                self._error(500, f"{type(e).__name__}: {e}")
+            finally:
+                seconds = time.perf_counter() - start
+                service.record(status, seconds)
+                log_event('render_request', status=status, seconds=round(seconds, 6),
+                          client=self.client_address[0])
+
+        def _error(self, status, message):
+            headers = {'Retry-After': '1'} if status == 429 else {}
+            self._send(status, 'application/json', json.dumps({'error': message}).encode(), headers)
+
+        def _send(self, status, content_type, data, headers=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Serve markdown to PowerPoint rendering over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to bind (default: %(default)s)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help='Port to bind, 0 for any free port')
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count(),
+                        help='Render worker processes (default: all cores)')
+    parser.add_argument('--queue', type=int,
+                        help='Requests that may wait for a worker before 429s (default: twice the workers)')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='Longest time a request may take, queueing included (default: %(default)ss)')
+    parser.add_argument('--max-body', type=int, default=DEFAULT_MAX_BODY, help='Largest accepted request in bytes')
+    parser.add_argument('--compress-level', type=int, default=DEFAULT_COMPRESS_LEVEL, choices=range(10),
+                        metavar='0-9', help='Deflate level of XML parts, 0 stores them (default: %(default)s)')
+    parser.add_argument('--log-file', default=DEFAULT_LOG_FILE,
+                        help='JSON-lines log of requests and failures (default: %(default)s)')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.log_file:
+        configure_logging(args.log_file)
+    service = RenderService(args.workers, args.queue, args.timeout, args.log_file, args.compress_level)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, args.max_body))
+    server.daemon_threads = True
+    host, port = server.server_address[:2]
+    print(f"listening on http://{host}:{port} ({service.workers} workers, queue {service.queue})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,28 @@
 from pptx.dml.color import RGBColor
 from pptx.util import Pt, Inches
 from pptx.enum.text import PP_ALIGN
-from pptx.enum.shapes import MSO_SHAPE
-from pptx.enum.text import MSO_AUTO_SIZE
+from pptx.enum.shapes import MSO_SHAPE, PP_PLACEHOLDER
+from pptx.oxml import parse_xml
+from pptx.oxml.shapes.autoshape import CT_Shape
+from pptx.shapes.autoshape import AutoShapeType, Shape
+from pptx.oxml.ns import nsdecls, qn
+from collections import namedtuple
+from copy import deepcopy
+from xml.sax.saxutils import escape
+from core import profiling
+
+QUOTE_FONT_SIZE = 24
+TITLE_PLACEHOLDERS = (PP_PLACEHOLDER.TITLE, PP_PLACEHOLDER.CENTER_TITLE)
+FILL_TAGS = tuple(qn(f'a:{tag}') for tag in ('noFill', 'solidFill', 'gradFill', 'blipFill', 'pattFill', 'grpFill'))
+AFTER_LATIN_TAGS = tuple(qn(f'a:{tag}') for tag in ('ea', 'cs', 'sym', 'hlinkClick', 'hlinkMouseOver', 'rtl', 'extLst'))
+PARAGRAPH_SPACING = Pt(6)
+
+# Compiled, immutable form of a Template. Text rules are grouped by
+# placeholder role ('title', 'body', 'quote'), and the background, run and
+# spacing XML is built once so applying a style only copies elements.
+TextStyle = namedtuple('TextStyle', ['font_family', 'size', 'bold', 'italic', 'color', 'alignment'])
+StylePlan = namedtuple('StylePlan', ['roles', 'background', 'run_properties', 'alignments', 'spacing',
+                                     'decoration'])
 
 class Template:
     def __init__(self, name, theme_color, background_color, font_family, title_font_size, content_font_size, 
@@ -21,58 +41,296 @@ class Template:
         self.content_bold = content_bold
         self.gradient = gradient  # tuple of two RGB tuples
         self.shape = shape
-        self.slide_master = slide_master  # For future use
+        self.slide_master = slide_master  # Default for SlideGenerator master_mode
+        self._plan = None
     
-    def apply_style(self, slide):
-        background = slide.background
-        fill = background.fill
-        
-        if self.gradient:
-            fill.gradient()
-            fill.gradient_stops[0].color.rgb = RGBColor(*self.gradient[0])
-            fill.gradient_stops[1].color.rgb = RGBColor(*self.gradient[1])
+    def __setattr__(self, name, value):
+        # Any change to the template (e.g. UI customizations) invalidates the compiled plan
+        super().__setattr__(name, value)
+        if not name.startswith('_'):
+            super().__setattr__('_plan', None)
+
+    def __getstate__(self):
+        # The compiled plan holds lxml elements, which do not pickle; a
+        # template sent to another process compiles its own
+        return dict(vars(self), _plan=None)
+
+    @classmethod
+    def from_dict(cls, data):
+        # Builds a template from its JSON form, e.g.
+        #   {"name": "Brand", "theme_color": "#0066cc", "background_color": [255, 255, 255],
+        #    "font_family": "Arial", "title_font_size": 40, "content_font_size": 20,
+        #    "title_alignment": "center", "gradient": ["#0066cc", "#cce5ff"], "shape": "rectangle"}
+        # Raises ValueError for missing, unknown or malformed fields.
+        if not isinstance(data, dict):
+            raise ValueError("a template must be a JSON object")
+        unknown = set(data) - set(TEMPLATE_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown template fields: {', '.join(sorted(unknown))}")
+        missing = [name for name in REQUIRED_TEMPLATE_FIELDS if name not in data]
+        if missing:
+            raise ValueError(f"missing template fields: {', '.join(missing)}")
+        kwargs = {}
+        for name, value in data.items():
+            try:
+                kwargs[name] = TEMPLATE_FIELDS[name](value)
+            except (AttributeError, TypeError, ValueError, KeyError) as e:
+                raise ValueError(f"invalid template field {name!r}: {value!r}") from e
+        return cls(**kwargs)
+
+    @property
+    def plan(self):
+        if self._plan is None:
+            with profiling.stage('template_compile'):
+                self._plan = self.compile()
+        return self._plan
+
+    def state_key(self):
+        # Stable description of everything that affects rendering; unlike
+        # the plan it can be compared across processes and runs
+        return repr(sorted((name, value) for name, value in vars(self).items() if not name.startswith('_')))
+
+    def compile(self):
+        title_color = RGBColor(*self.theme_color)
+        # Choose text color based on background: black on white, white on colors
+        if self.background_color == (255, 255, 255):
+            body_color = RGBColor(0, 0, 0)
         else:
-            fill.solid()
-            fill.fore_color.rgb = RGBColor(*self.background_color)
-    
-        if self.shape:
-            left = top = Inches(0)
-            width = height = Inches(10)
-            shape = slide.shapes.add_shape(self.shape, left, top, width, height)
-            shape.fill.solid()
-            shape.fill.fore_color.rgb = RGBColor(*self.theme_color)
-            shape.line.color.rgb = RGBColor(*self.theme_color)
-    
-        for shp in slide.shapes:
-            if hasattr(shp, 'text_frame'):
-                for paragraph in shp.text_frame.paragraphs:
-                    if shp == slide.shapes.title:
-                        paragraph.alignment = self.title_alignment
-                        font_size = self.title_font_size
-                        is_bold = self.title_bold
-                        bullet = False
-                    else:
-                        paragraph.alignment = self.content_alignment
-                        font_size = self.content_font_size
-                        is_bold = self.content_bold
-                        bullet = True
-                    for run in paragraph.runs:
-                        font = run.font
-                        font.name = self.font_family
-                        font.size = Pt(font_size)
-                        font.bold = is_bold
-                        if shp == slide.shapes.title:
-                            font.color.rgb = RGBColor(*self.theme_color)
-                        else:
-                            # Choose text color based on background
-                            if self.background_color == (255, 255, 255):
-                                font.color.rgb = RGBColor(0, 0, 0)  # Black text on white background
-                            else:
-                                font.color.rgb = RGBColor(255, 255, 255)  # White text on colored background
-                        font.auto_size = MSO_AUTO_SIZE.TEXT_TO_FIT_SHAPE  # Enable auto-sizing
-                        paragraph.space_before = Pt(6)
-                        paragraph.space_after = Pt(6)
-                        paragraph.bullet = bullet
+            body_color = RGBColor(255, 255, 255)
+        body = TextStyle(self.font_family, Pt(self.content_font_size), self.content_bold, None,
+                         body_color, self.content_alignment)
+        roles = {
+            'title': TextStyle(self.font_family, Pt(self.title_font_size), self.title_bold, None,
+                               title_color, self.title_alignment),
+            'body': body,
+            'quote': body._replace(size=Pt(QUOTE_FONT_SIZE), italic=True, alignment=PP_ALIGN.CENTER),
+        }
+        return StylePlan(
+            roles=roles,
+            background=_background_xml(self.gradient, self.background_color),
+            run_properties={role: _run_properties_xml(style) for role, style in roles.items()},
+            alignments={role: style.alignment.xml_value for role, style in roles.items()},
+            spacing=(_spacing_xml('spcBef', PARAGRAPH_SPACING), _spacing_xml('spcAft', PARAGRAPH_SPACING)),
+            decoration=_decoration_xml(self.shape, self.theme_color) if self.shape else None,
+        )
+
+    def apply_style(self, slide, body_role='body', inherit=False):
+        # Styles a slide whose content is already filled in: one pass over its
+        # shapes, stamping copies of the plan's precompiled XML. With
+        # `inherit`, the slide master already carries the template (see
+        # apply_to_master) and only roles the master cannot express are set.
+        plan = self.plan
+        if inherit and body_role == 'body':
+            return
+        if not inherit:
+            _replace_background(slide._element.cSld, plan.background)
+
+        shapes = slide.shapes
+        title = shapes.title
+        title_id = title.shape_id if title is not None else None
+        for shp in shapes:
+            if not shp.has_text_frame:
+                continue
+            role = 'title' if shp.shape_id == title_id else body_role
+            if inherit and role == 'title':
+                continue
+            alignment = plan.alignments[role]
+            run_properties = plan.run_properties[role]
+            for p in shp.text_frame._txBody.p_lst:
+                pPr = p.get_or_add_pPr()
+                pPr.set('algn', alignment)
+                runs = p.r_lst
+                if not runs:
+                    continue
+                _set_spacing(pPr, plan.spacing)
+                for r in runs:
+                    rPr = deepcopy(run_properties)
+                    old_rPr = r.rPr
+                    if old_rPr is not None:
+                        for name, value in old_rPr.attrib.items():
+                            if name not in rPr.attrib:
+                                rPr.set(name, value)
+                        r.remove(old_rPr)
+                    r.insert(0, rPr)
+
+        if plan.decoration is not None and not inherit:
+            _insert_decoration(shapes._spTree, plan.decoration, shapes._next_shape_id)
+
+    def apply_to_master(self, prs):
+        # Writes the template into the slide master and its layouts once, so
+        # slides inherit background, fonts, colors and decoration instead of
+        # repeating them in every slide part.
+        plan = self.plan
+        master = prs.slide_master
+        _replace_background(master._element.cSld, plan.background)
+        tx_styles = master._element.find(qn('p:txStyles'))
+        _stamp_level(tx_styles.find(qn('p:titleStyle')).find(qn('a:lvl1pPr')), plan, 'title')
+        _stamp_level(tx_styles.find(qn('p:bodyStyle')).find(qn('a:lvl1pPr')), plan, 'body')
+        if plan.decoration is not None:
+            sp_tree = master._element.cSld.spTree
+            next_id = max(int(i) for i in sp_tree.xpath('//p:cNvPr/@id')) + 1
+            _insert_decoration(sp_tree, plan.decoration, next_id)
+
+        for layout in master.slide_layouts:
+            c_sld = layout._element.cSld
+            if c_sld.bg is not None:
+                c_sld.remove(c_sld.bg)
+            # Layout placeholders may override the master text styles
+            for ph in layout.placeholders:
+                lst_style = ph._element.find(qn('p:txBody') + '/' + qn('a:lstStyle'))
+                lvl = lst_style.find(qn('a:lvl1pPr')) if lst_style is not None else None
+                if lvl is not None:
+                    role = 'title' if ph.placeholder_format.type in TITLE_PLACEHOLDERS else 'body'
+                    _stamp_level(lvl, plan, role)
+
+
+def _replace_background(c_sld, background):
+    if c_sld.bg is not None:
+        c_sld.remove(c_sld.bg)
+    c_sld.insert(0, deepcopy(background))
+
+
+def _insert_decoration(sp_tree, decoration, shape_id):
+    # Decoration goes behind the content (after nvGrpSpPr and grpSpPr)
+    sp = deepcopy(decoration)
+    sp.nvSpPr.cNvPr.id = shape_id
+    sp_tree.insert(2, sp)
+
+
+def _stamp_level(lvl, plan, role):
+    # Applies a role to a list-level paragraph style (a:lvl1pPr), keeping
+    # schema order: fill first in defRPr, latin before ea/cs.
+    lvl.set('algn', plan.alignments[role])
+    _set_spacing(lvl, plan.spacing)
+    run_properties = plan.run_properties[role]
+    def_rpr = lvl.find(qn('a:defRPr'))
+    if def_rpr is None:
+        def_rpr = lvl.makeelement(qn('a:defRPr'), {})
+        ext_lst = lvl.find(qn('a:extLst'))
+        if ext_lst is not None:
+            ext_lst.addprevious(def_rpr)
+        else:
+            lvl.append(def_rpr)
+    for name in ('sz', 'b', 'i'):
+        if name in run_properties.attrib:
+            def_rpr.set(name, run_properties.get(name))
+        elif name in def_rpr.attrib:
+            del def_rpr.attrib[name]
+    for child in list(def_rpr):
+        if child.tag in FILL_TAGS or child.tag == qn('a:latin'):
+            def_rpr.remove(child)
+    fill, latin = (deepcopy(child) for child in run_properties)
+    def_rpr.insert(1 if len(def_rpr) and def_rpr[0].tag == qn('a:ln') else 0, fill)
+    following = [child for child in def_rpr if child.tag in AFTER_LATIN_TAGS]
+    if following:
+        following[0].addprevious(latin)
+    else:
+        def_rpr.append(latin)
+
+
+def _decoration_xml(shape, color):
+    sp = CT_Shape.new_autoshape_sp(0, 'Template Decoration', AutoShapeType(shape).prst, 0, 0, Inches(10), Inches(10))
+    decoration = Shape(sp, None)
+    decoration.fill.solid()
+    decoration.fill.fore_color.rgb = RGBColor(*color)
+    decoration.line.color.rgb = RGBColor(*color)
+    return sp
+
+
+def _background_xml(gradient, background_color):
+    if gradient:
+        fill = (
+            '<a:gradFill rotWithShape="1"><a:gsLst>'
+            f'<a:gs pos="0"><a:srgbClr val="{RGBColor(*gradient[0])}"/></a:gs>'
+            f'<a:gs pos="100000"><a:srgbClr val="{RGBColor(*gradient[1])}"/></a:gs>'
+            '</a:gsLst><a:lin scaled="0"/></a:gradFill>'
+        )
+    else:
+        fill = f'<a:solidFill><a:srgbClr val="{RGBColor(*background_color)}"/></a:solidFill>'
+    return parse_xml(f'<p:bg {nsdecls("p", "a")}><p:bgPr>{fill}<a:effectLst/></p:bgPr></p:bg>')
+
+
+def _run_properties_xml(style):
+    attributes = f'sz="{style.size.centipoints}" b="{int(style.bold)}"'
+    if style.italic is not None:
+        attributes += f' i="{int(style.italic)}"'
+    return parse_xml(
+        f'<a:rPr {nsdecls("a")} {attributes}>'
+        f'<a:solidFill><a:srgbClr val="{style.color}"/></a:solidFill>'
+        f'<a:latin typeface="{escape(style.font_family, {chr(34): "&quot;"})}"/>'
+        '</a:rPr>'
+    )
+
+
+def _spacing_xml(tag, spacing):
+    return parse_xml(f'<a:{tag} {nsdecls("a")}><a:spcPts val="{spacing.centipoints}"/></a:{tag}>')
+
+
+def _set_spacing(pPr, spacing):
+    # spcBef and spcAft come right after the optional lnSpc in a:pPr
+    for child in pPr.findall(qn('a:spcBef')) + pPr.findall(qn('a:spcAft')):
+        pPr.remove(child)
+    index = 1 if len(pPr) and pPr[0].tag == qn('a:lnSpc') else 0
+    for offset, element in enumerate(spacing):
+        pPr.insert(index + offset, deepcopy(element))
+
+
+def _color(value):
+    # "#rrggbb" or [r, g, b]
+    if isinstance(value, str):
+        value = value.lstrip('#')
+        if len(value) != 6:
+            raise ValueError(value)
+        return tuple(int(value[i:i + 2], 16) for i in (0, 2, 4))
+    color = tuple(int(channel) for channel in value)
+    if len(color) != 3 or not all(0 <= channel <= 255 for channel in color):
+        raise ValueError(value)
+    return color
+
+
+def _gradient(value):
+    if value is None:
+        return None
+    start, end = value
+    return _color(start), _color(end)
+
+
+def _font_size(value):
+    if isinstance(value, bool) or not 1 <= value <= 400:
+        raise ValueError(value)
+    return value
+
+
+def _flag(value):
+    if not isinstance(value, bool):
+        raise TypeError(value)
+    return value
+
+
+def _nonempty(value):
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(value)
+    return value
+
+
+# Parser of every field Template.from_dict accepts
+TEMPLATE_FIELDS = {
+    'name': _nonempty,
+    'theme_color': _color,
+    'background_color': _color,
+    'font_family': _nonempty,
+    'title_font_size': _font_size,
+    'content_font_size': _font_size,
+    'title_alignment': lambda value: PP_ALIGN[value.upper()],
+    'content_alignment': lambda value: PP_ALIGN[value.upper()],
+    'title_bold': _flag,
+    'content_bold': _flag,
+    'gradient': _gradient,
+    'shape': lambda value: None if value is None else MSO_SHAPE[value.upper()],
+    'slide_master': lambda value: None if value is None else _flag(value),
+}
+REQUIRED_TEMPLATE_FIELDS = ('name', 'theme_color', 'background_color', 'font_family', 'title_font_size',
+                            'content_font_size')
 
 # Define improved templates with better color matching and minimal black text
 TEMPLATES = {
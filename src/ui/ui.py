@@ -1,15 +1,16 @@
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QLabel, QTextEdit, QPushButton, QHBoxLayout, 
     QFileDialog, QMessageBox, QComboBox, QFontComboBox, QSpinBox, QColorDialog, 
-    QCheckBox, QTabWidget
+    QCheckBox, QTabWidget, QProgressBar, QScrollArea, QSplitter, QShortcut
 )
-from PyQt5.QtGui import QFont, QPixmap
-from PyQt5.QtCore import Qt, QSize
-from core.generator import SlideGenerator
-from templates.templates import TEMPLATES
-from utils.utils import convert_pptx_to_image, load_image
-import logging
+from PyQt5.QtGui import QFont, QPixmap, QKeySequence
+from PyQt5.QtCore import Qt, QTimer
+from ui.worker import GenerationWorker, LivePreviewWorker, OfficeWorker, WarmupWorker
 import os
+import time
+
+# Quiet time after the last keystroke before the live preview updates
+LIVE_PREVIEW_DELAY_MS = 30
 
 class MainWindow(QWidget):
     def __init__(self):
@@ -93,7 +94,20 @@ class MainWindow(QWidget):
                                          "![Image Description](https://example.com/image.png)\n"
                                          "@chart {Categories: A,B,C; Series1: 10,20,30; Series2: 15,25,35}\n"
                                          "> Inspirational Quote")
-        self.input_layout.addWidget(self.text_edit)
+        
+        # Live preview of the slide under the cursor, next to the editor
+        self.preview_label = QLabel("The slide under the cursor is previewed here.")
+        self.preview_label.setAlignment(Qt.AlignCenter)
+        self.preview_label.setObjectName("preview_label")
+        self.debug_overlay = QLabel(self.preview_label)
+        self.debug_overlay.setStyleSheet("background-color: rgba(0, 0, 0, 160); color: #00ff00; "
+                                         "font-family: monospace; font-size: 12px; padding: 4px;")
+        self.debug_overlay.hide()
+        
+        self.input_splitter = QSplitter(Qt.Horizontal)
+        self.input_splitter.addWidget(self.text_edit)
+        self.input_splitter.addWidget(self.preview_label)
+        self.input_layout.addWidget(self.input_splitter)
         
         # Template Tab
         self.template_tab = QWidget()
@@ -103,8 +117,9 @@ class MainWindow(QWidget):
         # Template Selection
         self.template_selection_layout = QHBoxLayout()
         self.template_selection_layout.addWidget(QLabel("Select Template:"))
+        # Filled in once the templates are imported (see warmup_finished)
+        self.templates = {}
         self.template_combo = QComboBox()
-        self.template_combo.addItems(TEMPLATES.keys())
         self.template_combo.currentTextChanged.connect(self.load_template_settings)
         self.template_selection_layout.addWidget(self.template_combo)
         self.template_layout.addLayout(self.template_selection_layout)
@@ -161,6 +176,7 @@ class MainWindow(QWidget):
         # Apply Customizations Button
         self.apply_custom_btn = QPushButton("Apply Customizations")
         self.apply_custom_btn.clicked.connect(self.apply_customizations)
+        self.apply_custom_btn.setEnabled(False)
         self.template_layout.addWidget(self.apply_custom_btn)
         
         # Preview Tab
@@ -168,10 +184,37 @@ class MainWindow(QWidget):
         self.tabs.addTab(self.preview_tab, "Preview")
         self.preview_layout = QVBoxLayout(self.preview_tab)
         
-        self.preview_label = QLabel("Preview will be available after generating the presentation.")
-        self.preview_label.setAlignment(Qt.AlignCenter)
-        self.preview_label.setObjectName("preview_label")
-        self.preview_layout.addWidget(self.preview_label)
+        self.preview_hint = QLabel("Preview will be available after generating the presentation.")
+        self.preview_hint.setAlignment(Qt.AlignCenter)
+        self.preview_layout.addWidget(self.preview_hint)
+        
+        # The generated deck's first slide, above the thumbnail strip
+        self.slide_label = QLabel()
+        self.slide_label.setAlignment(Qt.AlignCenter)
+        self.slide_label.setObjectName("preview_label")
+        self.slide_label.hide()
+        self.preview_layout.addWidget(self.slide_label)
+        
+        self.thumbnail_label = QLabel()
+        self.thumbnail_scroll = QScrollArea()
+        self.thumbnail_scroll.setWidget(self.thumbnail_label)
+        self.thumbnail_scroll.setFixedHeight(160)
+        self.thumbnail_scroll.hide()
+        self.preview_layout.addWidget(self.thumbnail_scroll)
+        
+        # Exact rendering of the saved deck through LibreOffice
+        self.office_layout = QHBoxLayout()
+        self.exact_preview_button = QPushButton("Exact Preview (LibreOffice)")
+        self.exact_preview_button.clicked.connect(self.exact_preview)
+        self.exact_preview_button.setEnabled(False)
+        self.office_layout.addWidget(self.exact_preview_button)
+        self.export_pdf_button = QPushButton("Export PDF")
+        self.export_pdf_button.clicked.connect(self.export_pdf)
+        self.export_pdf_button.setEnabled(False)
+        self.office_layout.addWidget(self.export_pdf_button)
+        self.preview_layout.addLayout(self.office_layout)
+        self.last_output = None
+        self.office_worker = None
         
         # Buttons Layout
         self.buttons_layout = QHBoxLayout()
@@ -184,15 +227,67 @@ class MainWindow(QWidget):
         self.generate_button = QPushButton("Generate Presentation")
         self.generate_button.setObjectName("generate")
         self.generate_button.clicked.connect(self.generate_presentation)
+        self.generate_button.setEnabled(False)
         self.buttons_layout.addWidget(self.generate_button)
         
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_generation)
+        self.cancel_button.setEnabled(False)
+        self.buttons_layout.addWidget(self.cancel_button)
+        
         self.layout.addLayout(self.buttons_layout)
         
-        # Initialize Template Settings
-        self.load_template_settings(self.template_combo.currentText())
+        # Generation Progress
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setFormat("%v / %m slides")
+        self.progress_bar.hide()
+        self.layout.addWidget(self.progress_bar)
+        self.worker = None
+        
+        # Live Preview: the text is re-parsed incrementally once typing pauses
+        # and only the slide under the cursor is drawn, off the GUI thread
+        self.live_document = None
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(LIVE_PREVIEW_DELAY_MS)
+        self.live_timer.timeout.connect(self.update_live_preview)
+        self.live_worker = LivePreviewWorker(load_image=self.load_preview_image, parent=self)
+        self.live_worker.rendered.connect(self.show_live_preview)
+        self.live_worker.start()
+        self.last_edit_time = time.perf_counter()
+        self.last_preview_latency_ms = None
+        self._live_requested = None
+        self.text_edit.textChanged.connect(self.schedule_live_preview)
+        self.text_edit.cursorPositionChanged.connect(self.schedule_live_preview)
+        self.template_combo.currentTextChanged.connect(self.schedule_live_preview)
+        QShortcut(QKeySequence(Qt.Key_F12), self, activated=self.toggle_debug_overlay)
+        
+        # Generation and previews need python-pptx and friends, which are
+        # imported in the background once the window is painted
+        self.warmup_worker = WarmupWorker(self)
+        self.warmup_worker.ready.connect(self.warmup_finished)
+        self.warmup_worker.failed.connect(self.warmup_failed)
+    
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.warmup_worker.isRunning() and not self.warmup_worker.isFinished():
+            self.warmup_worker.start()
+    
+    def warmup_finished(self):
+        from core.live_parser import LiveDocument
+        from templates.templates import TEMPLATES
+        self.templates = TEMPLATES
+        self.live_document = LiveDocument()
+        # Selecting the first template loads its settings and previews any text typed meanwhile
+        self.template_combo.addItems(TEMPLATES.keys())
+        self.apply_custom_btn.setEnabled(True)
+        self.generate_button.setEnabled(True)
+    
+    def warmup_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to load the presentation engine: {message}")
     
     def load_template_settings(self, template_name):
-        template = TEMPLATES.get(template_name)
+        template = self.templates.get(template_name)
         if not template:
             return
         self.font_combo.setCurrentFont(QFont(template.font_family))
@@ -225,7 +320,7 @@ class MainWindow(QWidget):
     
     def apply_customizations(self):
         template_name = self.template_combo.currentText()
-        template = TEMPLATES.get(template_name)
+        template = self.templates.get(template_name)
         if not template:
             QMessageBox.critical(self, "Error", "Selected template not found.")
             return
@@ -240,7 +335,9 @@ class MainWindow(QWidget):
     
     def clear_input(self):
         self.text_edit.clear()
-        self.preview_label.setText("Preview will be available after generating the presentation.")
+        self.slide_label.hide()
+        self.thumbnail_scroll.hide()
+        self.preview_hint.show()
     
     def generate_presentation(self):
         input_text = self.text_edit.toPlainText()
@@ -258,28 +355,172 @@ class MainWindow(QWidget):
             file_path += '.pptx'
 
         template_name = self.template_combo.currentText()
-        template = TEMPLATES.get(template_name)
+        template = self.templates.get(template_name)
         if not template:
             QMessageBox.critical(self, "Error", "Selected template not found.")
             return
 
-        generator = SlideGenerator(template)
-        try:
-            generator.generate_presentation(input_text, file_path)
+        from core.parse_cache import default_parse_cache
+        from core.pool import default_pool
+        from core.slide_cache import default_slide_cache
+        generator = default_pool().acquire(template)
+        generator.slide_cache = default_slide_cache()
+        generator.parse_cache = default_parse_cache()
+        self.worker = GenerationWorker(generator, input_text, file_path, parent=self)
+        self.worker.progress.connect(self.update_progress)
+        self.worker.succeeded.connect(self.generation_succeeded)
+        self.worker.failed.connect(self.generation_failed)
+        self.worker.cancelled.connect(self.generation_cancelled)
+        self.worker.finished.connect(self.generation_finished)
+        # The worker styles slides with the template: it must not be
+        # customized until the worker is done
+        self.generate_button.setEnabled(False)
+        self.apply_custom_btn.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        self.progress_bar.setRange(0, 0)
+        self.progress_bar.show()
+        self.worker.start()
+
+    def cancel_generation(self):
+        if self.worker is not None:
+            self.worker.cancel()
+            self.cancel_button.setEnabled(False)
+
+    def update_progress(self, count, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(count)
+
+    def generation_succeeded(self, file_path, preview, thumbnails, preview_error):
+        self.last_output = file_path
+        self.preview_presentation(preview, thumbnails)
+        self.set_office_buttons_enabled(True)
+        if preview_error:
+            QMessageBox.warning(self, "Success",
+                                f"Presentation saved as {file_path}, but its preview failed: {preview_error}")
+        else:
             QMessageBox.information(self, "Success", f"Presentation saved as {file_path}")
-            self.preview_presentation(file_path)
-        except Exception as e:
-            logging.error(f"Failed to generate presentation: {e}", exc_info=True)
-            QMessageBox.critical(self, "Error", f"An error occurred: {str(e)}")
 
-    def preview_presentation(self, file_path):
-        temp_image = os.path.join(os.path.dirname(file_path), "temp_preview.png")
-        success = convert_pptx_to_image(file_path, temp_image)
-        if success and os.path.exists(temp_image):
-            pixmap = load_image(temp_image)
-            if pixmap:
-                self.preview_label.setPixmap(pixmap.scaled(
-                    QSize(800, 600), Qt.KeepAspectRatio, Qt.SmoothTransformation))
-                os.remove(temp_image)
-                return
-        self.preview_label.setText("Failed to generate preview image.")
+    def generation_failed(self, message):
+        QMessageBox.critical(self, "Error", f"An error occurred: {message}")
+
+    def generation_cancelled(self):
+        QMessageBox.information(self, "Cancelled", "Presentation generation was cancelled.")
+
+    def generation_finished(self):
+        self.worker.deleteLater()
+        self.worker = None
+        self.generate_button.setEnabled(True)
+        self.apply_custom_btn.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        self.progress_bar.hide()
+
+    def preview_presentation(self, preview, thumbnails):
+        # `preview` and `thumbnails` are QImages drawn by the worker (null if empty)
+        if preview.isNull():
+            self.preview_hint.setText("Failed to generate preview image.")
+            self.preview_hint.show()
+            self.slide_label.hide()
+            self.thumbnail_scroll.hide()
+            return
+        self.slide_label.setPixmap(QPixmap.fromImage(preview).scaled(
+            self.slide_label.contentsRect().size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self.thumbnail_label.setPixmap(QPixmap.fromImage(thumbnails))
+        self.thumbnail_label.adjustSize()
+        self.preview_hint.hide()
+        self.slide_label.show()
+        self.thumbnail_scroll.show()
+
+    def set_office_buttons_enabled(self, enabled):
+        enabled = enabled and self.last_output is not None and self.office_worker is None
+        self.exact_preview_button.setEnabled(enabled)
+        self.export_pdf_button.setEnabled(enabled)
+
+    def exact_preview(self):
+        self.start_office_worker(OfficeWorker(self.last_output, parent=self))
+
+    def export_pdf(self):
+        pdf_path, _ = QFileDialog.getSaveFileName(
+            self, "Export PDF", os.path.splitext(self.last_output)[0] + '.pdf', "PDF (*.pdf)")
+        if not pdf_path:
+            return
+        self.start_office_worker(OfficeWorker(self.last_output, pdf_path, parent=self))
+
+    def start_office_worker(self, worker):
+        self.office_worker = worker
+        worker.preview_ready.connect(self.show_exact_preview)
+        worker.pdf_ready.connect(lambda path: QMessageBox.information(self, "Success", f"PDF saved as {path}"))
+        worker.failed.connect(lambda message: QMessageBox.critical(self, "Error", f"LibreOffice failed: {message}"))
+        worker.finished.connect(self.office_worker_finished)
+        self.set_office_buttons_enabled(False)
+        worker.start()
+
+    def show_exact_preview(self, image):
+        self.slide_label.setPixmap(QPixmap.fromImage(image).scaled(
+            self.slide_label.contentsRect().size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self.preview_hint.hide()
+        self.slide_label.show()
+
+    def office_worker_finished(self):
+        self.office_worker.deleteLater()
+        self.office_worker = None
+        self.set_office_buttons_enabled(True)
+
+    def schedule_live_preview(self):
+        self.last_edit_time = time.perf_counter()
+        self.live_timer.start()
+
+    def update_live_preview(self):
+        template = self.templates.get(self.template_combo.currentText())
+        if template is None or self.live_document is None:
+            return
+        start = time.perf_counter()
+        reparsed = self.live_document.update(self.text_edit.toPlainText())
+        index, slide_data = self.live_document.slide_at(self.text_edit.textCursor().blockNumber())
+        parse_ms = (time.perf_counter() - start) * 1000
+        if slide_data is None:
+            return
+        # Moving the cursor within a slide that did not change draws nothing
+        requested = (slide_data, template.plan)
+        if self._live_requested is not None and all(a is b for a, b in zip(requested, self._live_requested)):
+            return
+        self._live_requested = requested
+        self.live_worker.request(template, slide_data, {
+            'index': index, 'count': len(self.live_document), 'reparsed_lines': reparsed,
+            'parse_ms': parse_ms, 'edit_time': self.last_edit_time})
+
+    def show_live_preview(self, image, info):
+        self.preview_label.setPixmap(QPixmap.fromImage(image).scaled(
+            self.preview_label.contentsRect().size(), Qt.KeepAspectRatio, Qt.SmoothTransformation))
+        self.last_preview_latency_ms = (time.perf_counter() - info['edit_time']) * 1000
+        self.debug_overlay.setText(
+            f"slide {info['index'] + 1}/{info['count']}\n"
+            f"parse {info['parse_ms']:.1f} ms ({info['reparsed_lines']} lines)\n"
+            f"render {info['render_ms']:.1f} ms\n"
+            f"edit to preview {self.last_preview_latency_ms:.0f} ms")
+        self.debug_overlay.adjustSize()
+
+    def toggle_debug_overlay(self):
+        self.debug_overlay.setVisible(not self.debug_overlay.isVisible())
+        self.debug_overlay.raise_()
+
+    def load_preview_image(self, url):
+        # Runs on the live preview thread; the image cache makes repeats cheap
+        from core.image_cache import default_cache
+        try:
+            cache = default_cache()
+            return cache.read(cache.fetch(url))
+        except Exception:
+            return None
+
+    def closeEvent(self, event):
+        # Let a running generation stop at the next slide instead of killing it mid-save
+        if self.worker is not None:
+            self.worker.cancel()
+            self.worker.wait()
+        self.warmup_worker.wait()
+        self.live_worker.stop()
+        if self.office_worker is not None:
+            self.office_worker.wait()
+        from utils.office import shutdown_default_office
+        shutdown_default_office()
+        super().closeEvent(event)
@@ -0,0 +1,181 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from PyQt5.QtCore import QThread, pyqtSignal
+from PyQt5.QtGui import QImage
+from core.logs import log_event
+from utils.utils import qimage_from_pil
+
+# The window is shown after importing only PyQt5. python-pptx, lxml, Pillow,
+# NumPy and requests take several times longer to import than the window
+# takes to build, so the modules using them are imported here, on worker
+# threads: by WarmupWorker after the first paint, and on first use by the
+# other workers.
+
+WARMUP_MODULES = ('templates.templates', 'core.generator', 'core.live_parser', 'core.pool', 'core.slide_cache',
+                  'core.parse_cache', 'core.image_cache', 'utils.preview')
+PREVIEW_WIDTH = 800
+THUMBNAIL_WIDTH = 160
+# The strip shows at most this many slides, so huge decks stay cheap to preview
+MAX_THUMBNAILS = 100
+
+
+class GenerationWorker(QThread):
+    # Renders and saves a deck, then draws the first slide and a thumbnail
+    # strip, off the GUI thread. Signals are delivered to the GUI thread's
+    # event loop. A preview that fails does not fail the saved deck: it is
+    # reported with `succeeded`, with null images.
+    progress = pyqtSignal(int, int)                   # slides rendered, slides in the deck
+    succeeded = pyqtSignal(str, QImage, QImage, str)  # output file, first slide, thumbnail strip, preview error
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+    def __init__(self, generator, input_text, output_file, preview=True, parent=None):
+        super().__init__(parent)
+        self.generator = generator
+        self.input_text = input_text
+        self.output_file = output_file
+        self.preview = preview
+        self._cancel = threading.Event()
+
+    def cancel(self):
+        # Takes effect before the next slide is rendered
+        self._cancel.set()
+
+    def run(self):
+        from core.generator import GenerationCancelled
+        from utils.preview import SlidePreviewRenderer
+        try:
+            # Parsing and fitting are cheap next to rendering, so the deck's
+            # slides are counted before the first is rendered; they are kept
+            # for the preview
+            slides = []
+            self.generator.generate_presentation(
+                self.input_text, self.output_file,
+                progress=lambda count: self.progress.emit(count, len(slides)),
+                cancelled=self._cancel.is_set, fitted=slides.extend)
+        except GenerationCancelled:
+            self.cancelled.emit()
+            return
+        except Exception as e:
+            log_event('generation_failed', logging.ERROR, exc_info=True, output=self.output_file, error=str(e))
+            self.failed.emit(str(e))
+            return
+        preview, strip, error = QImage(), QImage(), ''
+        if self.preview and slides:
+            start = time.perf_counter()
+            try:
+                renderer = SlidePreviewRenderer(self.generator.template, PREVIEW_WIDTH,
+                                                load_image=self.generator.download_image)
+                preview = qimage_from_pil(renderer.render(slides[0]))
+                strip = qimage_from_pil(renderer.thumbnail_strip(slides[:MAX_THUMBNAILS], THUMBNAIL_WIDTH))
+            except Exception as e:
+                log_event('preview_failed', logging.ERROR, exc_info=True, output=self.output_file, error=str(e))
+                preview, strip, error = QImage(), QImage(), str(e)
+            else:
+                log_event('preview_rendered', slides=1 + min(len(slides), MAX_THUMBNAILS),
+                          seconds=round(time.perf_counter() - start, 6))
+        self.succeeded.emit(self.output_file, preview, strip, error)
+
+
+class OfficeWorker(QThread):
+    # Exact rendering of a saved deck through LibreOffice (utils.office):
+    # its first slide as an image, or the whole deck as a PDF. The warm
+    # soffice pool is started on first use and kept until the app exits.
+    preview_ready = pyqtSignal(QImage)
+    pdf_ready = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, pptx_path, pdf_path=None, parent=None):
+        # Exports to `pdf_path` if given, otherwise renders the first slide
+        super().__init__(parent)
+        self.pptx_path = pptx_path
+        self.pdf_path = pdf_path
+
+    def run(self):
+        import tempfile
+        from utils.office import DEFAULT_DPI, default_office
+        from utils.utils import convert_pptx_to_image
+        try:
+            if self.pdf_path:
+                self.pdf_ready.emit(default_office().to_pdf(self.pptx_path, self.pdf_path))
+                return
+            with tempfile.TemporaryDirectory() as tmp:
+                image_path = convert_pptx_to_image(self.pptx_path, os.path.join(tmp, 'slide.png'), DEFAULT_DPI)
+                image = QImage(image_path) if image_path else QImage()
+            if image.isNull():
+                self.failed.emit("LibreOffice could not render the slide (see app.log)")
+            else:
+                self.preview_ready.emit(image)
+        except Exception as e:
+            log_event('office_export_failed', logging.ERROR, exc_info=True, path=self.pptx_path, error=str(e))
+            self.failed.emit(str(e))
+
+
+class LivePreviewWorker(QThread):
+    # Renders the slide under the cursor while the user types. Only the most
+    # recent request is kept: requests that arrive while a slide is being
+    # drawn replace each other, so the preview never lags behind by a queue.
+    rendered = pyqtSignal(QImage, dict)  # slide image, request details and timings
+
+    def __init__(self, width=PREVIEW_WIDTH, load_image=None, parent=None):
+        super().__init__(parent)
+        self.width = width
+        self.load_image = load_image
+        self._renderers = {}
+        self._request = None
+        self._stopped = False
+        self._condition = threading.Condition()
+
+    def request(self, template, slide_data, info):
+        with self._condition:
+            self._request = (template, slide_data, info)
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        from utils.preview import SlidePreviewRenderer
+        while True:
+            with self._condition:
+                while self._request is None and not self._stopped:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                (template, slide_data, info), self._request = self._request, None
+            renderer = self._renderers.get(template.name)
+            if renderer is None or renderer.template is not template:
+                renderer = self._renderers[template.name] = SlidePreviewRenderer(
+                    template, self.width, load_image=self.load_image)
+            start = time.perf_counter()
+            try:
+                image = qimage_from_pil(renderer.render(slide_data))
+            except Exception as e:
+                log_event('live_preview_failed', logging.ERROR, exc_info=True, error=str(e))
+                continue
+            self.rendered.emit(image, dict(info, render_ms=(time.perf_counter() - start) * 1000))
+
+
+class WarmupWorker(QThread):
+    # Imports the modules behind generation and previews once the window is
+    # up; `ready` tells the window it may use them
+    ready = pyqtSignal()
+    failed = pyqtSignal(str)
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            for name in WARMUP_MODULES:
+                importlib.import_module(name)
+        except Exception as e:
+            log_event('warmup_failed', logging.ERROR, exc_info=True, error=str(e))
+            self.failed.emit(f"{type(e).__name__}: {e}")
+            return
+        log_event('warmup_finished', seconds=round(time.perf_counter() - start, 6))
+        self.ready.emit()
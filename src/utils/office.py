@@ -0,0 +1,383 @@
+import logging
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.logs import log_event
+
+try:
+    import uno
+    from com.sun.star.beans import PropertyValue
+    from com.sun.star.connection import NoConnectException
+except ImportError:  # python3-uno is only shipped with LibreOffice's own Python
+    uno = None
+
+# Exact rendering through LibreOffice. OfficePool keeps headless soffice
+# processes running and drives them over UNO, so a conversion costs a
+# document load instead of a full office start. Without the uno module,
+# CliOffice runs one `soffice --convert-to` per conversion, as before.
+
+DEFAULT_INSTANCES = 2
+DEFAULT_DPI = 150
+START_TIMEOUT = 60
+CONNECT_INTERVAL = 0.1
+MM100_PER_INCH = 2540
+SOFFICE_ARGS = ('--headless', '--invisible', '--nologo', '--nodefault', '--norestore', '--nolockcheck')
+
+
+class OfficeError(Exception):
+    pass
+
+
+def soffice_binary():
+    return shutil.which('soffice') or shutil.which('libreoffice')
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _profile_url(path):
+    # Every instance needs its own user profile; two soffice processes on
+    # one profile hand their work to the first one instead of running
+    return 'file://' + os.path.abspath(path).replace(os.sep, '/')
+
+
+def _properties(**values):
+    properties = []
+    for name, value in values.items():
+        prop = PropertyValue()
+        prop.Name = name
+        prop.Value = value
+        properties.append(prop)
+    return tuple(properties)
+
+
+class OfficeInstance:
+    # One headless soffice process with its own profile, listening on a
+    # local socket, and the UNO desktop connected to it.
+
+    def __init__(self, binary):
+        self.binary = binary
+        self.process = None
+        self.profile_dir = None
+        self.desktop = None
+        self.context = None
+
+    def start(self):
+        port = _free_port()
+        self.profile_dir = tempfile.mkdtemp(prefix='ttp-soffice-')
+        self.process = subprocess.Popen(
+            [self.binary, *SOFFICE_ARGS, f'-env:UserInstallation={_profile_url(self.profile_dir)}',
+             f'--accept=socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        local = uno.getComponentContext()
+        resolver = local.ServiceManager.createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', local)
+        deadline = time.monotonic() + START_TIMEOUT
+        try:
+            while True:
+                try:
+                    self.context = resolver.resolve(
+                        f'uno:socket,host=127.0.0.1,port={port};urp;StarOffice.ComponentContext')
+                    break
+                except NoConnectException:
+                    if self.process.poll() is not None or time.monotonic() > deadline:
+                        raise OfficeError(f"soffice did not start listening on port {port}")
+                    time.sleep(CONNECT_INTERVAL)
+            self.desktop = self.context.ServiceManager.createInstanceWithContext('com.sun.star.frame.Desktop',
+                                                                                 self.context)
+        except BaseException:
+            # Not connected, so it cannot be asked to terminate
+            self.process.kill()
+            self.desktop = None
+            self.stop()
+            raise
+        return self
+
+    def alive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def to_pdf(self, path, pdf_path):
+        document = self._load(path)
+        try:
+            document.storeToURL(uno.systemPathToFileUrl(os.path.abspath(pdf_path)),
+                                _properties(FilterName='impress_pdf_Export'))
+        finally:
+            document.close(True)
+        return pdf_path
+
+    def render_pages(self, path, pages, dpi, out_dir):
+        # Exports slides straight to PNG, without going through a PDF
+        document = self._load(path)
+        try:
+            draw_pages = document.getDrawPages()
+            indexes = range(draw_pages.getCount()) if pages is None else pages
+            exporter = self.context.ServiceManager.createInstanceWithContext(
+                'com.sun.star.drawing.GraphicExportFilter', self.context)
+            stem = os.path.splitext(os.path.basename(path))[0]
+            outputs = []
+            for index in indexes:
+                page = draw_pages.getByIndex(index)
+                filter_data = uno.Any('[]com.sun.star.beans.PropertyValue', _properties(
+                    PixelWidth=round(page.Width * dpi / MM100_PER_INCH),
+                    PixelHeight=round(page.Height * dpi / MM100_PER_INCH)))
+                output = os.path.join(out_dir, f'{stem}-{index}.png')
+                exporter.setSourceDocument(page)
+                exporter.filter(_properties(URL=uno.systemPathToFileUrl(os.path.abspath(output)),
+                                            MediaType='image/png', FilterData=filter_data))
+                outputs.append(output)
+            return outputs
+        finally:
+            document.close(True)
+
+    def stop(self):
+        if self.desktop is not None:
+            try:
+                self.desktop.terminate()
+            except Exception:
+                pass
+            self.desktop = None
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        if self.profile_dir is not None:
+            shutil.rmtree(self.profile_dir, ignore_errors=True)
+            self.profile_dir = None
+
+    def _load(self, path):
+        document = self.desktop.loadComponentFromURL(
+            uno.systemPathToFileUrl(os.path.abspath(path)), '_blank', 0,
+            _properties(Hidden=True, ReadOnly=True))
+        if document is None:
+            raise OfficeError(f"LibreOffice could not open {path}")
+        return document
+
+
+class OfficePool:
+    # `instances` warm soffice processes; conversions are queued on a thread
+    # pool of the same size and each takes an idle instance. Instances start
+    # on first use (or in warm()); one found dead while idle is replaced, and
+    # one that dies during a conversion is replaced and the conversion
+    # retried once. A replacement takes the slot of the instance it replaces,
+    # so the pool never runs more than `instances` processes. A conversion
+    # waiting for an instance is woken when one is released or discarded, or
+    # when a start fails, and then starts one itself if the pool has room.
+
+    def __init__(self, instances=DEFAULT_INSTANCES, binary=None):
+        if uno is None:
+            raise OfficeError("the uno module is not available")
+        self.binary = binary or soffice_binary()
+        if self.binary is None:
+            raise OfficeError("LibreOffice (soffice) is not installed")
+        self.instances = instances
+        self._idle = []  # started instances not in use
+        self._started = []
+        self._count = 0  # instances started or starting
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._executor = ThreadPoolExecutor(max_workers=instances, thread_name_prefix='office')
+
+    def warm(self):
+        # Starts the missing instances now, in parallel, instead of on the
+        # first conversions
+        with self._lock:
+            missing = self.instances - self._count
+            self._count += missing
+        futures = [self._executor.submit(self._start, True) for _ in range(missing)]
+        errors = []
+        for future in futures:
+            try:
+                self._release(future.result())
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def submit_pdf(self, path, pdf_path=None):
+        pdf_path = pdf_path or os.path.splitext(path)[0] + '.pdf'
+        return self._executor.submit(self._run, lambda instance: instance.to_pdf(path, pdf_path))
+
+    def submit_pages(self, path, pages=(0,), dpi=DEFAULT_DPI, out_dir=None):
+        # Resolves to the PNG paths of `pages` (all pages if None)
+        out_dir = out_dir or os.path.dirname(os.path.abspath(path))
+        return self._executor.submit(self._run, lambda instance: instance.render_pages(path, pages, dpi, out_dir))
+
+    def to_pdf(self, path, pdf_path=None):
+        return self.submit_pdf(path, pdf_path).result()
+
+    def render_pages(self, path, pages=(0,), dpi=DEFAULT_DPI, out_dir=None):
+        return self.submit_pages(path, pages, dpi, out_dir).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            started, self._started, self._count = self._started, [], 0
+        for instance in started:
+            instance.stop()
+
+    def _run(self, job):
+        instance = self._acquire()
+        try:
+            try:
+                return job(instance)
+            except Exception:
+                if instance.alive():
+                    raise
+                log_event('soffice_restarted', logging.WARNING, binary=self.binary)
+                self._discard(instance, replace=True)
+                instance = None
+                instance = self._start(reserved=True)
+                return job(instance)
+        finally:
+            if instance is not None:
+                self._release(instance)
+
+    def _acquire(self):
+        with self._available:
+            while not self._idle and self._count >= self.instances:
+                self._available.wait()
+            instance = self._idle.pop() if self._idle else None
+            if instance is None:
+                self._count += 1
+        if instance is not None:
+            if instance.alive():
+                return instance
+            log_event('soffice_restarted', logging.WARNING, binary=self.binary)
+            self._discard(instance, replace=True)
+        return self._start(reserved=True)
+
+    def _release(self, instance):
+        with self._available:
+            self._idle.append(instance)
+            self._available.notify()
+
+    def _start(self, reserved=False):
+        if not reserved:
+            with self._lock:
+                self._count += 1
+        try:
+            instance = OfficeInstance(self.binary).start()
+        except Exception:
+            with self._available:
+                self._count -= 1
+                self._available.notify()
+            raise
+        with self._lock:
+            self._started.append(instance)
+        return instance
+
+    def _discard(self, instance, replace=False):
+        # With `replace`, the caller keeps the instance's slot and starts its
+        # replacement with _start(reserved=True)
+        with self._available:
+            if instance in self._started:
+                self._started.remove(instance)
+                if not replace:
+                    self._count -= 1
+                    self._available.notify()
+        instance.stop()
+
+
+class CliOffice:
+    # Same interface as OfficePool without UNO: every conversion launches
+    # soffice from cold. Pages are rasterized from the PDF with ImageMagick.
+
+    def __init__(self, instances=DEFAULT_INSTANCES, binary=None):
+        self.binary = binary or soffice_binary()
+        if self.binary is None:
+            raise OfficeError("LibreOffice (soffice) is not installed")
+        self.instances = instances
+        self._profiles = threading.local()
+        self._profile_dirs = []
+        self._executor = ThreadPoolExecutor(max_workers=instances, thread_name_prefix='office')
+
+    def warm(self):
+        pass
+
+    def submit_pdf(self, path, pdf_path=None):
+        pdf_path = pdf_path or os.path.splitext(path)[0] + '.pdf'
+        return self._executor.submit(self._to_pdf, path, pdf_path)
+
+    def submit_pages(self, path, pages=(0,), dpi=DEFAULT_DPI, out_dir=None):
+        out_dir = out_dir or os.path.dirname(os.path.abspath(path))
+        return self._executor.submit(self._render_pages, path, pages, dpi, out_dir)
+
+    def to_pdf(self, path, pdf_path=None):
+        return self.submit_pdf(path, pdf_path).result()
+
+    def render_pages(self, path, pages=(0,), dpi=DEFAULT_DPI, out_dir=None):
+        return self.submit_pages(path, pages, dpi, out_dir).result()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        for profile_dir in self._profile_dirs:
+            shutil.rmtree(profile_dir, ignore_errors=True)
+
+    def _profile(self):
+        profile_dir = getattr(self._profiles, 'path', None)
+        if profile_dir is None:
+            profile_dir = self._profiles.path = tempfile.mkdtemp(prefix='ttp-soffice-')
+            self._profile_dirs.append(profile_dir)
+        return profile_dir
+
+    def _to_pdf(self, path, pdf_path):
+        # soffice names the output after the input, in --outdir
+        with tempfile.TemporaryDirectory() as out_dir:
+            result = subprocess.run(
+                [self.binary, *SOFFICE_ARGS, f'-env:UserInstallation={_profile_url(self._profile())}',
+                 '--convert-to', 'pdf', '--outdir', out_dir, os.path.abspath(path)],
+                capture_output=True, text=True)
+            produced = os.path.join(out_dir, os.path.splitext(os.path.basename(path))[0] + '.pdf')
+            if result.returncode != 0 or not os.path.exists(produced):
+                raise OfficeError(f"soffice failed to convert {path}: {result.stderr.strip() or result.stdout.strip()}")
+            shutil.move(produced, pdf_path)
+        return pdf_path
+
+    def _render_pages(self, path, pages, dpi, out_dir):
+        if pages is None:
+            raise OfficeError("rendering all pages needs the uno module")
+        stem = os.path.splitext(os.path.basename(path))[0]
+        with tempfile.TemporaryDirectory() as tmp:
+            pdf_path = self._to_pdf(path, os.path.join(tmp, stem + '.pdf'))
+            outputs = []
+            for index in pages:
+                output = os.path.join(out_dir, f'{stem}-{index}.png')
+                result = subprocess.run(['convert', '-density', str(dpi), f'{pdf_path}[{index}]', output],
+                                        capture_output=True, text=True)
+                if result.returncode != 0:
+                    raise OfficeError(f"ImageMagick failed to rasterize page {index}: {result.stderr.strip()}")
+                outputs.append(output)
+        return outputs
+
+
+_default_office = None
+_default_office_lock = threading.Lock()
+
+
+def default_office():
+    # The process-wide converter: a warm OfficePool when UNO is available,
+    # cold CliOffice otherwise. Raises OfficeError without LibreOffice.
+    global _default_office
+    with _default_office_lock:
+        if _default_office is None:
+            _default_office = OfficePool() if uno is not None else CliOffice()
+        return _default_office
+
+
+def shutdown_default_office():
+    # Stops the process-wide converter's soffice processes, if it was
+    # started; the next default_office() starts a new one
+    global _default_office
+    with _default_office_lock:
+        office, _default_office = _default_office, None
+    if office is not None:
+        office.close()
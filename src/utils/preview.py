@@ -0,0 +1,292 @@
+from functools import lru_cache
+import math
+from io import BytesIO
+import logging
+import numpy as np
+from PIL import Image, ImageDraw
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.enum.text import PP_ALIGN
+from pptx.util import Inches, Pt
+from core import profiling
+from core.charts import downsample
+from core.logs import log_event
+from core.textfit import load_font
+
+# Draws slides straight from parsed slide records and a Template's style plan
+# with Pillow, instead of saving the deck and rasterizing it through
+# LibreOffice. It approximates what PowerPoint shows (fonts fall back to
+# DejaVu when the template's family is not installed) and is meant for
+# previews, not print.
+
+SLIDE_WIDTH = 9144000
+SLIDE_HEIGHT = 6858000
+
+# Placeholder boxes (left, top, width, height in EMU) of the default
+# python-pptx template's layouts used by SlideGenerator, with the vertical
+# anchor of their text.
+TITLE_SLIDE_TITLE = ((685800, 2130425, 7772400, 1470025), 'middle')
+TITLE_SLIDE_SUBTITLE = ((1371600, 3886200, 6400800, 1752600), 'top')
+CONTENT_TITLE = ((457200, 274638, 8229600, 1143000), 'middle')
+CONTENT_BODY = ((457200, 1600200, 8229600, 4525963), 'top')
+SECTION_TITLE = ((722313, 4406900, 7772400, 1362075), 'top')
+
+# Placement used by SlideGenerator.create_slide
+IMAGE_LEFT, IMAGE_TOP, IMAGE_HEIGHT = Inches(1), Inches(1.5), Inches(5.5)
+CHART_BOX = (Inches(2), Inches(2), Inches(6), Inches(4.5))
+
+# Series colors of the default Office theme (accent1..accent6)
+CHART_COLORS = [(79, 129, 189), (192, 80, 77), (155, 187, 89), (128, 100, 162), (75, 172, 198), (247, 150, 70)]
+AXIS_COLOR = (134, 134, 134)
+MAX_CATEGORY_LABELS = 12
+BULLET = '•'
+PARAGRAPH_SPACING = Pt(6)
+INSET = Inches(0.1)
+
+@lru_cache(maxsize=16384)
+def word_mask(font, word):
+    # Pillow lays out and rasterizes text from scratch on every call, which
+    # costs about a millisecond per line. Words repeat a lot within a deck,
+    # so lines are composed from cached per-word masks (ignoring kerning
+    # across the spaces between them).
+    width = font.getlength(word)
+    ascent, descent = font.getmetrics()
+    mask = Image.new('L', (math.ceil(width) + font.size // 4 + 1, ascent + descent))
+    ImageDraw.Draw(mask).text((0, 0), word, font=font, fill=255)
+    return mask, width
+
+
+class SlidePreviewRenderer:
+    # Renders parsed slides (see core.ir) at `width` pixels. `load_image(url)`
+    # returns image bytes or None; without it image slides show an empty
+    # frame. Charts are drawn from the spec parsed along with the slide.
+
+    def __init__(self, template, width=960, load_image=None):
+        self.template = template
+        self.width = width
+        self.height = round(width * SLIDE_HEIGHT / SLIDE_WIDTH)
+        self.scale = width / SLIDE_WIDTH
+        self.load_image = load_image
+        self._background = None
+        self._background_plan = None
+        self._images = {}
+
+    def render(self, slide_data):
+        with profiling.stage('preview'):
+            return self._render(slide_data)
+
+    def _render(self, slide_data):
+        image = self._background_image().copy()
+        slide_type = slide_data.type
+        if slide_type == "title":
+            self._draw_text(image, TITLE_SLIDE_TITLE, [slide_data.title], 'title')
+            if slide_data.subtitle:
+                self._draw_text(image, TITLE_SLIDE_SUBTITLE, [slide_data.subtitle], 'body')
+        elif slide_type == "section":
+            self._draw_text(image, SECTION_TITLE, [slide_data.title], 'title')
+        elif slide_type == "quote":
+            self._draw_text(image, CONTENT_TITLE, ["Quote"], 'title')
+            self._draw_text(image, CONTENT_BODY, [slide_data.quote], 'quote')
+        else:
+            self._draw_text(image, CONTENT_TITLE, [slide_data.title], 'title')
+            if slide_type == "image":
+                self._draw_picture(image, slide_data.image)
+            elif slide_type == "chart":
+                self._draw_chart(ImageDraw.Draw(image), slide_data.chart)
+            else:
+                self._draw_text(image, CONTENT_BODY, slide_data.content, 'body', bullets=True,
+                                scale=slide_data.font_scale or 1.0)
+        return image
+
+    def render_index(self, slides, index):
+        return self.render(slides[index])
+
+    def thumbnail_strip(self, slides, thumb_width=160, gap=8, background=(64, 64, 64)):
+        # All slides side by side, each rendered at `thumb_width` pixels
+        small = SlidePreviewRenderer(self.template, thumb_width, self.load_image)
+        small._images = self._images
+        slides = list(slides)
+        strip = Image.new('RGB', (gap + len(slides) * (thumb_width + gap), small.height + 2 * gap), background)
+        for i, slide_data in enumerate(slides):
+            strip.paste(small.render(slide_data), (gap + i * (thumb_width + gap), gap))
+        return strip
+
+    def _px(self, emu):
+        return round(emu * self.scale)
+
+    def _background_image(self):
+        plan = self.template.plan
+        if self._background is None or self._background_plan is not plan:
+            self._background = self._draw_background()
+            self._background_plan = plan
+        return self._background
+
+    def _draw_background(self):
+        size = (self.width, self.height)
+        template = self.template
+        if template.gradient:
+            # Linear, left to right, as in the template's a:gradFill
+            start, end = (Image.new('RGB', size, tuple(color)) for color in template.gradient)
+            mask = Image.linear_gradient('L').rotate(90).resize(size)
+            image = Image.composite(end, start, mask)
+        else:
+            image = Image.new('RGB', size, tuple(template.background_color))
+        if template.shape:
+            # The decoration is a 10in x 10in autoshape at the top left corner
+            draw = ImageDraw.Draw(image)
+            box = (0, 0, self._px(Inches(10)), self._px(Inches(10)))
+            if template.shape == MSO_SHAPE.OVAL:
+                draw.ellipse(box, fill=tuple(template.theme_color))
+            else:
+                draw.rectangle(box, fill=tuple(template.theme_color))
+        return image
+
+    def _font(self, style, scale=1.0):
+        size = max(1, self._px(style.size * scale))
+        return load_font(style.font_family, size, bool(style.bold), bool(style.italic))
+
+    def _draw_text(self, image, placeholder, paragraphs, role, bullets=False, scale=1.0):
+        # `scale` shrinks the font as a:normAutofit's fontScale does
+        (left, top, width, height), anchor = placeholder
+        style = self.template.plan.roles[role]
+        font = self._font(style, scale)
+        inset = self._px(INSET)
+        box_left, box_top = self._px(left) + inset, self._px(top) + inset
+        box_width, box_height = self._px(width) - 2 * inset, self._px(height) - 2 * inset
+        line_height = round(font.size * 1.2)
+        spacing = self._px(PARAGRAPH_SPACING) if role != 'title' else 0
+        space = word_mask(font, ' ')[1]
+        indent = round(word_mask(font, BULLET)[1] + space) if bullets else 0
+
+        lines = []
+        for paragraph in paragraphs:
+            for i, (words, line_width) in enumerate(_wrap(paragraph, font, box_width - indent)):
+                lines.append((words, line_width, i == 0, spacing if i == 0 and lines else 0))
+        total = sum(line_height + extra for _, _, _, extra in lines)
+        if anchor == 'middle':
+            y = box_top + max(0, (box_height - total) // 2)
+        else:
+            y = box_top
+
+        color = tuple(style.color)
+        for words, line_width, first, extra in lines:
+            y += extra
+            if y + line_height > box_top + box_height + line_height // 2:
+                break
+            if style.alignment == PP_ALIGN.CENTER:
+                x = box_left + indent + (box_width - indent - line_width) / 2
+            elif style.alignment == PP_ALIGN.RIGHT:
+                x = box_left + box_width - line_width
+            else:
+                x = box_left + indent
+            if bullets and first:
+                image.paste(color, (box_left, y), word_mask(font, BULLET)[0])
+            for word in words:
+                mask, word_width = word_mask(font, word)
+                image.paste(color, (round(x), y), mask)
+                x += word_width + space
+            y += line_height
+
+    def _draw_picture(self, image, url):
+        height = self._px(IMAGE_HEIGHT)
+        picture = self._images.get((url, height))
+        if picture is None:
+            picture = self._load_picture(url, height)
+            self._images[(url, height)] = picture
+        left, top = self._px(IMAGE_LEFT), self._px(IMAGE_TOP)
+        if picture is None:
+            ImageDraw.Draw(image).rectangle((left, top, left + height * 4 // 3, top + height), outline=AXIS_COLOR)
+        elif picture.mode == 'RGBA':
+            image.paste(picture, (left, top), picture)
+        else:
+            image.paste(picture, (left, top))
+
+    def _load_picture(self, url, height):
+        data = self.load_image(url) if self.load_image is not None else None
+        if not data:
+            return None
+        try:
+            picture = Image.open(BytesIO(data))
+            picture.draft('RGB', (picture.width * height // picture.height, height))
+            picture = picture.convert('RGBA' if 'A' in picture.getbands() else 'RGB')
+            width = max(1, round(picture.width * height / picture.height))
+            return picture.resize((width, height), Image.BILINEAR)
+        except Exception as e:
+            log_event('preview_image_failed', logging.ERROR, url=url, error=str(e))
+            return None
+
+    def _draw_chart(self, draw, spec):
+        # Scatter specs are checked for numeric x values when parsed; one
+        # that is not (from an older cache) is left out like a bad spec
+        if spec is None or (spec.chart_type == 'scatter' and spec.categories.dtype.kind != 'f'):
+            return
+        left, top, width, height = (self._px(v) for v in CHART_BOX)
+        # More points than pixel columns cannot show up anyway
+        spec = downsample(spec._replace(max_points=min(spec.max_points or width, width)))
+        categories, series = spec.categories, spec.series
+        count = len(categories)
+        values = np.concatenate([values for _, values in series])
+        if not count or np.isnan(values).all():
+            return
+        label_font = load_font('Calibri', max(8, self._px(Pt(10))))
+        axis_y = top + height - label_font.size * 2
+        low, high = min(0.0, np.nanmin(values)), max(0.0, np.nanmax(values))
+        span = (high - low) or 1.0
+        scale_y = (axis_y - top) / span
+        zero_y = axis_y + low * scale_y
+        if spec.chart_type == 'scatter':
+            x_low, x_high = categories.min(), categories.max()
+            xs = left + (categories - x_low) * (width / ((x_high - x_low) or 1.0))
+        else:
+            xs = left + (np.arange(count) + 0.5) * (width / count)
+
+        for s, (_, ys) in enumerate(series):
+            color = CHART_COLORS[s % len(CHART_COLORS)]
+            ys = axis_y - (ys - low) * scale_y
+            if spec.chart_type in ('column', 'bar'):
+                # Bar charts are drawn as columns too
+                group_width = width / count
+                bar_width = group_width * 0.6 / len(series)
+                for x, y in zip((xs - group_width * 0.3 + s * bar_width).tolist(), ys.tolist()):
+                    if y == y:
+                        draw.rectangle((x, min(y, zero_y), x + max(bar_width - 1, 1), max(y, zero_y)), fill=color)
+                continue
+            points = [(x, y) for x, y in zip(xs.tolist(), ys.tolist()) if y == y]
+            if spec.chart_type == 'area' and len(points) > 1:
+                draw.polygon([(points[0][0], zero_y)] + points + [(points[-1][0], zero_y)], fill=color)
+            elif len(points) > 1:
+                draw.line(points, fill=color, width=max(1, self._px(Pt(2))))
+        draw.line((left, zero_y, left + width, zero_y), fill=AXIS_COLOR)
+        # Label every category when they fit, else only the first and last
+        labelled = range(count) if count <= MAX_CATEGORY_LABELS else (0, count - 1)
+        for i in labelled:
+            label = _category_label(categories[i])
+            label_width = draw.textlength(label, font=label_font)
+            draw.text((xs[i] - label_width / 2, axis_y + label_font.size // 2),
+                      label, font=label_font, fill=AXIS_COLOR)
+
+
+def _category_label(value):
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _wrap(text, font, width):
+    # Greedy word wrap into (words, pixel width) lines; a single word wider
+    # than the box stays on its own line
+    words = text.split()
+    if not words:
+        return [([], 0)]
+    space = word_mask(font, ' ')[1]
+    lines = []
+    current, current_width = [words[0]], word_mask(font, words[0])[1]
+    for word in words[1:]:
+        word_width = word_mask(font, word)[1]
+        if current_width + space + word_width <= width:
+            current.append(word)
+            current_width += space + word_width
+        else:
+            lines.append((current, current_width))
+            current, current_width = [word], word_width
+    lines.append((current, current_width))
+    return lines
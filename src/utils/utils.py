@@ -1,20 +1,20 @@
-import subprocess
+import logging
 import os
-from PyQt5.QtGui import QPixmap
+import shutil
+import tempfile
+from PyQt5.QtGui import QPixmap, QImage
+from core.logs import log_event
+from utils.office import default_office
 
-def convert_pptx_to_image(pptx_path, output_image_path):
+def convert_pptx_to_image(pptx_path, output_image_path, dpi=300):
+    # Exact render of the first slide through LibreOffice (see utils.office)
     try:
-        # Convert PPTX to PDF using LibreOffice
-        subprocess.run(['libreoffice', '--headless', '--convert-to', 'pdf', pptx_path, '--outdir', os.path.dirname(pptx_path)], check=True)
-        pdf_path = pptx_path.replace('.pptx', '.pdf')
-        
-        # Convert the first page of PDF to PNG using ImageMagick
-        subprocess.run(['convert', '-density', '300', f"{pdf_path}[0]", output_image_path], check=True)
-        
-        # Clean up PDF
-        os.remove(pdf_path)
+        with tempfile.TemporaryDirectory() as tmp:
+            rendered = default_office().render_pages(pptx_path, (0,), dpi, tmp)[0]
+            shutil.move(rendered, output_image_path)
         return output_image_path
     except Exception as e:
+        log_event('image_conversion_failed', logging.ERROR, path=pptx_path, error=str(e))
         return None
 
 def load_image(image_path):
@@ -22,3 +22,9 @@ def load_image(image_path):
         pixmap = QPixmap(image_path)
         return pixmap
     return None
+
+def qimage_from_pil(image):
+    # QImage (unlike QPixmap) may be built off the GUI thread
+    image = image.convert('RGB')
+    data = image.tobytes('raw', 'RGB')
+    return QImage(data, image.width, image.height, 3 * image.width, QImage.Format_RGB888).copy()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+# The default image, slide and deck caches live under TTP_CACHE_DIR; keep
+# them out of the user's cache
+os.environ['TTP_CACHE_DIR'] = tempfile.mkdtemp(prefix='ttp-tests-')
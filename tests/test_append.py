@@ -0,0 +1,29 @@
+from pptx import Presentation
+from core.append import BaseDeck
+from core.generator import SlideGenerator
+from templates.templates import TEMPLATES
+
+TEMPLATE = 'Elegant Blue'
+
+
+def test_append_to_reordered_deck(tmp_path):
+    # Slides reordered in PowerPoint keep their ids: the last one is not the largest
+    base_path = str(tmp_path / 'base.pptx')
+    SlideGenerator(TEMPLATES[TEMPLATE]).generate_presentation("# Deck\n# Sub\n# A\n- a\n# B\n- b", base_path)
+    prs = Presentation(base_path)
+    sld_id_lst = prs.slides._sldIdLst
+    sld_id_lst.insert(0, sld_id_lst[-1])
+    prs.save(base_path)
+    base_ids = [sld_id.get('id') for sld_id in Presentation(base_path).slides._sldIdLst]
+    assert base_ids[0] == max(base_ids, key=int)
+
+    output_path = str(tmp_path / 'out.pptx')
+    generator = SlideGenerator(TEMPLATES[TEMPLATE], base_deck=BaseDeck(base_path))
+    report = generator.generate_presentation("# More\n# Sub\n# C\n- c", output_path)
+
+    output = Presentation(output_path)
+    ids = [sld_id.get('id') for sld_id in output.slides._sldIdLst]
+    assert ids[:len(base_ids)] == base_ids
+    assert len(ids) == len(base_ids) + report['slides']
+    assert len(set(ids)) == len(ids)
+    assert output.slides[len(base_ids)].shapes.title.text == 'More'
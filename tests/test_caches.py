@@ -0,0 +1,195 @@
+import os
+import pytest
+from core import disk_cache
+from core.disk_cache import LruDirectory, atomic_write
+from core.generator import SlideGenerator
+from core.image_cache import ImageCache
+from core.parse_cache import ParseCache, deck_key
+from core.slide_cache import SlideCache, slide_fingerprint
+from templates.templates import TEMPLATES
+
+TEMPLATE = TEMPLATES['Elegant Blue']
+
+
+class Response:
+    def __init__(self, content, status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        pass
+
+
+class Session:
+    # Stands in for requests.Session: serves `images` by URL and records
+    # the requests
+    def __init__(self, images):
+        self.images = images
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, headers or {}))
+        if headers and headers.get('If-None-Match') == 'v1':
+            return Response(b'', 304)
+        return Response(self.images[url], headers={'ETag': 'v1'})
+
+
+@pytest.fixture
+def images():
+    return {f'http://images/{i}.png': bytes([i]) * 1000 for i in range(8)}
+
+
+def test_image_cache_hit_and_miss(tmp_path, images):
+    session = Session(images)
+    cache = ImageCache(str(tmp_path), session=session)
+    digest = cache.fetch('http://images/0.png')
+    assert cache.read(digest) == images['http://images/0.png']
+    assert cache.fetch('http://images/0.png') == digest
+    assert (cache.hits, cache.misses, len(session.requests)) == (1, 1, 1)
+    # Another process sharing the directory starts warm
+    other = ImageCache(str(tmp_path), session=session)
+    assert other.fetch('http://images/0.png') == digest
+    assert (other.hits, other.misses, len(session.requests)) == (1, 0, 1)
+
+
+def test_image_cache_revalidates_stale_entries(tmp_path, images):
+    session = Session(images)
+    cache = ImageCache(str(tmp_path), max_age=0, session=session)
+    digest = cache.fetch('http://images/0.png')
+    assert cache.fetch('http://images/0.png') == digest
+    assert session.requests[-1][1] == {'If-None-Match': 'v1'}
+    assert (cache.hits, cache.misses, cache.revalidations) == (1, 1, 1)
+
+
+def test_image_cache_derived_counts_apart(tmp_path, images):
+    cache = ImageCache(str(tmp_path), session=Session(images))
+    built = []
+
+    def build(data):
+        built.append(data)
+        return data[:10]
+
+    for _ in range(3):
+        digest = cache.fetch('http://images/1.png')
+        assert cache.derived(digest, 'small', build) == images['http://images/1.png'][:10]
+    assert len(built) == 1
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    assert (stats['derived_hits'], stats['derived_misses']) == (2, 1)
+
+
+def test_image_cache_vanished_blob_is_a_miss(tmp_path, images):
+    session = Session(images)
+    cache = ImageCache(str(tmp_path), session=session)
+    other = ImageCache(str(tmp_path), session=session)
+    digest = cache.fetch('http://images/2.png')
+    other.clear()
+    assert not os.path.exists(cache.path(digest))
+    assert cache.fetch('http://images/2.png') == digest
+    assert cache.misses == 2 and os.path.exists(cache.path(digest))
+
+
+def test_image_cache_evicts_least_recently_used(tmp_path, images):
+    # Room for three images; pruning runs on every store at this cap
+    cache = ImageCache(str(tmp_path), max_bytes=3000, session=Session(images))
+    digests = [cache.fetch(f'http://images/{i}.png') for i in range(3)]
+    os.utime(cache.path(digests[1]), (1, 1))
+    os.utime(cache.path(digests[0]), (2, 2))
+    os.utime(cache.path(digests[2]), (3, 3))
+    cache.fetch('http://images/3.png')
+    assert not os.path.exists(cache.path(digests[1]))
+    assert all(os.path.exists(cache.path(digest)) for digest in (digests[0], digests[2]))
+    assert cache.stats()['evictions'] == 1 and cache.stats()['bytes'] <= 3000
+    # Its entry went with it
+    cache.fetch('http://images/1.png')
+    assert cache.misses == 5
+
+
+def test_image_cache_keeps_an_oversized_image(tmp_path, images):
+    cache = ImageCache(str(tmp_path), max_bytes=10, session=Session(images))
+    digest = cache.fetch('http://images/0.png')
+    assert os.path.exists(cache.path(digest))
+
+
+def test_lru_directory_prunes_once_enough_was_stored(tmp_path):
+    files = LruDirectory(str(tmp_path), max_bytes=disk_cache.PRUNE_FRACTION * 100)
+    for i in range(20):
+        path = os.path.join(str(tmp_path), f'{i}')
+        atomic_write(path, b'x' * 10)
+        os.utime(path, (i, i))
+        assert files.stored(10, keep=path) == []
+    assert files.prune(max_bytes=50) == [os.path.join(str(tmp_path), f'{i}') for i in range(15)]
+    assert sorted(os.listdir(str(tmp_path)), key=int) == [f'{i}' for i in range(15, 20)]
+    assert files.total_bytes == 50 and files.evictions == 15
+
+
+def test_lru_directory_prunes_stale_temporary_files(tmp_path):
+    files = LruDirectory(str(tmp_path), max_bytes=0)
+    fresh = os.path.join(str(tmp_path), disk_cache.TMP_PREFIX + 'fresh')
+    stale = os.path.join(str(tmp_path), disk_cache.TMP_PREFIX + 'stale')
+    for path in (fresh, stale):
+        with open(path, 'wb') as f:
+            f.write(b'x')
+    os.utime(stale, (1, 1))
+    assert files.prune() == [stale]
+
+
+def test_slide_cache_round_trip(tmp_path):
+    generator = SlideGenerator(TEMPLATE)
+    slide_data = generator.parse_input("# Deck\n# Cached\n- point")[1]
+    slide = generator.create_slide(slide_data)
+    fingerprint = slide_fingerprint(slide_data, TEMPLATE.state_key())
+    cache = SlideCache(str(tmp_path))
+    assert cache.get(fingerprint) is None
+    cache.put(fingerprint, slide)
+    assert fingerprint in cache and cache.get(fingerprint) is not None
+    # From disk, in a new instance
+    other = SlideCache(str(tmp_path))
+    snapshot = other.get(fingerprint)
+    restored = other.restore(generator.prs, generator.layouts['content'], snapshot)
+    assert restored.shapes.title.text == 'Cached'
+    assert (cache.hits, cache.misses, other.hits) == (1, 1, 1)
+
+
+def test_slide_cache_fingerprint_follows_template(tmp_path):
+    slide_data = SlideGenerator(TEMPLATE).parse_input("# Deck\n# Cached\n- point")[1]
+    other = TEMPLATES['Ocean Teal']
+    assert slide_fingerprint(slide_data, TEMPLATE.state_key()) != slide_fingerprint(slide_data, other.state_key())
+
+
+def test_parse_cache_round_trip(tmp_path):
+    generator = SlideGenerator(TEMPLATE)
+    text = "# Deck\n# Numbers\n@chart {Categories: A,B; S1: 1,2}\n# More\n- point"
+    slides = generator.parse_input(text)
+    key = deck_key(text)
+    cache = ParseCache(str(tmp_path))
+    assert cache.get(key) is None
+    cache.put(key, slides)
+    assert ParseCache(str(tmp_path)).get(key) == slides
+    assert deck_key(text, allow_chart_files=False) != key
+
+
+def test_parse_cache_invalidated_by_chart_file(tmp_path):
+    data = tmp_path / 'data.csv'
+    data.write_text("x,y\n1,2\n2,3\n")
+    generator = SlideGenerator(TEMPLATE)
+    generator.base_dir = str(tmp_path)
+    text = "# Deck\n# Data\n@chart {type: line; file: data.csv}"
+    slides = generator.parse_input(text)
+    cache = ParseCache(str(tmp_path / 'decks'))
+    key = deck_key(text, str(tmp_path))
+    cache.put(key, slides, str(tmp_path))
+    assert cache.get(key) == slides
+    data.write_text("x,y\n1,2\n2,3\n3,4\n")
+    assert cache.get(key) is None
+
+
+def test_parse_cache_stays_under_its_cap(tmp_path):
+    slides = SlideGenerator(TEMPLATE).parse_input("# Deck\n" + "# Slide\n- point\n" * 100)
+    cache = ParseCache(str(tmp_path), max_bytes=50000)
+    for i in range(100):
+        cache.put(f'{i:064x}', slides)
+    size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(str(tmp_path))
+               for name in names)
+    assert size <= 50000 + 50000 // disk_cache.PRUNE_FRACTION
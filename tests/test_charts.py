@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from core.charts import ChartSpec, downsample, lttb_indices, parse_chart_spec
+from core.generator import SlideGenerator
+from core.ir import compile_chart
+from templates.templates import TEMPLATES
+
+
+def spec(series, length, max_points, rng=np.random.default_rng(0)):
+    return ChartSpec('line', np.arange(length, dtype=float),
+                     [(f'S{i}', rng.normal(size=length).cumsum()) for i in range(series)], max_points)
+
+
+@pytest.mark.parametrize('series, length, max_points', [
+    (1, 10000, 2000), (3, 10000, 2000), (4, 10000, 10), (8, 10000, 10), (20, 500, 10), (2, 100, 1), (2, 100, 2),
+])
+def test_downsample_stays_within_budget(series, length, max_points):
+    original = spec(series, length, max_points)
+    reduced = downsample(original)
+    assert len(reduced.categories) <= max_points
+    assert all(len(values) == len(reduced.categories) for _, values in reduced.series)
+    # Points are kept as they were, in order
+    keep = np.searchsorted(original.categories, reduced.categories)
+    assert np.all(np.diff(keep) > 0)
+    for (_, values), (_, kept) in zip(original.series, reduced.series):
+        assert np.array_equal(values[keep], kept)
+
+
+def test_downsample_keeps_short_series_and_zero_budget():
+    for original in (spec(2, 100, 1000), spec(2, 5000, 0)):
+        assert downsample(original) is original
+
+
+def test_lttb_keeps_ends_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[500] = 100.0
+    indices = lttb_indices(x, y, 20)
+    assert len(indices) == 20 and indices[0] == 0 and indices[-1] == 999
+    assert 500 in indices
+
+
+def test_lttb_below_three_points():
+    assert list(lttb_indices(np.arange(10.0), np.arange(10.0), 2)) == [0, 9]
+    assert list(lttb_indices(np.arange(10.0), np.arange(10.0), 1)) == [0]
+
+
+def test_scatter_needs_numeric_x():
+    with pytest.raises(ValueError):
+        parse_chart_spec("type: scatter; Categories: a,b; S: 1,2")
+    assert compile_chart("type: scatter; Categories: a,b; S: 1,2") is None
+    assert parse_chart_spec("type: scatter; Categories: 1,2; S: 1,2").categories.dtype.kind == 'f'
+
+
+def test_bad_chart_does_not_fail_the_deck(tmp_path):
+    text = "# Deck\n# Bad\n@chart {type: scatter; Categories: a,b; S: 1,2}\n# Good\n@chart {S: 1,2,3}"
+    report = SlideGenerator(TEMPLATES['Elegant Blue']).generate_presentation(text, str(tmp_path / 'out.pptx'))
+    assert report['slides'] == 5
@@ -0,0 +1,103 @@
+import io
+import random
+import pytest
+from core.generator import SlideGenerator
+from core.live_parser import LiveDocument
+from templates.templates import TEMPLATES
+
+DECK = """# Quarterly Review
+## Second quarter
+# Revenue
+- Up 12%
+* Driven by renewals
+plain line
+## Outlook
+- Flat
+![chart](http://example.com/a.png)
+@chart {Categories: A,B; S1: 1,2}
+> Stay the course
+#no-space
+# Closing"""
+
+# What the per-line regex parser that iter_slides replaced made of DECK,
+# quirks included: the subtitle line also starts a section slide, and
+# image, chart and quote slides come before the slide they appear in
+EXPECTED = [
+    {'type': 'title', 'title': 'Quarterly Review', 'subtitle': 'Second quarter'},
+    {'type': 'section', 'title': 'Second quarter', 'content': []},
+    {'type': 'content', 'title': 'Revenue', 'content': ['Up 12%', 'Driven by renewals', 'plain line']},
+    {'type': 'image', 'title': 'Outlook', 'image': 'http://example.com/a.png'},
+    {'type': 'chart', 'title': 'Outlook', 'chart_data': 'Categories: A,B; S1: 1,2'},
+    {'type': 'quote', 'quote': 'Stay the course'},
+    {'type': 'section', 'title': 'Outlook', 'content': ['Flat', '#no-space']},
+    {'type': 'content', 'title': 'Closing', 'content': []},
+]
+
+# Lines exercising the corners of the grammar, for the random documents
+LINES = [
+    "# Title", "## Section", "# ", "#", "##", "#no-space", "   # indented title", "- bullet", "* star", "-",
+    "> quote", ">quote", "![alt](http://a/b.png)", "![a](b", "@chart {Categories: A,B; S1: 1,2}", "@chart {}",
+    "plain text", "• bullet", "", "   ",
+]
+
+
+@pytest.fixture(scope='module')
+def generator():
+    return SlideGenerator(TEMPLATES['Elegant Blue'])
+
+
+def records(slides):
+    return [slide.record() for slide in slides]
+
+
+def random_document(rng, length):
+    return "\n".join(rng.choice(LINES) for _ in range(length))
+
+
+def test_parse_input(generator):
+    assert records(generator.parse_input(DECK)) == EXPECTED
+
+
+def test_iter_slides_streams_any_iterable(generator):
+    expected = generator.parse_input(DECK)
+    assert list(generator.iter_slides(io.StringIO(DECK + "\n"))) == expected
+    assert list(generator.iter_slides(line for line in DECK.split('\n'))) == expected
+
+
+def test_chart_slides_carry_parsed_specs(generator):
+    chart = next(slide for slide in generator.parse_input(DECK) if slide.type == 'chart')
+    assert list(chart.chart.categories) == ['A', 'B']
+    assert [(name, list(values)) for name, values in chart.chart.series] == [('S1', [1.0, 2.0])]
+
+
+def test_live_document_matches_iter_slides(generator):
+    rng = random.Random(0)
+    document = LiveDocument()
+    text = random_document(rng, 40)
+    for _ in range(200):
+        lines = text.split('\n')
+        # Replace, insert or delete a few lines at a random place
+        start = rng.randrange(len(lines) + 1)
+        end = min(len(lines), start + rng.randint(0, 3))
+        lines[start:end] = random_document(rng, rng.randint(0, 3)).split('\n') if rng.random() < 0.8 else []
+        text = "\n".join(lines)
+        document.update(text)
+        assert document.slides == list(generator.iter_slides(text.split('\n'))), text
+
+
+def test_live_document_reparses_only_the_edited_block():
+    document = LiveDocument()
+    lines = DECK.split('\n') + [line for i in range(50) for line in (f"# Slide {i}", "- point")]
+    document.update("\n".join(lines))
+    lines[-1] = "- changed"
+    assert document.update("\n".join(lines)) <= 2
+    assert document.slides[-1].content == ['changed']
+    assert document.update("\n".join(lines)) == 0
+
+
+def test_live_document_slide_at():
+    document = LiveDocument()
+    document.update(DECK)
+    assert document.slide_at(0) == (0, document.slides[0])
+    index, slide = document.slide_at(3)
+    assert slide.title == 'Revenue' and document.slides[index] is slide
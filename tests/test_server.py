@@ -0,0 +1,128 @@
+import http.client
+import io
+import json
+import socket
+import threading
+import time
+import pytest
+from http.server import ThreadingHTTPServer
+from pptx import Presentation
+from server import RenderService, make_handler
+
+MAX_BODY = 2**20
+TEMPLATE = {"name": "Brand", "theme_color": "#0066cc", "background_color": "#ffffff", "font_family": "Arial",
+            "title_font_size": 40, "content_font_size": 20}
+# Takes a worker several seconds, so it is still rendering when the tests
+# below look
+SLOW_DECK = "# Deck\n" + "# Slide\n- one two three four\n" * 3000
+
+
+@pytest.fixture(scope='module')
+def service():
+    # One worker and no queue: a second request while one renders is refused
+    service = RenderService(workers=1, queue=0, timeout=30, log_file=None)
+    yield service
+    service.close()
+
+
+@pytest.fixture(scope='module')
+def port(service):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(service, MAX_BODY))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+def post(port, body, path='/render', content_type='text/markdown'):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        connection.request('POST', path, body, {'Content-Type': content_type})
+        response = connection.getresponse()
+        return response.status, dict(response.getheaders()), response.read()
+    finally:
+        connection.close()
+
+
+def post_json(port, payload):
+    return post(port, json.dumps(payload).encode(), content_type='application/json')
+
+
+def raw_status(port, headers):
+    # The status line of a request sent with hand-written headers and no body
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as s:
+        s.sendall(f'POST /render HTTP/1.1\r\nHost: test\r\n{headers}\r\n'.encode())
+        return int(s.recv(4096).split(b' ', 2)[1])
+
+
+def wait_idle(service):
+    deadline = time.time() + 30
+    while service.pending and time.time() < deadline:
+        time.sleep(0.05)
+
+
+def test_render(port):
+    status, headers, body = post(port, b"# Deck\n# Slide\n- point", '/render?template=Ocean%20Teal')
+    assert status == 200
+    assert headers['X-Slides'] == '2'
+    assert len(Presentation(io.BytesIO(body)).slides) == 2
+    status, _, body = post_json(port, {"markdown": "# Deck\n# Slide", "template": TEMPLATE})
+    assert status == 200
+
+
+@pytest.mark.parametrize('payload', [
+    b'{not json',
+    json.dumps({"text": "# Deck"}).encode(),
+    json.dumps({"markdown": "   "}).encode(),
+    json.dumps({"markdown": "# Deck", "template": "No Such Template"}).encode(),
+    json.dumps({"markdown": "# Deck", "template": dict(TEMPLATE, shape=1)}).encode(),
+    json.dumps({"markdown": "# Deck", "template": dict(TEMPLATE, title_alignment=[])}).encode(),
+    json.dumps({"markdown": "# Deck", "timeout": -1}).encode(),
+])
+def test_bad_requests(port, payload):
+    status, _, body = post(port, payload, content_type='application/json')
+    assert status == 400, body
+    assert 'error' in json.loads(body)
+
+
+@pytest.mark.parametrize('length', ['-5', 'abc'])
+def test_bad_content_length(port, length):
+    assert raw_status(port, f'Content-Length: {length}\r\n') == 400
+
+
+def test_body_too_large(port):
+    assert raw_status(port, f'Content-Length: {MAX_BODY + 1}\r\n') == 413
+
+
+def test_not_found(port):
+    assert post(port, b"# Deck", '/nothing')[0] == 404
+
+
+def test_timeout_and_full_queue(service, port):
+    wait_idle(service)
+    results = []
+    first = threading.Thread(target=lambda: results.append(post(port, SLOW_DECK.encode(), '/render?timeout=2')))
+    first.start()
+    deadline = time.time() + 10
+    while not service.pending and time.time() < deadline:
+        time.sleep(0.01)
+    status, headers, _ = post(port, b"# Deck\n# Slide")
+    assert status == 429 and headers['Retry-After'] == '1'
+    first.join()
+    assert results[0][0] == 504
+    # The timed-out render gives its worker back
+    wait_idle(service)
+    assert service.pending == 0
+    assert post(port, b"# Deck\n# Slide")[0] == 200
+
+
+def test_metrics(service, port):
+    wait_idle(service)
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('GET', '/metrics')
+    text = connection.getresponse().read().decode()
+    connection.close()
+    assert 'ttp_requests_total{code="200"}' in text
+    assert 'ttp_queue_capacity 1' in text
@@ -0,0 +1,81 @@
+import pytest
+from core.generator import SlideGenerator
+from core.ir import ContentSlide, QuoteSlide
+from core.textfit import CONTINUED_SUFFIX, FONT_SCALES, SHRINK, SPLIT, TextFitter, text_box
+from templates.templates import TEMPLATES
+
+TEMPLATE = TEMPLATES['Elegant Blue']
+BULLET = "Revenue grew in every region this quarter, driven by renewals and new customers"
+
+
+@pytest.fixture(scope='module')
+def boxes():
+    layouts = SlideGenerator(TEMPLATE).layouts
+    return {slide_type: text_box(layouts[slide_type].placeholders[1]) for slide_type in ('content', 'section')}
+
+
+def slide(bullets):
+    return ContentSlide("Results", [f"{BULLET} ({i})" for i in range(bullets)])
+
+
+def test_fitting_text_is_left_alone(boxes):
+    for mode in (SPLIT, SHRINK):
+        slide_data = slide(2)
+        assert TextFitter(TEMPLATE, boxes, mode).fit(slide_data) == [slide_data]
+
+
+def test_other_slide_types_are_left_alone(boxes):
+    quote = QuoteSlide(BULLET * 20)
+    assert TextFitter(TEMPLATE, boxes).fit(quote) == [quote]
+
+
+def test_split(boxes):
+    fitter = TextFitter(TEMPLATE, boxes, SPLIT)
+    slide_data = slide(30)
+    parts = fitter.fit(slide_data)
+    assert len(parts) > 1
+    assert [part.title for part in parts] == ["Results"] + ["Results" + CONTINUED_SUFFIX] * (len(parts) - 1)
+    assert [paragraph for part in parts for paragraph in part.content] == slide_data.content
+    box = boxes['content']
+    for part in parts:
+        assert sum(fitter.paragraph_heights(part.content, box)) <= box.height
+        assert part.font_scale is None
+
+
+def test_split_keeps_an_oversized_paragraph_whole(boxes):
+    slide_data = ContentSlide("Results", ["short", BULLET * 40, "short"])
+    parts = TextFitter(TEMPLATE, boxes, SPLIT).fit(slide_data)
+    assert [part.content for part in parts] == [["short"], [BULLET * 40], ["short"]]
+
+
+def test_shrink(boxes):
+    fitter = TextFitter(TEMPLATE, boxes, SHRINK)
+    box = boxes['content']
+    slide_data = slide(8)
+    assert sum(fitter.paragraph_heights(slide_data.content, box)) > box.height
+    [shrunk] = fitter.fit(slide_data)
+    assert FONT_SCALES[-1] <= shrunk.font_scale < 1
+    assert sum(fitter.paragraph_heights(slide_data.content, box, shrunk.font_scale)) <= box.height
+    # The largest scale that fits
+    larger = FONT_SCALES[FONT_SCALES.index(shrunk.font_scale) - 1]
+    assert sum(fitter.paragraph_heights(slide_data.content, box, larger)) > box.height
+
+
+def test_shrink_then_split(boxes):
+    parts = TextFitter(TEMPLATE, boxes, SHRINK).fit(slide(60))
+    assert len(parts) > 1
+    assert {part.font_scale for part in parts} == {FONT_SCALES[-1]}
+
+
+def test_unknown_mode(boxes):
+    with pytest.raises(ValueError):
+        TextFitter(TEMPLATE, boxes, 'wrap')
+
+
+def test_generator_fits_slides():
+    generator = SlideGenerator(TEMPLATE)
+    text = "# Deck\n# Results\n" + "\n".join(f"- {BULLET} ({i})" for i in range(30))
+    fitted = list(generator.fit_slides(generator.parse_input(text)))
+    assert len(fitted) > 2 and fitted[2].title == "Results" + CONTINUED_SUFFIX
+    generator.overflow = None
+    assert len(list(generator.fit_slides(generator.parse_input(text)))) == 2
@@ -0,0 +1,72 @@
+import io
+import zipfile
+from PIL import Image
+from pptx import Presentation
+from pptx.util import Inches
+from core.generator import SlideGenerator
+from core.writer import FIXED_DATE_TIME, save_presentation
+from templates.templates import TEMPLATES
+
+TEXT = "# Deck\n## Subtitle\n# Numbers\n@chart {Categories: A,B,C; S1: 1,2,3}\n# Points\n- one\n- two"
+
+
+def build():
+    generator = SlideGenerator(TEMPLATES['Ocean Teal'])
+    for slide_data in generator.parse_input(TEXT):
+        generator.create_slide(slide_data)
+    picture = io.BytesIO()
+    Image.new('RGB', (64, 64), (0, 102, 204)).save(picture, 'PNG')
+    slide = generator.prs.slides[-1]
+    slide.shapes.add_picture(io.BytesIO(picture.getvalue()), Inches(1), Inches(1))
+    return generator.prs
+
+
+def saved(prs, compress_level=6):
+    output = io.BytesIO()
+    save_presentation(prs, output, compress_level)
+    return output.getvalue()
+
+
+class Pipe(io.RawIOBase):
+    # A write-only, unseekable sink, like a pipe or an HTTP response body
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data.extend(data)
+        return len(data)
+
+
+def test_same_deck_same_bytes():
+    assert saved(build()) == saved(build())
+
+
+def test_members_in_order_with_fixed_times():
+    with zipfile.ZipFile(io.BytesIO(saved(build()))) as archive:
+        infos = archive.infolist()
+    names = [info.filename for info in infos]
+    assert names[:2] == ['[Content_Types].xml', '_rels/.rels']
+    assert {info.date_time for info in infos} == {FIXED_DATE_TIME}
+    parts = [name for name in names if not name.endswith('.rels')][1:]
+    assert parts == sorted(parts)
+
+
+def test_compression():
+    with zipfile.ZipFile(io.BytesIO(saved(build()))) as archive:
+        types = {info.filename: info.compress_type for info in archive.infolist()}
+    assert types['ppt/presentation.xml'] == zipfile.ZIP_DEFLATED
+    assert all(compress_type == zipfile.ZIP_STORED for name, compress_type in types.items()
+               if name.endswith(('.png', '.xlsx')))
+    with zipfile.ZipFile(io.BytesIO(saved(build(), compress_level=0))) as archive:
+        assert {info.compress_type for info in archive.infolist()} == {zipfile.ZIP_STORED}
+
+
+def test_unseekable_sink():
+    built = build()
+    pipe = Pipe()
+    save_presentation(built, pipe)
+    prs = Presentation(io.BytesIO(bytes(pipe.data)))
+    assert [slide.shapes.title.text for slide in prs.slides] == [slide.shapes.title.text for slide in built.slides]